@@ -0,0 +1,171 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+FORMATS = {"jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+
+@dataclass
+class EncodedImage:
+    data: str           # base64, as Message.images expects
+    mime: str
+    width: int
+    height: int
+    source_bytes: int
+    encoded_bytes: int
+
+
+class ImagePipeline:
+    """
+    把截图/照片转换成适合发送给视觉模型的 Message.images：
+      Pillow 解码 (JPEG 用 draft 直接按比例解码) → 按 EXIF 旋正 → 缩放到模型配置的最长边
+      → 按目标质量重新编码为 JPEG/WebP (原文件更小时直接使用原文件)
+    结果以 (路径, mtime, size, 参数) 为键缓存：内存 LRU + 磁盘，多张图片在线程池上并行处理。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = ".memora/images", max_workers: int = 4,
+                 max_memory_bytes: int = 32 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.max_memory_bytes = max_memory_bytes
+        self._memory: "OrderedDict[str, EncodedImage]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    # ---------- Cache ----------
+    @staticmethod
+    def _key(path: str, max_side: int, quality: int, fmt: str) -> str:
+        st = os.stat(path)
+        raw = f"{os.path.abspath(path)}\0{st.st_mtime_ns}\0{st.st_size}\0{max_side}\0{quality}\0{fmt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, key[:2], key + ".json") if self.cache_dir else None
+
+    def _lookup(self, key: str) -> Optional[EncodedImage]:
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                return image
+        disk = self._disk_path(key)
+        if disk and os.path.exists(disk):
+            try:
+                with open(disk, "r", encoding="utf-8") as f:
+                    image = EncodedImage(**json.load(f))
+                self._remember(key, image)
+                return image
+            except (OSError, ValueError, TypeError):
+                return None
+        return None
+
+    def _remember(self, key: str, image: EncodedImage):
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = image
+            self._memory_bytes += len(image.data)
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted.data)
+
+    def _store(self, key: str, image: EncodedImage):
+        self._remember(key, image)
+        disk = self._disk_path(key)
+        if not disk:
+            return
+        try:
+            os.makedirs(os.path.dirname(disk), exist_ok=True)
+            tmp = f"{disk}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(asdict(image), f)
+            os.replace(tmp, disk)
+        except OSError as e:
+            print(f"[ImagePipeline] Failed to persist cache entry: {e}")
+
+    # ---------- Encoding ----------
+    def encode(self, path: str, max_side: int = 1024, quality: int = 85, fmt: str = "jpeg") -> EncodedImage:
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported image format '{fmt}'. Use {', '.join(FORMATS)}.")
+        key = self._key(path, max_side, quality, fmt)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        image = self._encode(path, max_side, quality, fmt)
+        self._store(key, image)
+        return image
+
+    @staticmethod
+    def _encode(path: str, max_side: int, quality: int, fmt: str) -> EncodedImage:
+        from PIL import Image, ImageOps
+
+        pil_format, mime = FORMATS[fmt]
+        source_bytes = os.path.getsize(path)
+        with Image.open(path) as img:
+            source_format = img.format
+            # Usable as-is only if no resize and no EXIF rotation is needed
+            untouched = max(img.size) <= max_side and img.getexif().get(0x0112, 1) == 1
+            # JPEG decoder can scale by 1/2..1/8 while decoding, far cheaper than a full decode + resize
+            img.draft("RGB", (max_side, max_side))
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                if pil_format == "JPEG":
+                    background = Image.new("RGB", img.size, (255, 255, 255))
+                    background.paste(img, mask=img.getchannel("A"))
+                    img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+
+            buffer = io.BytesIO()
+            options = {"quality": quality}
+            if pil_format == "JPEG":
+                options.update(optimize=True, progressive=True)
+            else:
+                options["method"] = 4
+            img.save(buffer, format=pil_format, **options)
+            encoded = buffer.getvalue()
+            width, height = img.size
+
+        if untouched and source_format == pil_format and source_bytes <= len(encoded):
+            # Already small enough in the target format: re-encoding would only lose quality
+            with open(path, "rb") as f:
+                encoded = f.read()
+        return EncodedImage(base64.b64encode(encoded).decode("ascii"), mime, width, height,
+                            source_bytes, len(encoded))
+
+    def encode_many(self, paths: List[str], max_side: int = 1024, quality: int = 85,
+                    fmt: str = "jpeg") -> List[Optional[EncodedImage]]:
+        """Encode several images concurrently (Pillow releases the GIL while decoding/resizing)."""
+        def one(path: str) -> Optional[EncodedImage]:
+            try:
+                return self.encode(path, max_side, quality, fmt)
+            except Exception as e:
+                print(f"[ImagePipeline] Failed to encode '{path}': {e}")
+                return None
+
+        if len(paths) <= 1:
+            return [one(p) for p in paths]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(paths))) as pool:
+            return list(pool.map(one, paths))
+
+
+# ====== Global Singleton ======
+_image_pipeline = None
+
+def get_image_pipeline() -> ImagePipeline:
+    global _image_pipeline
+    if _image_pipeline is None:
+        _image_pipeline = ImagePipeline()
+    return _image_pipeline
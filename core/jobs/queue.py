@@ -0,0 +1,263 @@
+import os
+import sqlite3
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+@dataclass
+class Job:
+    id: str
+    agent_id: str
+    model: str
+    input: str
+    status: str
+    result: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    worker_id: Optional[str] = None
+    lease_until: Optional[float] = None
+    cancel_requested: bool = False
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "agent_id": self.agent_id,
+            "model": self.model,
+            "input": self.input,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "worker_id": self.worker_id,
+            "lease_until": self.lease_until,
+            "cancel_requested": self.cancel_requested,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> 'Job':
+        return cls(
+            id=row["id"],
+            agent_id=row["agent_id"],
+            model=row["model"],
+            input=row["input"],
+            status=row["status"],
+            result=row["result"],
+            error=row["error"],
+            attempts=row["attempts"],
+            worker_id=row["worker_id"],
+            lease_until=row["lease_until"],
+            cancel_requested=bool(row["cancel_requested"]),
+            created_at=row["created_at"],
+            updated_at=row["updated_at"]
+        )
+
+
+class JobQueue:
+    """
+    基于 SQLite 的持久化任务队列。
+
+    Worker 通过租约 (lease) 认领任务：认领时写入 worker_id 和 lease_until，
+    运行期间定期 renew。Worker 崩溃后租约过期，任务会被其他 Worker 重新认领，
+    并通过相同的 agent_id 从 checkpoint 继续执行。
+    多个主机可以共享同一个数据库文件分摊负载 (网络文件系统上请使用 journal_mode="DELETE")。
+    """
+
+    def __init__(self, db_path: str = ".memora/jobs.db", max_attempts: int = 3,
+                 journal_mode: str = "WAL"):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.journal_mode = journal_mode
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        if not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation keeps this safe across threads and processes
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    agent_id TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    input TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_until REAL,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        finally:
+            conn.close()
+
+    def submit(self, user_input: str, model: str, agent_id: Optional[str] = None) -> Job:
+        now = time.time()
+        job_id = str(uuid.uuid4())
+        # agent_id doubles as the checkpoint key, so a re-claimed job resumes where it stopped
+        agent_id = agent_id or job_id
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, agent_id, model, input, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, agent_id, model, user_input, JobStatus.QUEUED, now, now)
+            )
+        finally:
+            conn.close()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return Job.from_row(row) if row else None
+        finally:
+            conn.close()
+
+    def claim(self, worker_id: str, lease_seconds: float = 60.0) -> Optional[Job]:
+        """
+        Atomically claim the oldest queued job, or a running job whose lease expired.
+        Returns None when there is nothing to do.
+        """
+        while True:
+            claimed, job_id = self._try_claim(worker_id, lease_seconds)
+            if job_id is None:
+                return None
+            if claimed:
+                return self.get(job_id)
+            # The candidate was retired (cancelled / too many attempts); look for the next one
+
+    def _try_claim(self, worker_id: str, lease_seconds: float):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? "
+                    "OR (status = ? AND lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (JobStatus.QUEUED, JobStatus.RUNNING, now)
+                ).fetchone()
+                if not row:
+                    conn.execute("COMMIT")
+                    return False, None
+
+                if row["cancel_requested"]:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, worker_id = NULL, lease_until = NULL, updated_at = ? "
+                        "WHERE id = ?",
+                        (JobStatus.CANCELLED, now, row["id"])
+                    )
+                    conn.execute("COMMIT")
+                    return False, row["id"]
+
+                if row["attempts"] >= self.max_attempts:
+                    # Previous workers kept dying on this job; give up on it
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, lease_until = NULL, "
+                        "updated_at = ? WHERE id = ?",
+                        (JobStatus.FAILED, f"Lease expired after {row['attempts']} attempts", now, row["id"])
+                    )
+                    conn.execute("COMMIT")
+                    return False, row["id"]
+
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = ?, lease_until = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (JobStatus.RUNNING, worker_id, now + lease_seconds, now, row["id"])
+                )
+                conn.execute("COMMIT")
+                return True, row["id"]
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def renew(self, job_id: str, worker_id: str, lease_seconds: float = 60.0) -> bool:
+        """
+        Extend the lease. Returns False if the lease was lost (another worker took over)
+        or cancellation was requested; the caller should stop working on the job.
+        """
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? "
+                "WHERE id = ? AND worker_id = ? AND status = ? AND cancel_requested = 0",
+                (time.time() + lease_seconds, time.time(), job_id, worker_id, JobStatus.RUNNING)
+            )
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def _finish(self, job_id: str, worker_id: str, status: str,
+                result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND worker_id = ? AND status = ?",
+                (status, result, error, time.time(), job_id, worker_id, JobStatus.RUNNING)
+            )
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def complete(self, job_id: str, worker_id: str, result: str) -> bool:
+        return self._finish(job_id, worker_id, JobStatus.SUCCEEDED, result=result)
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return self._finish(job_id, worker_id, JobStatus.FAILED, error=error)
+
+    def mark_cancelled(self, job_id: str, worker_id: str) -> bool:
+        return self._finish(job_id, worker_id, JobStatus.CANCELLED)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a job. Queued jobs are cancelled immediately; running jobs get
+        cancel_requested and are stopped by their worker on the next lease renewal.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, cancel_requested = 1, updated_at = ? WHERE id = ? AND status = ?",
+                (JobStatus.CANCELLED, now, job_id, JobStatus.QUEUED)
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = ?",
+                (now, job_id, JobStatus.RUNNING)
+            )
+        finally:
+            conn.close()
+        return self.get(job_id)
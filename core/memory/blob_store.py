@@ -0,0 +1,108 @@
+import hashlib
+import os
+import uuid
+from typing import Optional, Tuple
+
+HANDLE_PREFIX = "obs_"
+
+
+class BlobStore:
+    """
+    内容寻址的观察结果存储：大段工具输出按 sha256 存盘 (相同内容只存一份)，
+    Prompt、Task.history、Trace 和 Checkpoint 中只保留有限长度的预览和 handle，
+    需要细看时通过 read_observation(handle, offset, length) 分段读取。
+
+    存储布局 (storage_dir)：
+      <hash[:2]>/<hash>   UTF-8 原文，写入时先写临时文件再 rename，保证不会读到半个 blob
+    """
+
+    def __init__(self, storage_dir: str = ".memora/blobs", threshold: int = 4000,
+                 preview_chars: int = 1500):
+        self.storage_dir = storage_dir
+        self.threshold = threshold
+        self.preview_chars = preview_chars
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.storage_dir, digest[:2], digest)
+
+    @staticmethod
+    def _digest(handle: str) -> Optional[str]:
+        digest = handle.strip()
+        if digest.startswith(HANDLE_PREFIX):
+            digest = digest[len(HANDLE_PREFIX):]
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            return None
+        return digest
+
+    def put(self, text: str) -> str:
+        """Store text (deduplicated by content) and return its handle."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return HANDLE_PREFIX + digest
+
+    def put_file(self, source: str) -> str:
+        """Store an existing file (hashed in a streaming pass, then moved into place) and return its handle."""
+        sha = hashlib.sha256()
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            os.remove(source)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(source, path)
+        return HANDLE_PREFIX + digest
+
+    def exists(self, handle: str) -> bool:
+        digest = self._digest(handle)
+        return digest is not None and os.path.exists(self._path(digest))
+
+    def size(self, handle: str) -> int:
+        """Blob size in bytes, or -1 when the handle is unknown."""
+        digest = self._digest(handle)
+        if digest is None or not os.path.exists(self._path(digest)):
+            return -1
+        return os.path.getsize(self._path(digest))
+
+    def read(self, handle: str, offset: int = 0, length: int = 4000) -> Optional[str]:
+        """Read length bytes starting at byte offset; None when the handle is unknown."""
+        digest = self._digest(handle)
+        if digest is None or not os.path.exists(self._path(digest)):
+            return None
+        with open(self._path(digest), "rb") as f:
+            f.seek(max(offset, 0))
+            chunk = f.read(max(length, 0))
+        # A window may cut through a multi-byte character at either end
+        return chunk.decode("utf-8", errors="ignore")
+
+    def compact(self, text: str) -> Tuple[str, Optional[str]]:
+        """
+        Returns (text, None) for small text. Large text is stored and replaced by
+        a preview plus the handle the planner can page through: (preview, handle).
+        """
+        if len(text) <= self.threshold:
+            return text, None
+        handle = self.put(text)
+        total = len(text.encode("utf-8"))
+        preview = text[:self.preview_chars]
+        return (f"{preview}\n...\n[Truncated observation: {len(text)} chars / {total} bytes total. "
+                f"handle={handle}. Use the read_observation tool (handle, offset, length) to read more.]"), handle
+
+
+# ====== Global Singleton ======
+_blob_store = None
+
+def get_blob_store() -> BlobStore:
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore()
+    return _blob_store
@@ -25,6 +25,11 @@ class Checkpoint:
     current_observation: Optional[str] = None
     final_answer: str = ""
 
+    # Original request and guidance injected while running
+    user_input: str = ""
+    guidance: List[str] = field(default_factory=list)
+    session_id: Optional[str] = None
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "agent_id": self.agent_id,
@@ -37,7 +42,10 @@ class Checkpoint:
             "trace_events": self.trace_events,
             "current_action": self.current_action,
             "current_observation": self.current_observation,
-            "final_answer": self.final_answer
+            "final_answer": self.final_answer,
+            "user_input": self.user_input,
+            "guidance": self.guidance,
+            "session_id": self.session_id
         }
 
     @classmethod
@@ -53,5 +61,8 @@ class Checkpoint:
             trace_events=data.get("trace_events", []),
             current_action=data.get("current_action"),
             current_observation=data.get("current_observation"),
-            final_answer=data.get("final_answer", "")
+            final_answer=data.get("final_answer", ""),
+            user_input=data.get("user_input", ""),
+            guidance=data.get("guidance", []),
+            session_id=data.get("session_id")
         )
@@ -0,0 +1,40 @@
+import zlib
+from abc import ABC, abstractmethod
+from typing import List
+
+import numpy as np
+
+from core.memory.text import tokenize
+
+
+class Embedder(ABC):
+    """Text -> dense vector. Implementations must return L2-normalized float32 rows."""
+    dim: int
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        pass
+
+
+class HashingEmbedder(Embedder):
+    """
+    本地默认 Embedder：Hashing Vectorizer，无需模型和网络。
+    英文/数字按词切分，中日韩文字使用字符 bigram，特征通过 crc32 哈希到 dim 维并带符号，
+    最后做 sublinear tf 和 L2 归一化。
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feat in tokenize(text):
+                h = zlib.crc32(feat.encode("utf-8"))
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                out[row, h % self.dim] += sign
+        # sublinear tf keeps long documents from dominating
+        out = np.sign(out) * np.log1p(np.abs(out))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (out / norms).astype(np.float32)
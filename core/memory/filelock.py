@@ -0,0 +1,24 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Exclusive inter-process lock on path (created if missing).
+    Used by append-only stores shared between web and worker processes.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
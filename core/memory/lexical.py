@@ -0,0 +1,284 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.memory.filelock import file_lock
+from core.memory.text import tokenize
+
+
+class BM25Index:
+    """
+    历史执行记录 (Task.history、工具观察结果) 的 BM25 倒排索引，用于精确的词法检索：
+    文件路径、命令名、错误信息等。
+
+    磁盘格式 (storage_dir，全部只追加)：
+      vocab.txt      每行一个词，行号即 term id
+      fwd_offsets    uint64，第 i 个文档在 fwd_terms / fwd_tfs 中的起始位置
+      fwd_terms      uint32，文档的 term id 序列 (正排索引，CSR 格式)
+      fwd_tfs        uint16，对应的词频
+      docs.jsonl     文档原文与元数据；doc_offsets (uint64) 记录每行的字节偏移，按需 seek 读取
+
+    加载时用 NumPy 向量化地把正排索引转成倒排索引；之后新增的文档先进入内存中的增量倒排表，
+    积累到一定数量 (merge_threshold 与主索引 1/4 中较大者) 后再合并，避免每次新增都重建。
+    """
+
+    def __init__(self, storage_dir: str = ".memora/lexical", k1: float = 1.2, b: float = 0.75,
+                 merge_threshold: int = 4096, max_text_chars: int = 4000):
+        self.storage_dir = storage_dir
+        self.k1 = k1
+        self.b = b
+        self.merge_threshold = merge_threshold
+        self.max_text_chars = max_text_chars
+        self._lock = threading.Lock()
+        self._loaded = False
+
+        self._vocab: Dict[str, int] = {}
+        self._doc_lens = np.zeros(0, dtype=np.float32)
+        self._n_docs = 0
+        self._total_len = 0.0
+        self._doc_offsets: List[int] = []
+
+        # Main inverted index: postings of term t are _post_docs/_post_tfs[_term_ptr[t]:_term_ptr[t+1]]
+        self._term_ptr = np.zeros(1, dtype=np.int64)
+        self._post_docs = np.zeros(0, dtype=np.uint32)
+        self._post_tfs = np.zeros(0, dtype=np.float32)
+        self._main_docs = 0
+
+        # Delta inverted index for documents added after the last merge
+        self._delta: Dict[int, List[Tuple[int, int]]] = {}
+        self._pending_lens: List[int] = []
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.storage_dir, name)
+
+    # ---------- Loading ----------
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        os.makedirs(self.storage_dir, exist_ok=True)
+
+        if os.path.exists(self._path("vocab.txt")):
+            with open(self._path("vocab.txt"), "r", encoding="utf-8") as f:
+                for i, line in enumerate(f):
+                    self._vocab[line.rstrip("\n")] = i
+
+        offsets = self._read_array("fwd_offsets", np.uint64)
+        terms = self._read_array("fwd_terms", np.uint32)
+        tfs = self._read_array("fwd_tfs", np.uint16)
+        doc_offsets = self._read_array("doc_offsets", np.uint64)
+
+        # Tolerate a crash in the middle of an append: keep only fully written documents
+        n = min(len(offsets), len(doc_offsets))
+        n_post = min(len(terms), len(tfs))
+        while n > 0 and offsets[n - 1] > n_post:
+            n -= 1
+        end = int(offsets[n]) if n < len(offsets) else n_post
+        terms, tfs = terms[:end], tfs[:end]
+        offsets = offsets[:n]
+
+        self._doc_offsets = [int(x) for x in doc_offsets[:n]]
+        self._n_docs = n
+        self._build_main(offsets, terms, tfs)
+        self._loaded = True
+
+    def _read_array(self, name: str, dtype) -> np.ndarray:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=dtype)
+        return np.fromfile(path, dtype=dtype)
+
+    def _build_main(self, offsets: np.ndarray, terms: np.ndarray, tfs: np.ndarray):
+        n = len(offsets)
+        bounds = np.append(offsets.astype(np.int64), len(terms))
+        lens = np.diff(bounds)
+        doc_ids = np.repeat(np.arange(n, dtype=np.uint32), lens)
+        self._doc_lens = np.bincount(doc_ids, weights=tfs, minlength=n).astype(np.float32)
+        self._total_len = float(self._doc_lens.sum())
+
+        order = np.argsort(terms, kind="stable")
+        self._post_docs = doc_ids[order]
+        self._post_tfs = tfs[order].astype(np.float32)
+        self._term_ptr = np.searchsorted(terms[order], np.arange(len(self._vocab) + 1)).astype(np.int64)
+        self._main_docs = n
+        self._delta = {}
+        self._pending_lens = []
+
+    def _merge(self):
+        """Fold the delta postings into the main arrays (rebuilt from the on-disk forward index)."""
+        offsets = self._read_array("fwd_offsets", np.uint64)[:self._n_docs]
+        terms = self._read_array("fwd_terms", np.uint32)
+        tfs = self._read_array("fwd_tfs", np.uint16)
+        self._build_main(offsets, terms, tfs)
+
+    # ---------- Writing ----------
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return self._n_docs
+
+    def add(self, text: str, source: str = "", metadata: Optional[Dict[str, Any]] = None) -> int:
+        return self.add_many([(text, source, metadata)])[0]
+
+    def add_many(self, docs: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> List[int]:
+        if not docs:
+            return []
+        with self._lock, file_lock(self._path("lock")):
+            self._sync()
+            ids = []
+            new_terms: List[str] = []
+            fwd_offsets, fwd_terms, fwd_tfs, doc_offsets = [], [], [], []
+            post_count = self._post_count_on_disk()
+
+            with open(self._path("docs.jsonl"), "ab") as f_docs:
+                for text, source, metadata in docs:
+                    text = (text or "")[:self.max_text_chars]
+                    counts = Counter(tokenize(text, split_compound=True))
+                    doc_id = self._n_docs
+                    for term, tf in counts.items():
+                        tid = self._vocab.get(term)
+                        if tid is None:
+                            tid = len(self._vocab)
+                            self._vocab[term] = tid
+                            new_terms.append(term)
+                        if tf > 65535:
+                            tf = 65535
+                        fwd_terms.append(tid)
+                        fwd_tfs.append(tf)
+                        self._delta.setdefault(tid, []).append((doc_id, tf))
+                    fwd_offsets.append(post_count)
+                    post_count += len(counts)
+
+                    doc_offsets.append(f_docs.tell())
+                    record = {"id": doc_id, "source": source, "text": text,
+                              "metadata": metadata or {}, "created_at": time.time()}
+                    f_docs.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+
+                    length = sum(counts.values())
+                    self._pending_lens.append(length)
+                    self._total_len += length
+                    self._doc_offsets.append(doc_offsets[-1])
+                    self._n_docs += 1
+                    ids.append(doc_id)
+
+            if new_terms:
+                with open(self._path("vocab.txt"), "a", encoding="utf-8") as f:
+                    f.write("".join(t + "\n" for t in new_terms))
+            self._append_array("fwd_terms", np.array(fwd_terms, dtype=np.uint32))
+            self._append_array("fwd_tfs", np.array(fwd_tfs, dtype=np.uint16))
+            # Offsets last: a document only counts once its postings are on disk
+            self._append_array("doc_offsets", np.array(doc_offsets, dtype=np.uint64))
+            self._append_array("fwd_offsets", np.array(fwd_offsets, dtype=np.uint64))
+
+            # Geometric threshold keeps the amortized merge cost linear in the number of adds
+            if len(self._pending_lens) >= max(self.merge_threshold, self._main_docs // 4):
+                self._merge()
+            return ids
+
+    def _docs_on_disk(self) -> int:
+        path = self._path("fwd_offsets")
+        return os.path.getsize(path) // 8 if os.path.exists(path) else 0
+
+    def _sync(self):
+        """Reload if another process appended documents since we loaded."""
+        if self._loaded and self._docs_on_disk() != self._n_docs:
+            self._loaded = False
+            self._vocab = {}
+        self._ensure_loaded()
+
+    def _post_count_on_disk(self) -> int:
+        path = self._path("fwd_terms")
+        return os.path.getsize(path) // 4 if os.path.exists(path) else 0
+
+    def _append_array(self, name: str, arr: np.ndarray):
+        with open(self._path(name), "ab") as f:
+            f.write(arr.tobytes())
+
+    # ---------- Search ----------
+    def _idf(self, df: int) -> float:
+        return float(np.log(1.0 + (self._n_docs - df + 0.5) / (df + 0.5)))
+
+    def search(self, query: str, k: int = 10, source: Optional[str] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        with self._lock:
+            self._sync()
+            if self._n_docs == 0:
+                return []
+
+            term_ids = {self._vocab[t] for t in tokenize(query, split_compound=True) if t in self._vocab}
+            if not term_ids:
+                return []
+
+            doc_lens = self._doc_lens
+            if self._pending_lens:
+                doc_lens = np.concatenate([doc_lens, np.array(self._pending_lens, dtype=np.float32)])
+            avgdl = self._total_len / self._n_docs if self._n_docs else 1.0
+            norm = self.k1 * (1 - self.b + self.b * doc_lens / max(avgdl, 1e-6))
+            scores = np.zeros(self._n_docs, dtype=np.float32)
+
+            for tid in term_ids:
+                if tid + 1 < len(self._term_ptr):
+                    lo, hi = self._term_ptr[tid], self._term_ptr[tid + 1]
+                else:
+                    lo = hi = 0
+                delta = self._delta.get(tid, [])
+                df = int(hi - lo) + len(delta)
+                if df == 0:
+                    continue
+                idf = self._idf(df)
+                if hi > lo:
+                    docs = self._post_docs[lo:hi]
+                    tf = self._post_tfs[lo:hi]
+                    scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+                for doc_id, tf in delta:
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm[doc_id])
+
+            if source is not None:
+                # Filtering needs the stored records; over-fetch and filter below
+                k_fetch = min(self._n_docs, k * 8)
+            else:
+                k_fetch = min(self._n_docs, k)
+            candidates = np.argpartition(-scores, k_fetch - 1)[:k_fetch]
+            candidates = candidates[np.argsort(-scores[candidates])]
+
+            results = []
+            with open(self._path("docs.jsonl"), "rb") as f:
+                for doc_id in candidates:
+                    score = float(scores[doc_id])
+                    if score <= 0:
+                        break
+                    f.seek(self._doc_offsets[int(doc_id)])
+                    record = json.loads(f.readline().decode("utf-8"))
+                    if source is not None and record.get("source") != source:
+                        continue
+                    results.append((score, record))
+                    if len(results) >= k:
+                        break
+            return results
+
+    def format_for_prompt(self, query: str, k: int = 3, max_chars: int = 1500,
+                          preview_chars: int = 400) -> str:
+        lines = []
+        total = 0
+        for score, record in self.search(query, k=k):
+            text = record["text"]
+            preview = text if len(text) <= preview_chars else text[:preview_chars] + "..."
+            line = f"- ({record.get('source') or 'record'}, bm25={score:.1f}) {preview}"
+            if total + len(line) > max_chars:
+                break
+            lines.append(line)
+            total += len(line)
+        return "\n".join(lines)
+
+
+# ====== Global Singleton ======
+_lexical_index = None
+
+def get_lexical_index() -> BM25Index:
+    global _lexical_index
+    if _lexical_index is None:
+        _lexical_index = BM25Index()
+    return _lexical_index
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.memory.embedder import Embedder, HashingEmbedder
+from core.memory.filelock import file_lock
+from core.memory.vector_index import VectorIndex
+
+
+@dataclass
+class MemoryRecord:
+    kind: str        # run | task | observation
+    text: str
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "text": self.text,
+            "metadata": self.metadata,
+            "created_at": self.created_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MemoryRecord':
+        return cls(
+            kind=data["kind"],
+            text=data["text"],
+            id=data["id"],
+            metadata=data.get("metadata", {}),
+            created_at=data.get("created_at", time.time())
+        )
+
+
+class LongTermMemory:
+    """
+    长期记忆：把完成的任务目标、结果和关键观察向量化后存入 VectorIndex，
+    下一次相似请求时由 Planner 召回，避免重复执行工具调用。
+
+    存储布局 (storage_dir)：
+      records.jsonl  追加写入的记录 (第 i 行对应向量 i)
+      index/         VectorIndex 持久化文件 (mmap 加载)
+    """
+
+    def __init__(self, storage_dir: str = ".memora/long_term", embedder: Optional[Embedder] = None,
+                 use_ivf: bool = False, max_text_chars: int = 2000):
+        self.storage_dir = storage_dir
+        self.embedder = embedder or HashingEmbedder()
+        self.use_ivf = use_ivf
+        self.max_text_chars = max_text_chars
+        self._records: List[MemoryRecord] = []
+        self._index: Optional[VectorIndex] = None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._records_bytes = 0
+
+    @property
+    def _records_path(self) -> str:
+        return os.path.join(self.storage_dir, "records.jsonl")
+
+    @property
+    def _index_dir(self) -> str:
+        return os.path.join(self.storage_dir, "index")
+
+    def _sync(self):
+        """Reload if another process (e.g. a worker) appended records since we loaded."""
+        if self._loaded and os.path.exists(self._records_path) \
+                and os.path.getsize(self._records_path) != self._records_bytes:
+            self._loaded = False
+            self._records = []
+        self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        os.makedirs(self.storage_dir, exist_ok=True)
+        if os.path.exists(self._records_path):
+            with open(self._records_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._records.append(MemoryRecord.from_dict(json.loads(line)))
+        self._records_bytes = os.path.getsize(self._records_path) if os.path.exists(self._records_path) else 0
+
+        index = VectorIndex.load(self._index_dir)
+        if index is None or index.dim != self.embedder.dim or len(index) > len(self._records):
+            # Missing or incompatible index: rebuild from the record log
+            index = VectorIndex(self.embedder.dim, use_ivf=self.use_ivf)
+            if self._records:
+                index.add(self.embedder.embed([r.text for r in self._records]))
+        elif len(index) < len(self._records):
+            # Crashed between appending records and saving the index
+            missing = self._records[len(index):]
+            index.add(self.embedder.embed([r.text for r in missing]))
+        index.use_ivf = self.use_ivf
+        self._index = index
+        self._loaded = True
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._records)
+
+    def add(self, records: List[MemoryRecord]):
+        if not records:
+            return
+        with self._lock, file_lock(os.path.join(self.storage_dir, "lock")):
+            self._sync()
+            for r in records:
+                r.text = r.text[:self.max_text_chars]
+            vectors = self.embedder.embed([r.text for r in records])
+            with open(self._records_path, "a", encoding="utf-8") as f:
+                for r in records:
+                    f.write(json.dumps(r.to_dict(), ensure_ascii=False) + "\n")
+            self._records_bytes = os.path.getsize(self._records_path)
+            self._records.extend(records)
+            self._index.add(vectors)
+            self._index.save(self._index_dir)
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.2,
+               kinds: Optional[List[str]] = None) -> List[Tuple[float, MemoryRecord]]:
+        return self.search_many([query], k=k, min_score=min_score, kinds=kinds)[0]
+
+    def search_many(self, queries: List[str], k: int = 5, min_score: float = 0.2,
+                    kinds: Optional[List[str]] = None) -> List[List[Tuple[float, MemoryRecord]]]:
+        with self._lock:
+            self._sync()
+            if not self._records:
+                return [[] for _ in queries]
+            # Over-fetch when filtering by kind so k results usually survive the filter
+            fetch = k * 4 if kinds else k
+            scores, ids = self._index.search(self.embedder.embed(queries), fetch)
+            results = []
+            for row_scores, row_ids in zip(scores, ids):
+                hits = []
+                for score, idx in zip(row_scores, row_ids):
+                    record = self._records[int(idx)]
+                    if score < min_score or (kinds and record.kind not in kinds):
+                        continue
+                    hits.append((float(score), record))
+                    if len(hits) >= k:
+                        break
+                results.append(hits)
+            return results
+
+    def remember_run(self, user_input: str, final_answer: str, tasks: List[Any],
+                     observations: List[str], agent_id: str = "", max_observation_chars: int = 500):
+        """Store what a finished run learned: the request/answer, each task and its key observations."""
+        meta = {"agent_id": agent_id}
+        records = [MemoryRecord("run", f"Request: {user_input}\nAnswer: {final_answer}", metadata=meta)]
+        for t in tasks:
+            records.append(MemoryRecord("task", f"Task: {t.goal}\nResult: {t.result}",
+                                        metadata=dict(meta, status=t.status)))
+        for obs in observations:
+            records.append(MemoryRecord("observation", obs[:max_observation_chars], metadata=meta))
+        self.add(records)
+
+    def format_for_prompt(self, query: str, k: int = 3, max_chars: int = 2000) -> str:
+        lines = []
+        total = 0
+        for score, record in self.search(query, k=k):
+            line = f"- ({record.kind}, score={score:.2f}) {record.text}"
+            if total + len(line) > max_chars:
+                break
+            lines.append(line)
+            total += len(line)
+        return "\n".join(lines)
+
+
+# ====== Global Singleton ======
+_long_term_memory = None
+
+def get_long_term_memory() -> LongTermMemory:
+    global _long_term_memory
+    if _long_term_memory is None:
+        _long_term_memory = LongTermMemory()
+    return _long_term_memory
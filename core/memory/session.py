@@ -0,0 +1,158 @@
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class Session:
+    """
+    多轮对话的服务端会话：
+    - turns: 之前每一轮的用户输入与最终回答
+    - context: 压缩后的对话上下文 (供 Planner / Writer 使用)
+    - observations: 只读工具调用的结果缓存 (tool + args -> observation)
+    - observation_stamps: 每条缓存结果依赖的文件 [path, mtime_ns, size]，复用前校验，文件变化则失效
+    """
+    session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    turns: List[Dict[str, str]] = field(default_factory=list)
+    context: str = ""
+    observations: Dict[str, str] = field(default_factory=dict)
+    observation_stamps: Dict[str, List[list]] = field(default_factory=dict)
+
+    # Limits (per session)
+    max_turns: int = 20
+    max_answer_chars: int = 2000
+    max_context_chars: int = 8000
+    max_observations: int = 64
+    max_observation_bytes: int = 512 * 1024
+
+    def __post_init__(self):
+        # Insertion order doubles as LRU order for the observation cache
+        self.observations = OrderedDict(self.observations)
+
+    def add_turn(self, user_input: str, answer: str):
+        self.turns.append({"user": user_input, "answer": answer[:self.max_answer_chars]})
+        if len(self.turns) > self.max_turns:
+            self.turns = self.turns[-self.max_turns:]
+        self._condense()
+        self.touch()
+
+    def _condense(self):
+        """Rebuild context from the most recent turns that fit in max_context_chars."""
+        parts: List[str] = []
+        total = 0
+        for turn in reversed(self.turns):
+            block = f"User: {turn['user']}\nAssistant: {turn['answer']}"
+            if total + len(block) > self.max_context_chars and parts:
+                break
+            parts.append(block[:self.max_context_chars])
+            total += len(block)
+        self.context = "\n\n".join(reversed(parts))
+
+    @staticmethod
+    def observation_key(tool_name: str, args: Dict[str, Any], paths: Optional[List[str]] = None) -> str:
+        key = f"{tool_name}:{json.dumps(args, sort_keys=True, ensure_ascii=False)}"
+        # Resolved paths keep calls apart whose relative paths point elsewhere (e.g. shell after cd)
+        return key + f" @ {json.dumps(paths, ensure_ascii=False)}" if paths else key
+
+    @staticmethod
+    def file_stamps(paths: List[str]) -> List[list]:
+        """[path, mtime_ns, size] per path; missing files get None so that creating them invalidates too."""
+        stamps = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                st = os.stat(path)
+                stamps.append([path, st.st_mtime_ns, st.st_size])
+            except OSError:
+                stamps.append([path, None, None])
+        return stamps
+
+    def get_observation(self, key: str) -> Optional[str]:
+        obs = self.observations.get(key)
+        if obs is None:
+            return None
+        stamps = self.observation_stamps.get(key) or []
+        if stamps and self.file_stamps([s[0] for s in stamps]) != stamps:
+            # Changed outside the agent (another process, a background job, the user between turns)
+            self._drop_observation(key)
+            return None
+        self.observations.move_to_end(key)
+        return obs
+
+    def put_observation(self, key: str, observation: str, stamps: Optional[List[list]] = None):
+        """stamps: file_stamps() of the files the observation was read from, taken before the read."""
+        self.observations[key] = observation
+        self.observations.move_to_end(key)
+        if stamps:
+            self.observation_stamps[key] = stamps
+        else:
+            self.observation_stamps.pop(key, None)
+        while self.observations and (
+            len(self.observations) > self.max_observations
+            or self._observation_bytes() > self.max_observation_bytes
+        ):
+            oldest = next(iter(self.observations))
+            self._drop_observation(oldest)
+
+    def _drop_observation(self, key: str):
+        self.observations.pop(key, None)
+        self.observation_stamps.pop(key, None)
+
+    def observation_summary(self, max_chars: int = 4000, preview_chars: int = 300) -> str:
+        """Short previews of cached observations, most recent first, for the planner prompt."""
+        lines: List[str] = []
+        total = 0
+        for key, obs in reversed(self.observations.items()):
+            preview = obs if len(obs) <= preview_chars else obs[:preview_chars] + "..."
+            line = f"- {key}\n  {preview}"
+            if total + len(line) > max_chars:
+                break
+            lines.append(line)
+            total += len(line)
+        return "\n".join(lines)
+
+    def invalidate_observations(self):
+        """Called after a side-effecting tool call; cached reads may be stale now."""
+        self.observations.clear()
+        self.observation_stamps.clear()
+
+    def _observation_bytes(self) -> int:
+        return sum(len(k) + len(v) for k, v in self.observations.items())
+
+    def size_bytes(self) -> int:
+        return len(self.context) + self._observation_bytes() + sum(
+            len(t["user"]) + len(t["answer"]) for t in self.turns
+        )
+
+    def touch(self):
+        self.updated_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "turns": self.turns,
+            "context": self.context,
+            "observations": dict(self.observations),
+            "observation_stamps": self.observation_stamps
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Session':
+        return cls(
+            session_id=data["session_id"],
+            created_at=data.get("created_at", time.time()),
+            updated_at=data.get("updated_at", time.time()),
+            turns=data.get("turns", []),
+            context=data.get("context", ""),
+            observations=data.get("observations", {}),
+            observation_stamps=data.get("observation_stamps", {})
+        )
@@ -0,0 +1,93 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from core.memory.session import Session
+from core.memory.store import MemoryStore, FileMemoryStore
+
+
+class SessionStore:
+    """
+    会话缓存：内存中按 LRU 保存热会话，并通过可插拔的 MemoryStore 持久化。
+    - ttl: 超过 ttl 秒未活动的会话会被淘汰 (内存与持久化副本一起删除)
+    - max_sessions / max_bytes: 内存上限，超出时按 LRU 淘汰 (持久化副本保留，下次访问时重新加载)
+    """
+
+    def __init__(self, memory_store: Optional[MemoryStore] = None, max_sessions: int = 256,
+                 max_bytes: int = 64 * 1024 * 1024, ttl: float = 24 * 3600):
+        self.memory_store = memory_store or FileMemoryStore()
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_valid_id(session_id: str) -> bool:
+        # Session ids become file names in the persistent store
+        return bool(re.fullmatch(r"[A-Za-z0-9_-]{1,64}", session_id or ""))
+
+    def _expired(self, session: Session) -> bool:
+        return time.time() - session.updated_at > self.ttl
+
+    def get(self, session_id: str) -> Optional[Session]:
+        if not self.is_valid_id(session_id):
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                data = self.memory_store.load_session(session_id)
+                if data:
+                    session = Session.from_dict(data)
+                    self._sessions[session_id] = session
+
+            if session is None:
+                return None
+            if self._expired(session):
+                self._drop(session_id, persisted=True)
+                return None
+
+            self._sessions.move_to_end(session_id)
+            self._evict()
+            return session
+
+    def get_or_create(self, session_id: Optional[str] = None) -> Session:
+        if session_id and self.is_valid_id(session_id):
+            session = self.get(session_id)
+            if session:
+                return session
+            session = Session(session_id=session_id)
+        else:
+            session = Session()
+        self.save(session)
+        return session
+
+    def save(self, session: Session):
+        session.touch()
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            self.memory_store.save_session(session.session_id, session.to_dict())
+            self._evict()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._drop(session_id, persisted=True)
+
+    def _drop(self, session_id: str, persisted: bool = False):
+        self._sessions.pop(session_id, None)
+        if persisted:
+            self.memory_store.delete_session(session_id)
+
+    def _evict(self):
+        # 1. TTL
+        for sid in [sid for sid, s in self._sessions.items() if self._expired(s)]:
+            self._drop(sid, persisted=True)
+
+        # 2. LRU by count and total size (memory only; the persisted copy stays)
+        total = sum(s.size_bytes() for s in self._sessions.values())
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or total > self.max_bytes):
+            _, session = self._sessions.popitem(last=False)
+            total -= session.size_bytes()
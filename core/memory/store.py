@@ -1,7 +1,7 @@
 import json
 import os
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Optional, Dict, Any
 from core.memory.checkpoint import Checkpoint
 
 class MemoryStore(ABC):
@@ -21,11 +21,27 @@ class MemoryStore(ABC):
     def has_checkpoint(self, agent_id: str) -> bool:
         pass
 
+    # Sessions (multi-turn chat state)
+    @abstractmethod
+    def save_session(self, session_id: str, data: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def delete_session(self, session_id: str):
+        pass
+
 class FileMemoryStore(MemoryStore):
-    def __init__(self, storage_dir: str = ".memora/checkpoints"):
+    def __init__(self, storage_dir: str = ".memora/checkpoints", session_dir: str = ".memora/sessions"):
         self.storage_dir = storage_dir
         if not os.path.exists(self.storage_dir):
             os.makedirs(self.storage_dir)
+        self.session_dir = session_dir
+        if not os.path.exists(self.session_dir):
+            os.makedirs(self.session_dir)
 
     def _get_file_path(self, agent_id: str) -> str:
         # Sanitize agent_id if needed, assuming simple string for now
@@ -62,3 +78,34 @@ class FileMemoryStore(MemoryStore):
 
     def has_checkpoint(self, agent_id: str) -> bool:
         return os.path.exists(self._get_file_path(agent_id))
+
+    def _get_session_path(self, session_id: str) -> str:
+        return os.path.join(self.session_dir, f"{session_id}.json")
+
+    def save_session(self, session_id: str, data: Dict[str, Any]):
+        file_path = self._get_session_path(session_id)
+        try:
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"[MemoryStore] Failed to save session: {e}")
+
+    def load_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        file_path = self._get_session_path(session_id)
+        if not os.path.exists(file_path):
+            return None
+
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[MemoryStore] Failed to load session: {e}")
+            return None
+
+    def delete_session(self, session_id: str):
+        file_path = self._get_session_path(session_id)
+        if os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except Exception as e:
+                print(f"[MemoryStore] Failed to delete session: {e}")
@@ -0,0 +1,31 @@
+import re
+from typing import List
+
+_WORD_RE = re.compile(r"[A-Za-z0-9_./\-]+")
+_CJK_RE = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+_SPLIT_RE = re.compile(r"[./_\-]+")
+
+
+def tokenize(text: str, split_compound: bool = False) -> List[str]:
+    """
+    轻量分词：英文/数字/路径按词切分，中日韩文字使用字符 bigram。
+    split_compound=True 时，路径和带分隔符的词 (data/sales_2024.xlsx) 额外拆出各个部分，
+    便于按文件名、扩展名等精确检索。
+    """
+    text = (text or "").lower()
+    tokens: List[str] = []
+    for word in _WORD_RE.findall(text):
+        word = word.strip("./-_")
+        if not word:
+            continue
+        tokens.append(word)
+        if split_compound and not word.isalnum():
+            parts = [p for p in _SPLIT_RE.split(word) if p]
+            if len(parts) > 1:
+                tokens.extend(parts)
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
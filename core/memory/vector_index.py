@@ -0,0 +1,192 @@
+import json
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class VectorIndex:
+    """
+    NumPy 向量索引 (内积 = 余弦相似度，要求向量已归一化)。
+
+    - flat 模式：一次矩阵乘法对所有向量打分，argpartition 取 top-k，支持批量查询
+    - IVF 模式：k-means 将向量划分为 nlist 个桶，查询时只扫描最近的 nprobe 个桶
+    - save/load：向量追加写入 float32 原始文件，load 时使用 mmap，启动不需要把整个矩阵读入内存
+    """
+
+    def __init__(self, dim: int, use_ivf: bool = False, nlist: int = 64, nprobe: int = 8,
+                 ivf_min_size: int = 4096):
+        self.dim = dim
+        self.use_ivf = use_ivf
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_min_size = ivf_min_size
+
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+
+        # IVF state
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._lists: Optional[list] = None  # cell -> row ids, built lazily from assignments
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size]
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Append vectors; returns their ids (row numbers)."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        n = len(vectors)
+        start = self._size
+        if start + n > len(self._vectors) or not self._vectors.flags.writeable:
+            # Grow geometrically; also turns a read-only mmap into an in-memory array
+            capacity = max(start + n, 2 * len(self._vectors), 256)
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:start] = self._vectors[:start]
+            self._vectors = grown
+        self._vectors[start:start + n] = vectors
+        self._size += n
+
+        if self.use_ivf:
+            if self._centroids is not None:
+                self._assignments = np.concatenate([self._assignments, self._assign(vectors)])
+                self._lists = None
+            if self._size >= self.ivf_min_size and self._size >= 2 * max(self._trained_size, 1):
+                self.train_ivf()
+        return np.arange(start, start + n)
+
+    # ---------- IVF ----------
+    def train_ivf(self, iterations: int = 10, sample_size: int = 65536, seed: int = 0):
+        data = self.vectors
+        nlist = min(self.nlist, len(data))
+        if nlist == 0:
+            return
+        rng = np.random.default_rng(seed)
+        sample = data if len(data) <= sample_size else data[rng.choice(len(data), sample_size, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    centroids[c] = centroid / norm if norm > 0 else centroid
+
+        self._centroids = centroids.astype(np.float32)
+        self._assignments = self._assign(data)
+        self._lists = None
+        self._trained_size = len(data)
+
+    def _assign(self, vectors: np.ndarray, batch: int = 8192) -> np.ndarray:
+        out = np.empty(len(vectors), dtype=np.int32)
+        for i in range(0, len(vectors), batch):
+            out[i:i + batch] = np.argmax(vectors[i:i + batch] @ self._centroids.T, axis=1)
+        return out
+
+    # ---------- Search ----------
+    def search(self, queries: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batched cosine top-k. Returns (scores, ids), both shaped (n_queries, k');
+        k' <= k when the index is smaller. ids are sorted by descending score.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if self._size == 0 or k <= 0:
+            return np.zeros((len(queries), 0), dtype=np.float32), np.zeros((len(queries), 0), dtype=np.int64)
+
+        if self.use_ivf and self._centroids is not None:
+            return self._search_ivf(queries, k)
+        return self._topk(queries @ self.vectors.T, np.arange(self._size), k)
+
+    def _search_ivf(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        nprobe = min(self.nprobe, len(self._centroids))
+        probes = np.argsort(-(queries @ self._centroids.T), axis=1)[:, :nprobe]
+        all_scores, all_ids = [], []
+        if self._lists is None:
+            order = np.argsort(self._assignments, kind="stable")
+            bounds = np.searchsorted(self._assignments[order], np.arange(len(self._centroids) + 1))
+            self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self._centroids))]
+        for q, cells in zip(queries, probes):
+            candidates = np.concatenate([self._lists[c] for c in cells])
+            if len(candidates) == 0:
+                candidates = np.arange(self._size)
+            scores, ids = self._topk((q @ self.vectors[candidates].T)[None, :], candidates, k)
+            all_scores.append(scores[0])
+            all_ids.append(ids[0])
+        width = min(len(s) for s in all_scores)
+        return np.stack([s[:width] for s in all_scores]), np.stack([i[:width] for i in all_ids])
+
+    @staticmethod
+    def _topk(scores: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, scores.shape[1])
+        if k < scores.shape[1]:
+            part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            part = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+        part_scores = np.take_along_axis(scores, part, axis=1)
+        order = np.argsort(-part_scores, axis=1)
+        top = np.take_along_axis(part, order, axis=1)
+        return np.take_along_axis(scores, top, axis=1), ids[top]
+
+    # ---------- Persistence ----------
+    def save(self, directory: str):
+        """
+        Persist to directory. Vectors live in a raw float32 file that is only appended to,
+        so saving after each small add costs O(new rows), not O(index size).
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "vectors.f32")
+        row_bytes = 4 * self.dim
+        on_disk = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+        if on_disk > self._size:
+            on_disk = 0  # Stale file from another index; rewrite
+        with open(path, "r+b" if on_disk else "wb") as f:
+            f.seek(on_disk * row_bytes)
+            f.truncate()
+            f.write(np.ascontiguousarray(self.vectors[on_disk:]).tobytes())
+
+        meta = {"dim": self.dim, "size": self._size, "use_ivf": self.use_ivf,
+                "nlist": self.nlist, "nprobe": self.nprobe, "trained_size": self._trained_size}
+        if self._centroids is not None:
+            np.save(os.path.join(directory, "centroids.npy"), self._centroids)
+            np.save(os.path.join(directory, "assignments.npy"), self._assignments)
+        tmp = os.path.join(directory, "index.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(directory, "index.json"))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> Optional['VectorIndex']:
+        meta_path = os.path.join(directory, "index.json")
+        path = os.path.join(directory, "vectors.f32")
+        if not os.path.exists(meta_path) or not os.path.exists(path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        dim = meta["dim"]
+        index = cls(dim, use_ivf=meta.get("use_ivf", False),
+                    nlist=meta.get("nlist", 64), nprobe=meta.get("nprobe", 8))
+        rows = min(meta.get("size", 0), os.path.getsize(path) // (4 * dim))
+        if rows > 0:
+            if mmap:
+                # Pages are read lazily by the OS; startup cost does not grow with the index
+                index._vectors = np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim))
+            else:
+                index._vectors = np.fromfile(path, dtype=np.float32, count=rows * dim).reshape(rows, dim)
+        index._size = rows
+
+        centroids_path = os.path.join(directory, "centroids.npy")
+        if index.use_ivf and os.path.exists(centroids_path):
+            assignments = np.load(os.path.join(directory, "assignments.npy"))
+            if len(assignments) == index._size:
+                index._centroids = np.load(centroids_path)
+                index._assignments = assignments
+                index._trained_size = meta.get("trained_size", index._size)
+        return index
@@ -1,30 +1,55 @@
 import json
 import time
 import uuid
-from typing import List, Optional, Dict, Any
+import threading
+from typing import List, Optional, Dict, Any, Callable
 
-from core.state import AgentState
+from core.state import AgentState, RunCancelled
 from core.task import Task
 from core.planner import plan
 from core.writer import write_answer
 from tools.registry import get_tool
-from core.parser import parse_action
+from tools.base import ToolContext, use_tool_context
 from core.trace.collector import TraceCollector
 from core.trace.event import EventType
 from core.memory.checkpoint import Checkpoint
 from core.memory.store import FileMemoryStore, MemoryStore
+from core.memory.session import Session
+from core.memory.long_term import LongTermMemory, get_long_term_memory
+from core.memory.lexical import BM25Index, get_lexical_index
+from core.memory.blob_store import BlobStore, get_blob_store
+from core.image_pipeline import get_image_pipeline
+from llm.router import get_llm
+from core.protocol.event import LLMEvent
 
 class Orchestrator:
-    def __init__(self, user_input: str, model: str = "llama3", agent_id: Optional[str] = None):
+    def __init__(self, user_input: str, model: str = "llama3", agent_id: Optional[str] = None,
+                 session: Optional[Session] = None, long_term_memory: Optional[LongTermMemory] = None,
+                 lexical_index: Optional[BM25Index] = None, blob_store: Optional[BlobStore] = None,
+                 tools: Optional[List[str]] = None):
         self.user_input = user_input
         self.model = model
+        # Tool subset shown to the planner for this run (None = every registered tool);
+        # a task's own tool list takes precedence while that task runs
+        self.tools = tools
         self.state = AgentState.IDLE
+
+        # Multi-turn session (prior turns + cached read-only tool observations)
+        self.session = session
         
         # Agent Identity
         self.agent_id = agent_id or str(uuid.uuid4())
         
         # Memory Store
         self.memory_store = FileMemoryStore()
+
+        # Long-term memory of finished runs (recalled into planner prompts)
+        self.long_term_memory = long_term_memory or get_long_term_memory()
+        # Exact keyword lookup over past execution records (paths, commands, errors)
+        self.lexical_index = lexical_index or get_lexical_index()
+        # Large tool outputs live here; prompts, history, trace and checkpoints keep a preview + handle
+        self.blob_store = blob_store or get_blob_store()
+        self._recall_cache: Dict[str, str] = {}
         
         self.tasks: List[Task] = []
         self.current_task_index = 0
@@ -36,13 +61,93 @@ class Orchestrator:
         # Current Turn Data
         self.current_action: Optional[Dict[str, Any]] = None
         self.current_observation: Optional[str] = None
+        # Images attached by the last tool (base64, already downscaled); sent with the next planner call
+        self.current_images: List[str] = []
         self.final_answer: str = ""
         
         # Trace System
         self.trace = TraceCollector()
 
+        # Streaming listeners for planner/writer tokens: listener(stage, event)
+        self._llm_listeners: List[Callable[[str, LLMEvent], None]] = []
+
+        # Cooperative cancellation (e.g. web client disconnected)
+        self._cancel_event = threading.Event()
+
+        # Pause / steer (set = running, cleared = paused)
+        self._run_event = threading.Event()
+        self._run_event.set()
+        self._guidance_lock = threading.Lock()
+        self._pending_guidance: List[str] = []
+        self.guidance: List[str] = []
+
+    def add_llm_listener(self, listener: Callable[[str, LLMEvent], None]):
+        """Subscribe to planner/writer token events. stage is 'planner' or 'writer'."""
+        self._llm_listeners.append(listener)
+
+    def cancel(self):
+        """Request cancellation. Safe to call from another thread."""
+        self._cancel_event.set()
+        # Wake up a paused run so it can observe the cancellation
+        self._run_event.set()
+
+    def pause(self):
+        """Pause before the next state step. Safe to call from another thread."""
+        self._run_event.clear()
+
+    def resume(self):
+        self._run_event.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._run_event.is_set()
+
+    def inject_guidance(self, text: str):
+        """Queue user guidance; it is added to every planner prompt from the next step on."""
+        with self._guidance_lock:
+            self._pending_guidance.append(text)
+
+    def _wait_if_paused(self):
+        if self._run_event.is_set():
+            return
+        self._save_checkpoint()
+        self.trace.emit(EventType.PAUSED, {"state": self.state.value})
+        self._run_event.wait()
+        self._check_cancelled()
+        self.trace.emit(EventType.RESUMED, {"state": self.state.value})
+
+    def _apply_pending_guidance(self):
+        with self._guidance_lock:
+            pending, self._pending_guidance = self._pending_guidance, []
+        for text in pending:
+            self.guidance.append(text)
+            self.trace.emit(EventType.GUIDANCE, {"text": text})
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def _check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise RunCancelled()
+
+    def _llm_event_handler(self, stage: str) -> Callable[[LLMEvent], None]:
+        """Build the on_event callback passed to planner/writer."""
+        def handler(event: LLMEvent):
+            # Abort the LLM stream as soon as possible once cancelled
+            self._check_cancelled()
+            for listener in self._llm_listeners:
+                try:
+                    listener(stage, event)
+                except Exception as e:
+                    print(f"[Orchestrator] LLM listener error: {e}")
+        return handler
+
     def _save_checkpoint(self):
         """Save current state to MemoryStore"""
+        with self._guidance_lock:
+            # Guidance not yet applied must survive a cancel / crash too
+            guidance = self.guidance + self._pending_guidance
         checkpoint = Checkpoint(
             agent_id=self.agent_id,
             state=self.state.value,
@@ -53,19 +158,30 @@ class Orchestrator:
             trace_events=[e.to_dict() for e in self.trace.get_events()],
             current_action=self.current_action,
             current_observation=self.current_observation,
-            final_answer=self.final_answer
+            final_answer=self.final_answer,
+            user_input=self.user_input,
+            guidance=guidance,
+            session_id=self.session.session_id if self.session else None
         )
         self.memory_store.save_checkpoint(checkpoint)
         # print(f"[System] Checkpoint saved for Agent {self.agent_id}")
 
     @classmethod
-    def load_from_checkpoint(cls, agent_id: str, model: str = "llama3") -> Optional['Orchestrator']:
+    def load_from_checkpoint(cls, agent_id: str, model: str = "llama3",
+                             session: Optional[Session] = None) -> Optional['Orchestrator']:
         """Factory method to restore an Orchestrator from a checkpoint"""
         store = FileMemoryStore()
         checkpoint = store.load_latest_checkpoint(agent_id)
         if not checkpoint:
             return None
-            
+        return cls.from_checkpoint(checkpoint, model=model, session=session)
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint: Checkpoint, model: str = "llama3",
+                        session: Optional[Session] = None) -> 'Orchestrator':
+        """Restore an Orchestrator from an already loaded checkpoint (checkpoint.session_id names its session)"""
+        agent_id = checkpoint.agent_id
+
         # Initialize basic instance
         # Note: We might need to guess user_input or store it in checkpoint. 
         # For now, let's assume user_input is implicitly part of the context or we add it to Checkpoint.
@@ -75,7 +191,8 @@ class Orchestrator:
         # or try to recover it from the first event?
         # Actually, for resuming, we continue from where we left off.
         
-        instance = cls(user_input="[RESUMED SESSION]", model=model, agent_id=agent_id)
+        instance = cls(user_input=checkpoint.user_input or "[RESUMED SESSION]", model=model,
+                       agent_id=agent_id, session=session)
         
         # Restore State
         try:
@@ -90,6 +207,7 @@ class Orchestrator:
         instance.current_action = checkpoint.current_action
         instance.current_observation = checkpoint.current_observation
         instance.final_answer = checkpoint.final_answer
+        instance.guidance = list(checkpoint.guidance)
         
         # Restore Trace
         # We need to manually repopulate trace collector
@@ -145,6 +263,9 @@ class Orchestrator:
             # print(f"\n[State] -> {self.state.value}")
             
             try:
+                self._check_cancelled()
+                self._wait_if_paused()
+
                 if self.state == AgentState.PLANNING:
                     self._handle_planning()
                 
@@ -167,6 +288,10 @@ class Orchestrator:
                 print("\n[System] Interrupted by user. Saving checkpoint...")
                 self._save_checkpoint()
                 return "Interrupted by user."
+            except RunCancelled:
+                print("\n[System] Run cancelled. Saving checkpoint...")
+                self._save_checkpoint()
+                return "Cancelled."
             except Exception as e:
                 print(f"[Error] Exception in state {self.state}: {e}")
                 import traceback
@@ -181,9 +306,51 @@ class Orchestrator:
         # Clear checkpoint on success
         if self.state == AgentState.DONE:
              self.memory_store.clear_checkpoint(self.agent_id)
+             if self.session:
+                 self.session.add_turn(self.user_input, self.final_answer)
+             self._remember()
+             self._index_history(self.execution_history, goal=self.user_input)
             
         return self.final_answer
 
+    def _recall(self, query: str) -> str:
+        """Relevant long-term memories for query, cached for the lifetime of this run."""
+        if query not in self._recall_cache:
+            parts = []
+            try:
+                parts.append(self.long_term_memory.format_for_prompt(query))
+            except Exception as e:
+                print(f"[Orchestrator] Long-term memory recall failed: {e}")
+            try:
+                related = self.lexical_index.format_for_prompt(query)
+                if related:
+                    parts.append(f"[Related past executions]:\n{related}")
+            except Exception as e:
+                print(f"[Orchestrator] Lexical recall failed: {e}")
+            self._recall_cache[query] = "\n".join(p for p in parts if p)
+        return self._recall_cache[query]
+
+    def _index_history(self, records: List[str], goal: str):
+        """Append execution records to the lexical index so later runs (and the recall tool) can find them."""
+        if not records:
+            return
+        meta = {"agent_id": self.agent_id, "goal": goal}
+        try:
+            self.lexical_index.add_many([(r, "task_history", meta) for r in records])
+        except Exception as e:
+            print(f"[Orchestrator] Failed to index execution history: {e}")
+
+    def _remember(self):
+        """Store goals, results and key observations of a successful run."""
+        observations = list(self.execution_history)
+        for t in self.tasks:
+            observations.extend(t.history)
+        try:
+            self.long_term_memory.remember_run(self.user_input, self.final_answer, self.tasks,
+                                               observations, agent_id=self.agent_id)
+        except Exception as e:
+            print(f"[Orchestrator] Failed to store long-term memory: {e}")
+
     def _get_current_task(self) -> Optional[Task]:
         if 0 <= self.current_task_index < len(self.tasks):
             return self.tasks[self.current_task_index]
@@ -194,14 +361,24 @@ class Orchestrator:
         Call Planner to decide next step.
         """
         current_task = self._get_current_task()
+        self._apply_pending_guidance()
         
         if current_task:
             prompt = self._construct_task_prompt(current_task)
             # print(f"[Planner] Planning for Task {current_task.id}...")
         else:
             prompt = self.user_input
+            if self.session and self.session.context:
+                prompt = f"[Conversation so far]:\n{self.session.context}\n\n[Current request]:\n{prompt}"
+            if self.session and self.session.observations:
+                prompt += f"\n\n[Known observations from earlier turns]:\n{self.session.observation_summary()}"
             if self.global_context:
                 prompt += f"\n\n[Context from previous actions]:\n{self.global_context}"
+            if self.guidance:
+                prompt += "\n\n[User guidance]:\n" + "\n".join(f"- {g}" for g in self.guidance)
+            memories = self._recall(self.user_input)
+            if memories:
+                prompt += f"\n\n[Relevant memories from past runs]:\n{memories}"
             # print(f"[Planner] Global Planning...")
 
         # Trace Call
@@ -212,13 +389,17 @@ class Orchestrator:
         })
 
         # Call Planner
-        plan_text = plan(prompt, model=self.model)
-        action = parse_action(plan_text)
+        tools = current_task.tools if current_task and current_task.tools else self.tools
+        output = plan(prompt, model=self.model, on_event=self._llm_event_handler("planner"),
+                      images=self.current_images, tools=tools)
+        self.current_images = []
+        action = output.action
         
         # Trace Output
         self.trace.emit(EventType.PLANNER_OUTPUT, {
-            "raw_text": plan_text,
-            "action": action
+            "raw_text": output.text,
+            "action": action,
+            "structured": output.mode
         })
         
         if not action:
@@ -258,6 +439,8 @@ class Orchestrator:
                     "result": result
                 })
                 
+                self._index_history(current_task.history, goal=current_task.goal)
+
                 # Checkpoint on task completion
                 self._save_checkpoint()
                 
@@ -282,14 +465,18 @@ class Orchestrator:
         # print(f"[Task] Initializing {len(raw_tasks)} tasks...")
         
         for i, t in enumerate(raw_tasks):
+            tools = None
             if isinstance(t, dict):
                 goal = t.get("goal") or t.get("description") or str(t)
                 tid = t.get("id", f"task_{i+1}")
+                tools = t.get("tools") or None
+                if isinstance(tools, str):
+                    tools = [name.strip() for name in tools.split(",") if name.strip()]
             else:
                 goal = str(t)
                 tid = f"task_{i+1}"
             
-            self.tasks.append(Task(tid, goal))
+            self.tasks.append(Task(tid, goal, tools=tools))
             
         self.current_task_index = 0
         self._transition_to(AgentState.TASK_RUNNING)
@@ -313,6 +500,7 @@ class Orchestrator:
             self._save_checkpoint()
             
             self.current_observation = None 
+            self.current_images = []
             self._transition_to(AgentState.PLANNING)
         else:
             # No more tasks
@@ -337,19 +525,53 @@ class Orchestrator:
         # print(f"[Tool] Calling {tool_name} with {args}")
         
         tool = get_tool(tool_name)
+        context = ToolContext(
+            agent_id=self.agent_id,
+            tool_name=tool_name,
+            emit_progress=lambda data: self.trace.emit(EventType.TOOL_PROGRESS, dict(data, tool=tool_name)),
+            model=self.model
+        )
+        cacheable, cache_key, stamps = self._observation_cache_entry(tool, tool_name, args, context)
+        cached = self.session.get_observation(cache_key) if cache_key else None
         if not tool:
             self.current_observation = f"Error: Tool '{tool_name}' not found."
             self.trace.emit(EventType.ERROR, {"error": f"Tool {tool_name} not found"})
+        elif cached is not None:
+            # Same read-only call earlier in this session, files unchanged; reuse its observation
+            self.current_observation = cached
+            self.trace.emit(EventType.TOOL_RESULT, {
+                "tool": tool_name,
+                "result": cached,
+                "cached": True
+            })
         else:
             try:
-                result = tool.run(**args)
-                self.current_observation = f"Tool Output:\n{result}"
+                with use_tool_context(context):
+                    result = str(tool.run(**args))
+                handle = None
+                if tool.compact_output:
+                    result, handle = self.blob_store.compact(result)
+                observation = f"Tool Output:\n{result}"
+                self.current_observation = observation
                 
                 # Trace Tool Result
-                self.trace.emit(EventType.TOOL_RESULT, {
-                    "tool": tool_name,
-                    "result": str(result)
-                })
+                result_event = {"tool": tool_name, "result": result}
+                if handle:
+                    result_event["handle"] = handle
+                images = self._prepare_images(context.images) if context.images else []
+                if images:
+                    result_event["images"] = images
+                tool_stats = tool.stats()
+                if tool_stats:
+                    result_event["stats"] = tool_stats
+                self.trace.emit(EventType.TOOL_RESULT, result_event)
+
+                if self.session:
+                    if not cacheable:
+                        self.session.invalidate_observations()
+                    elif cache_key and context.cacheable:
+                        # Without the "[n image(s) attached]" note: a cache hit attaches no images
+                        self.session.put_observation(cache_key, observation, stamps)
                 
                 # Checkpoint on tool result (side effect confirmed)
                 self._save_checkpoint()
@@ -368,6 +590,51 @@ class Orchestrator:
         else:
             self.execution_history.append(record)
 
+    def _observation_cache_entry(self, tool, tool_name: str, args: Dict[str, Any], context: ToolContext):
+        """
+        (cacheable, cache_key, stamps) for a tool call. cache_key is None when the session has no cache or
+        the result can't be validated against its files; stamps are taken before the call runs.
+        """
+        if not self.session or not tool:
+            return True, None, None
+        try:
+            if not tool.is_cacheable(**args):
+                return False, None, None
+            with use_tool_context(context):
+                paths = tool.cache_paths(**args)
+        except Exception as e:
+            print(f"[Orchestrator] Observation cache skipped for {tool_name}: {e}")
+            return True, None, None
+        if paths is None:
+            return True, None, None
+        return True, Session.observation_key(tool_name, args, paths), Session.file_stamps(paths)
+
+    def _prepare_images(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """Downscale/re-encode images a tool attached so the next planning step can see them."""
+        try:
+            llm = get_llm(self.model)
+        except ValueError:
+            return []
+        if not llm.vision:
+            return []
+        options = llm.image_options or {}
+        encoded = get_image_pipeline().encode_many(
+            paths,
+            max_side=options.get("max_side", 1024),
+            quality=options.get("quality", 85),
+            fmt=options.get("format", "jpeg")
+        )
+        summary = []
+        for path, image in zip(paths, encoded):
+            if image is None:
+                continue
+            self.current_images.append(image.data)
+            summary.append({"path": path, "width": image.width, "height": image.height,
+                            "source_bytes": image.source_bytes, "bytes": image.encoded_bytes})
+        if summary:
+            self.current_observation += f"\n[{len(summary)} image(s) attached for the next step]"
+        return summary
+
     def _handle_observing(self):
         """
         Process observation. 
@@ -393,7 +660,11 @@ class Orchestrator:
             # Direct execution context
             context = self.final_answer or "\n".join(self.execution_history)
 
-        final_output = write_answer(self.user_input, context, model=self.model)
+        if self.session and self.session.context:
+            context = f"[Previous conversation]:\n{self.session.context}\n\n{context}"
+
+        final_output = write_answer(self.user_input, context, model=self.model,
+                                    on_event=self._llm_event_handler("writer"))
         
         self.trace.emit(EventType.WRITER_OUTPUT, {"content": final_output})
         
@@ -406,6 +677,14 @@ class Orchestrator:
         """
         prompt = f"Target Task: {task.goal}\n"
         
+        # Previous turns of the conversation
+        if self.session and self.session.context:
+            prompt += f"\n[Conversation so far]:\n{self.session.context}\n"
+
+        memories = self._recall(task.goal)
+        if memories:
+            prompt += f"\n[Relevant memories from past runs]:\n{memories}\n"
+
         # Global context (completed tasks)
         if self.global_context:
             prompt += f"\n[Background - Completed Tasks Results]:\n{self.global_context}\n"
@@ -417,17 +696,24 @@ class Orchestrator:
             
         if self.current_observation:
              prompt += f"\n[Latest Observation]:\n{self.current_observation}\n"
+
+        if self.guidance:
+            prompt += "\n[User guidance]:\n" + "\n".join(f"- {g}" for g in self.guidance) + "\n"
              
         return prompt
 
-# Compatibility wrapper
-def orchestrate(user_input: str, model: str = "llama3", agent_id: str = None) -> str:
-    # Check for existing checkpoint
+def create_orchestrator(user_input: str, model: str = "llama3", agent_id: str = None,
+                        session: Optional[Session] = None, tools: Optional[List[str]] = None) -> Orchestrator:
+    """Build an Orchestrator, resuming from checkpoint when one exists for agent_id."""
     store = FileMemoryStore()
     if agent_id and store.has_checkpoint(agent_id):
         print(f"[System] Found checkpoint for Agent {agent_id}. Resuming...")
-        orchestrator = Orchestrator.load_from_checkpoint(agent_id, model=model)
-    else:
-        orchestrator = Orchestrator(user_input, model, agent_id)
-        
-    return orchestrator.start()
+        orchestrator = Orchestrator.load_from_checkpoint(agent_id, model=model, session=session)
+        if orchestrator:
+            orchestrator.tools = tools
+            return orchestrator
+    return Orchestrator(user_input, model, agent_id, session=session, tools=tools)
+
+# Compatibility wrapper
+def orchestrate(user_input: str, model: str = "llama3", agent_id: str = None) -> str:
+    return create_orchestrator(user_input, model, agent_id).start()
@@ -2,6 +2,8 @@ import json
 import re
 from typing import Optional, Dict, Any
 
+from core.protocol.response import ToolCall
+
 def parse_action(text: str) -> Optional[Dict[str, Any]]:
     """
     解析 Planner 的输出，提取 Action 结构。
@@ -74,3 +76,23 @@ def parse_action(text: str) -> Optional[Dict[str, Any]]:
              return {"type": "final", "content": text}
 
     return None
+
+# Pseudo-functions offered next to the tools when the planner uses native function calling
+TASK_LIST_FUNCTION = "task_list"
+FINAL_FUNCTION = "final"
+
+def action_from_tool_call(call: ToolCall, text: str = "") -> Dict[str, Any]:
+    """
+    把原生函数调用 (function calling) 直接转换为 Action，无需解析文本：
+    工具函数 -> use_tool，task_list / final 两个伪函数 -> 对应的 Action。
+    text 是模型随函数调用一起输出的文字 (如果有)，作为 reason。
+    """
+    args = dict(call.arguments or {})
+    if call.name == FINAL_FUNCTION:
+        return {"type": "final", "content": str(args.get("content", ""))}
+    if call.name == TASK_LIST_FUNCTION:
+        return {"type": "task_list", "tasks": args.get("tasks") or []}
+    action = {"type": "use_tool", "tool": call.name, "args": args}
+    if text.strip():
+        action["reason"] = text.strip()
+    return action
@@ -1,61 +1,60 @@
+import json
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from llm.base import BaseLLM, STRUCTURED_OUTPUT_MODES
 from llm.router import get_llm
-from core.protocol.request import LLMRequest, Message
+from core.parser import FINAL_FUNCTION, TASK_LIST_FUNCTION, action_from_tool_call, parse_action
+from core.protocol.request import LLMRequest, Message, ToolSpec
+from core.protocol.event import LLMEvent
+from core.state import RunCancelled
+from tools.base import parse_arg_spec
+from tools.registry import get_tool, tool_names
 
-def plan(user_input: str, model: str = "llama3") -> str:
-    """
-    Planner 负责规划任务步骤，必须明确输出 JSON 格式的 Action。
-    """
-    llm = get_llm(model)
+# 任务限定了工具子集时也始终提供 (被截断的观察结果必须仍然可以读取)
+ALWAYS_AVAILABLE_TOOLS = ("read_observation",)
 
-    messages = [
-        Message(role="system", content="""
+# 端点明确表示不支持 tools / response_format 时，该模型在这段时间内改用纯文本 (不修改共享的 llm 配置)
+UNSUPPORTED_STATUS = (400, 404, 422)
+UNSUPPORTED_HINTS = ("tool", "function", "response_format", "json_schema", "schema",
+                     "not support", "unsupported", "not implemented")
+STRUCTURED_DOWNGRADE_SECONDS = 3600
+_structured_downgrades: Dict[str, float] = {}   # llm.name -> monotonic time the downgrade expires
+
+PROMPT_HEADER = """
 你是一个 Agent 系统中的【任务规划模块 Planner】。
 
 你的职责：
 1. 理解用户的目标
 2. 决定下一步该做什么（使用工具 或 结束任务）
-3. 必须输出严格的 JSON 格式，不要包含多余的废话。
+3. 只给出下一步的决定，不要包含多余的废话。
+"""
 
-可用工具：
-- shell: 执行本地命令行 (args: command)
-- file: 读取或写入文件 (args: operation="read"|"write", path="...", content="...")
-  - 支持格式: txt, md, json, csv, xlsx, docx, pptx, jpg/png(只读信息)
-  - 示例: {"type": "use_tool", "tool": "file", "args": {"operation": "read", "path": "data.xlsx"}}
+TOOLS_SECTION = """
+可用工具 (参数名后带 ? 的是可选参数)：
+{tools}
+"""
 
-输出格式要求（请严格遵守）：
+# 纯文本模式：模型输出 ```json 代码块，由 parse_action 解析
+TEXT_FORMAT = """
+输出格式要求（必须是严格的 JSON，请严格遵守）：
 
 情况 1：需要使用工具（单步）
 ```json
-{
-  "type": "use_tool",
-  "tool": "shell",
-  "args": {
-    "command": "ls -la"
-  },
-  "reason": "查看当前目录文件"
-}
+{"type": "use_tool", "tool": "shell", "args": {"command": "ls -la"}, "reason": "查看当前目录文件"}
 ```
 
 情况 2：需要拆解为多步骤任务（Task List）
-当用户问题明显是复杂任务（如分析整个目录、逐个处理文件）时，请输出任务列表：
+当用户问题明显是复杂任务（如分析整个目录、逐个处理文件）时，请输出任务列表。
+每个任务可以是一句话，也可以写成 {"goal": "...", "tools": [...]}，只列出该任务需要的工具：
 ```json
-{
-  "type": "task_list",
-  "tasks": [
-    "列出 document 目录下的所有文件",
-    "逐个读取文件内容",
-    "为每个文件生成摘要",
-    "综合所有摘要给出总体总结"
-  ]
-}
+{"type": "task_list", "tasks": [{"goal": "列出 document 目录下的所有文件", "tools": ["dir"]}, {"goal": "逐个读取文件内容", "tools": ["file"]}, "综合所有内容给出总体总结"]}
 ```
 
 情况 3：任务完成，可以回答用户
 ```json
-{
-  "type": "final",
-  "content": "这里写给用户的最终回答，总结你看到的信息。"
-}
+{"type": "final", "content": "这里写给用户的最终回答，总结你看到的信息。"}
 ```
 
 注意：
@@ -63,24 +62,255 @@ def plan(user_input: str, model: str = "llama3") -> str:
 - 如果是单步任务，则输出 use_tool。
 - 每次只输出一个 JSON 块。
 - 观察结果会由系统在下一步提供给你。
-        """),
-        Message(role="user", content=user_input)
+"""
+
+# JSON 模式 (response_schema)：输出被约束为 action_schema，不需要代码块
+JSON_FORMAT = """
+输出一个 JSON 对象，type 决定其余字段：
+- {"type": "use_tool", "tool": "工具名", "args": {...}, "reason": "简短原因"}：执行一个工具，观察结果会在下一步提供给你
+- {"type": "task_list", "tasks": [{"goal": "...", "tools": ["..."]}]}：问题明显是复杂任务（如分析整个目录、逐个处理文件）时拆解为任务列表，tools 只列出该任务需要的工具
+- {"type": "final", "content": "..."}：任务完成，content 是给用户的最终回答
+优先判断是否需要拆解任务 (task_list)。
+"""
+
+# 函数调用模式 (tools)：工具说明随函数声明发送，System Prompt 中不再重复
+FUNCTION_FORMAT = """
+每一步调用一个函数给出决定：
+- 工具函数：执行该工具，观察结果会在下一步提供给你
+- task_list：问题明显是复杂任务（如分析整个目录、逐个处理文件）时拆解为任务列表，可为每个任务列出需要的工具
+- final：任务完成，content 是给用户的最终回答
+优先判断是否需要拆解任务 (task_list)。
+"""
+
+
+@dataclass
+class PlannerOutput:
+    text: str                          # raw model text (may be empty when the model answered with a function call)
+    action: Optional[Dict[str, Any]]   # the parsed Action; None when the output could not be understood
+    mode: Optional[str] = None         # structured output mode used: tools | json | None (plain text)
+
+
+def _format_arg(name: str, spec: str) -> str:
+    arg = parse_arg_spec(spec)
+    return f"{name}?: {arg.description}" if arg.optional else f"{name}: {spec}"
+
+
+def _examples(tool) -> List[str]:
+    return [json.dumps(example, ensure_ascii=False, separators=(",", ":")) for example in tool.examples]
+
+
+@lru_cache(maxsize=64)
+def tool_section(names: Tuple[str, ...]) -> str:
+    """
+    由注册表中的 name / description / args_schema / examples 生成的工具说明。
+    按工具集合缓存：同一组工具每一步得到完全相同的文本，System Prompt 的前缀缓存 (prompt caching) 才能命中。
+    """
+    lines = []
+    for name in names:
+        tool = get_tool(name)
+        if tool is None:
+            continue
+        lines.append(f"- {tool.name}: {tool.description}")
+        if tool.args_schema:
+            lines.append("  args: " + "; ".join(_format_arg(k, v) for k, v in tool.args_schema.items()))
+        for example in _examples(tool):
+            lines.append("  e.g. " + example)
+    return "\n".join(lines)
+
+
+def select_tools(tools: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """
+    把任务要求的工具子集规范成稳定的 (排序后的) 元组；未指定或全部未知时返回全部工具。
+    """
+    available = tool_names()
+    if not tools:
+        return tuple(available)
+    wanted = {t for t in tools if t in available}
+    if not wanted:
+        return tuple(available)
+    wanted.update(t for t in ALWAYS_AVAILABLE_TOOLS if t in available)
+    return tuple(sorted(wanted))
+
+
+@lru_cache(maxsize=64)
+def system_prompt(names: Tuple[str, ...], mode: Optional[str] = None) -> str:
+    if mode == "tools":
+        return PROMPT_HEADER + FUNCTION_FORMAT
+    tools = TOOLS_SECTION.replace("{tools}", tool_section(names))
+    return PROMPT_HEADER + tools + (JSON_FORMAT if mode == "json" else TEXT_FORMAT)
+
+
+def _task_list_schema(names: Tuple[str, ...]) -> Dict[str, Any]:
+    task = {
+        "type": "object",
+        "properties": {
+            "goal": {"type": "string"},
+            "tools": {"type": "array", "items": {"type": "string", "enum": list(names)}}
+        },
+        "required": ["goal"]
+    }
+    return {"type": "array", "items": task}
+
+
+@lru_cache(maxsize=64)
+def tool_specs(names: Tuple[str, ...]) -> Tuple[ToolSpec, ...]:
+    """
+    函数调用模式的函数声明：注册表中的每个工具 (参数 JSON schema 来自 args_schema)，
+    加上 task_list / final 两个伪函数。同样按工具集合缓存，保证每一步请求完全相同。
+    """
+    specs = []
+    for name in names:
+        if name in (TASK_LIST_FUNCTION, FINAL_FUNCTION):
+            print(f"[Planner] Tool '{name}' clashes with a planner action and is not offered as a function")
+            continue
+        tool = get_tool(name)
+        if tool is None:
+            continue
+        description = tool.description
+        if tool.examples:
+            description += " e.g. " + " | ".join(_examples(tool))
+        specs.append(ToolSpec(tool.name, description, tool.parameters_schema()))
+    specs.append(ToolSpec(
+        TASK_LIST_FUNCTION,
+        "把复杂任务拆解为按顺序执行的任务列表；tools 只列出该任务需要的工具",
+        {"type": "object", "properties": {"tasks": _task_list_schema(names)}, "required": ["tasks"]}
+    ))
+    specs.append(ToolSpec(
+        FINAL_FUNCTION,
+        "任务完成，给出给用户的最终回答",
+        {"type": "object", "properties": {"content": {"type": "string"}}, "required": ["content"]}
+    ))
+    return tuple(specs)
+
+
+@lru_cache(maxsize=64)
+def action_schema(names: Tuple[str, ...]) -> Dict[str, Any]:
+    """JSON 模式下 Action 的 JSON schema (扁平结构，受约束解码的 schema 子集也能表达)。"""
+    return {
+        "type": "object",
+        "properties": {
+            "type": {"type": "string", "enum": ["use_tool", "task_list", "final"]},
+            "tool": {"type": "string", "enum": list(names)},
+            "args": {"type": "object"},
+            "reason": {"type": "string"},
+            "tasks": _task_list_schema(names),
+            "content": {"type": "string"}
+        },
+        "required": ["type"]
+    }
+
+
+def plan(user_input: str, model: str = "llama3",
+         on_event: Optional[Callable[[LLMEvent], None]] = None,
+         images: Optional[List[str]] = None,
+         tools: Optional[Iterable[str]] = None) -> PlannerOutput:
+    """
+    Planner 负责规划任务步骤，返回下一步的 Action。
+    模型支持结构化输出时 (llm.structured_output) 使用原生函数调用或 JSON schema 约束，Action 直接来自结构化结果；
+    否则模型输出 ```json 代码块，由 parse_action 解析。
+    on_event: 可选回调，逐个接收流式 LLMEvent（用于 Web 端实时推送）。
+    images: 可选的 base64 图片 (已由 image_pipeline 缩放/压缩)，随用户消息发送给视觉模型。
+    tools: 可选的工具子集 (工具名)，只向模型展示这些工具；默认展示注册表中的全部工具。
+    """
+    llm = get_llm(model)
+    names = select_tools(tools)
+    mode = llm.structured_output if llm.structured_output in STRUCTURED_OUTPUT_MODES else None
+    if mode is not None and _structured_downgrades.get(llm.name, 0) > time.monotonic():
+        mode = None
+    if mode is None:
+        return _plan(llm, user_input, names, None, on_event, images)
+
+    emitted = False
+    def forward(event: LLMEvent):
+        nonlocal emitted
+        emitted = True
+        if on_event:
+            on_event(event)
+
+    try:
+        return _plan(llm, user_input, names, mode, forward, images)
+    except RunCancelled:
+        raise
+    except Exception as e:
+        if emitted:
+            # Part of the output already reached the client; a retry would stream it twice
+            raise
+        if _rejects_structured_output(e):
+            # The endpoint does not support tools / response_format (e.g. an OpenAI-compatible server without them)
+            print(f"[Planner] {llm.name} rejected structured output ({mode}): {e}; "
+                  f"using plain text for the next {STRUCTURED_DOWNGRADE_SECONDS}s")
+            _structured_downgrades[llm.name] = time.monotonic() + STRUCTURED_DOWNGRADE_SECONDS
+        else:
+            # Rate limits, auth errors, context-length 400s...: plain text for this call only
+            print(f"[Planner] Structured output ({mode}) failed for {llm.name}: {e}; retrying as plain text")
+        return _plan(llm, user_input, names, None, on_event, images)
+
+
+def _rejects_structured_output(e: Exception) -> bool:
+    """True only for errors that say the request shape itself is unsupported (not 429 / 401 / context length)."""
+    if _status_code(e) not in UNSUPPORTED_STATUS:
+        return False
+    message = str(e).lower()
+    if "context" in message and ("length" in message or "window" in message):
+        return False
+    return any(hint in message for hint in UNSUPPORTED_HINTS)
+
+
+def _status_code(e: Exception) -> Optional[int]:
+    """HTTP status of a provider error: status_code (openai / dashscope), response.status_code (requests), code (google.api_core)."""
+    for status in (getattr(e, "status_code", None),
+                   getattr(getattr(e, "response", None), "status_code", None),
+                   getattr(e, "code", None)):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def _plan(llm: BaseLLM, user_input: str, names: Tuple[str, ...], mode: Optional[str],
+          on_event: Optional[Callable[[LLMEvent], None]], images: Optional[List[str]]) -> PlannerOutput:
+    messages = [
+        Message(role="system", content=system_prompt(names, mode)),
+        Message(role="user", content=user_input, images=images or None)
     ]
+    req = LLMRequest(messages=messages, stream=llm.stream_allowed)
+    if mode == "tools":
+        req.tools = list(tool_specs(names))
+        req.tool_choice = "required"
+    elif mode == "json":
+        req.response_schema = action_schema(names)
 
+    calls = []
     # Check if stream is allowed by config
     if llm.stream_allowed:
-        req = LLMRequest(messages=messages, stream=True)
         full_text = ""
         for event in llm.stream(req):
+            if on_event:
+                on_event(event)
             if event.type == "output":
                 print(event.text, end="", flush=True)
                 full_text += event.text
+            elif event.type == "tool" and event.tool_call:
+                print(f"\n[{event.tool_call.name}] {event.text}", end="", flush=True)
+                calls.append(event.tool_call)
             elif event.type == "error":
                 print(f"\nError: {event.text}")
         print() # Newline after stream
-        return full_text
     else:
-        req = LLMRequest(messages=messages, stream=False)
         resp = llm.call(req)
-        print(resp.text) # Print result at once to simulate output
-        return resp.text
+        full_text = resp.text or ""
+        calls = resp.tool_calls or []
+        print(full_text) # Print result at once to simulate output
+        if on_event:
+            on_event(LLMEvent(type="output", source=f"llm:{llm.name}", text=full_text))
+            for call in calls:
+                on_event(LLMEvent(type="tool", source=f"llm:{llm.name}",
+                                  text=json.dumps(call.arguments, ensure_ascii=False), tool_call=call))
+
+    if calls:
+        if len(calls) > 1:
+            print(f"[Planner] Model returned {len(calls)} function calls; using the first")
+        action = action_from_tool_call(calls[0], full_text)
+    else:
+        # Plain-text mode, JSON mode, or a model that answered in text despite the tools
+        action = parse_action(full_text)
+    return PlannerOutput(text=full_text, action=action, mode=mode)
@@ -1,6 +1,9 @@
 from dataclasses import dataclass, field
+from typing import Optional
 import time
 
+from core.protocol.response import ToolCall
+
 @dataclass
 class LLMEvent:
     """
@@ -10,3 +13,5 @@ class LLMEvent:
     source: str      # e.g. llm:qwen3-8b / llm:goapi-gpt4
     text: str = ""
     ts: float = field(default_factory=time.time)
+    # Set on type="tool": a complete function call (streamed argument fragments already joined)
+    tool_call: Optional[ToolCall] = None
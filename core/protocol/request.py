@@ -7,6 +7,13 @@ class Message:
     content: str
     images: Optional[List[str]] = None # Base64 encoded images
 
+@dataclass
+class ToolSpec:
+    """A function the model may call (native function calling); parameters is a JSON schema object."""
+    name: str
+    description: str
+    parameters: dict
+
 @dataclass
 class LLMRequest:
     """
@@ -20,5 +27,10 @@ class LLMRequest:
     temperature: float = 0.7
     max_tokens: Optional[int] = None
 
+    # structured output (adapters map these to the provider's native mechanism)
+    tools: Optional[List[ToolSpec]] = None     # function calling; calls come back as LLMResponse.tool_calls
+    tool_choice: Optional[str] = None          # auto | required (must call one of the tools)
+    response_schema: Optional[dict] = None     # JSON schema the text output must follow (JSON mode)
+
     # extensibility
     metadata: Optional[dict] = None
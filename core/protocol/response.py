@@ -1,5 +1,12 @@
 from dataclasses import dataclass
-from typing import Optional, Any
+from typing import Optional, Any, List
+
+@dataclass
+class ToolCall:
+    """A function call returned by the model (native function calling)."""
+    name: str
+    arguments: dict
+    id: Optional[str] = None
 
 @dataclass
 class LLMResponse:
@@ -9,6 +16,7 @@ class LLMResponse:
     """
     text: str
     thinking: Optional[str] = None
+    tool_calls: Optional[List[ToolCall]] = None
 
     usage: Optional[dict] = None
     raw: Optional[Any] = None
@@ -10,3 +10,7 @@ class AgentState(Enum):
     WRITING = "WRITING"      # Calling Writer for output
     DONE = "DONE"            # Task completed
     ERROR = "ERROR"          # Exception state
+
+class RunCancelled(Exception):
+    """Raised inside the run loop when cancel() has been requested."""
+    pass
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional
+
+from llm.router import call_llm, get_llm
+from core.protocol.request import LLMRequest, Message
+
+SYSTEM_PROMPT = """
+你是一个 Agent 系统中的【文档摘要模块 Summarizer】。
+
+你将收到一段文档片段 (可能是长文档的一部分，或者多段摘要的合并)。
+你的职责：
+1. 提炼其中的关键事实、数字、结论和专有名词 (文件名、人名、日期等)。
+2. 不要编造，不要添加片段中没有的信息。
+3. 直接输出摘要正文，使用与原文相同的语言。
+"""
+
+
+def split_text(text: str, chunk_chars: int) -> List[str]:
+    """Split on paragraph boundaries (blank lines, then lines) into chunks of at most chunk_chars."""
+    blocks = [b for b in re.split(r"\n\s*\n", text) if b.strip()]
+    units: List[str] = []
+    for block in blocks:
+        if len(block) <= chunk_chars:
+            units.append(block)
+            continue
+        for line in block.split("\n"):
+            # A single oversized line is cut hard
+            units.extend(line[i:i + chunk_chars] for i in range(0, len(line), chunk_chars))
+    return pack(units, chunk_chars)
+
+
+def pack(units: List[str], chunk_chars: int, sep: str = "\n\n") -> List[str]:
+    """Greedily pack consecutive units into chunks of at most chunk_chars."""
+    chunks, current, size = [], [], 0
+    for unit in units:
+        if current and size + len(sep) + len(unit) > chunk_chars:
+            chunks.append(sep.join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += len(unit) + (len(sep) if size else 0)
+    if current:
+        chunks.append(sep.join(current))
+    return chunks
+
+
+class MapReduceSummarizer:
+    """
+    超出模型窗口的长文档的 map-reduce 摘要：
+      map    各个片段并发摘要 (通过 router.call_llm，受每个模型的 max_concurrency 限制)
+      reduce 把摘要打包成不超过 chunk_chars 的组再次摘要，逐层归并直到剩下一份
+    每个片段的摘要按 (模型, 指令, 内容) 的 sha256 缓存到磁盘，文档重复处理或部分修改时只重新摘要变化的片段。
+    """
+
+    def __init__(self, model: str, chunk_chars: int = 6000, max_workers: int = 8,
+                 cache_dir: Optional[str] = ".memora/summaries", max_levels: int = 6,
+                 on_progress: Optional[Callable[[dict], None]] = None):
+        self.model = model
+        self.chunk_chars = chunk_chars
+        self.max_workers = max_workers
+        self.cache_dir = cache_dir
+        self.max_levels = max_levels
+        self.on_progress = on_progress
+        # Chunks whose LLM call failed in the last summarize_chunks (raw excerpts were used instead)
+        self.failed = 0
+
+    # ---------- Cache ----------
+    def _cache_path(self, instruction: str, text: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha256(f"{self.model}\0{instruction}\0{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".txt")
+
+    def _cached(self, path: Optional[str]) -> Optional[str]:
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        return None
+
+    def _store(self, path: Optional[str], summary: str):
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(summary)
+        os.replace(tmp, path)
+
+    # ---------- Map / Reduce ----------
+    def _summarize_one(self, text: str, instruction: str) -> str:
+        path = self._cache_path(instruction, text)
+        cached = self._cached(path)
+        if cached is not None:
+            return cached
+        req = LLMRequest(messages=[
+            Message(role="system", content=SYSTEM_PROMPT),
+            Message(role="user", content=f"摘要要求：{instruction}\n\n文档片段：\n{text}")
+        ], stream=False, temperature=0.2)
+        summary = call_llm(self.model, req).text.strip()
+        if summary:
+            self._store(path, summary)
+        return summary
+
+    def _map(self, texts: List[str], instruction: str, level: int) -> List[str]:
+        results: List[Optional[str]] = [None] * len(texts)
+        workers = max(1, min(self.max_workers, len(texts)))
+        failed = 0
+        error = None
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self._summarize_one, t, instruction): i for i, t in enumerate(texts)}
+            done = 0
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    print(f"[Summarizer] Chunk {i} failed: {e}")
+                    failed += 1
+                    error = e
+                    # Keep the reduce step going with a bounded excerpt of the raw chunk
+                    results[i] = texts[i][:self.chunk_chars // 4]
+                done += 1
+                if self.on_progress:
+                    self.on_progress({"level": level, "done": done, "total": len(texts)})
+        if failed == len(texts):
+            # Nothing was summarized (model down?); don't pass raw excerpts off as a summary
+            raise RuntimeError(f"all {failed} chunks failed at level {level}: {error}")
+        self.failed += failed
+        return [r for r in results if r]
+
+    def summarize_chunks(self, chunks: List[str], instruction: str = "概括主要内容") -> str:
+        if not chunks:
+            return ""
+        get_llm(self.model)  # Fail fast on an unknown model instead of once per chunk
+        self.failed = 0
+        summaries = self._map(chunks, instruction, level=0)
+        level = 1
+        while len(summaries) > 1 and level <= self.max_levels:
+            groups = pack(summaries, self.chunk_chars)
+            if len(groups) == len(summaries) and len(groups) > 1:
+                # Summaries are individually too long to pair up; halve them into pairs
+                groups = ["\n\n".join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+            summaries = self._map(groups, f"合并以下多段摘要，去重并保留关键信息。{instruction}", level=level)
+            level += 1
+        return "\n\n".join(summaries)
+
+    def summarize_text(self, text: str, instruction: str = "概括主要内容") -> str:
+        return self.summarize_chunks(split_text(text, self.chunk_chars), instruction)
@@ -1,9 +1,11 @@
 from typing import Optional, List, Dict, Any
 
 class Task:
-    def __init__(self, id: str, goal: str):
+    def __init__(self, id: str, goal: str, tools: Optional[List[str]] = None):
         self.id = id
         self.goal = goal
+        # Tools the planner sees while working on this task (None = all tools)
+        self.tools = tools
         self.status = "pending"  # pending, running, completed, failed
         self.result = ""
         self.history: List[str] = [] # Execution history for this task
@@ -31,12 +33,13 @@ class Task:
             "goal": self.goal,
             "status": self.status,
             "result": self.result,
-            "history": self.history
+            "history": self.history,
+            "tools": self.tools
         }
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Task':
-        task = cls(id=data["id"], goal=data["goal"])
+        task = cls(id=data["id"], goal=data["goal"], tools=data.get("tools"))
         task.status = data.get("status", "pending")
         task.result = data.get("result", "")
         task.history = data.get("history", [])
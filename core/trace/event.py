@@ -27,6 +27,10 @@ class EventType:
     TASK_END = "TASK_END"
     TOOL_CALL = "TOOL_CALL"
     TOOL_RESULT = "TOOL_RESULT"
+    TOOL_PROGRESS = "TOOL_PROGRESS"
     WRITER_CALL = "WRITER_CALL"
     WRITER_OUTPUT = "WRITER_OUTPUT"
+    PAUSED = "PAUSED"
+    RESUMED = "RESUMED"
+    GUIDANCE = "GUIDANCE"
     ERROR = "ERROR"
@@ -1,12 +1,28 @@
+from typing import Callable, Optional
 from llm.router import get_llm
 from core.protocol.request import LLMRequest, Message
+from core.protocol.event import LLMEvent
+from core.summarizer import MapReduceSummarizer
 
-def write_answer(user_question: str, context: str, model: str = "llama3") -> str:
+def write_answer(user_question: str, context: str, model: str = "llama3",
+                 on_event: Optional[Callable[[LLMEvent], None]] = None,
+                 max_context_chars: int = 24000) -> str:
     """
     Writer 负责生成最终回答，只负责输出，不负责决策。
+    on_event: 可选回调，逐个接收流式 LLMEvent。
+    max_context_chars: 任务结果汇总超过该长度时，先用 map-reduce 摘要压缩，避免超出模型窗口。
     """
     llm = get_llm(model)
 
+    if len(context) > max_context_chars:
+        summarizer = MapReduceSummarizer(model, chunk_chars=max(max_context_chars // 4, 2000))
+        try:
+            context = summarizer.summarize_text(context, instruction=f"保留回答以下问题所需的事实和数据：{user_question}")
+        except RuntimeError as e:
+            # Every chunk failed; answer from the start of the raw results rather than not at all
+            print(f"[Writer] Summarizing the task results failed: {e}; truncating to {max_context_chars} chars")
+            context = context[:max_context_chars] + f"\n...(truncated, {len(context) - max_context_chars} more chars)"
+
     messages = [
         Message(role="system", content="""
 你是一个 Agent 系统中的【结果生成模块 Writer】。
@@ -38,6 +54,8 @@ def write_answer(user_question: str, context: str, model: str = "llama3") -> str
         req = LLMRequest(messages=messages, stream=True)
         full_text = ""
         for event in llm.stream(req):
+            if on_event:
+                on_event(event)
             if event.type == "output":
                 print(event.text, end="", flush=True)
                 full_text += event.text
@@ -49,4 +67,6 @@ def write_answer(user_question: str, context: str, model: str = "llama3") -> str
         req = LLMRequest(messages=messages, stream=False)
         resp = llm.call(req)
         print(resp.text)
+        if on_event:
+            on_event(LLMEvent(type="output", source=f"llm:{llm.name}", text=resp.text))
         return resp.text
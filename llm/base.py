@@ -1,15 +1,85 @@
-from typing import Generator, Optional
-from core.protocol.request import LLMRequest
-from core.protocol.response import LLMResponse
+import json
+from typing import Dict, Generator, List, Optional, Union
+from core.protocol.request import LLMRequest, Message, ToolSpec
+from core.protocol.response import LLMResponse, ToolCall
 from core.protocol.event import LLMEvent
 
+# Structured output modes (config key structured_output):
+#   tools: native function calling (LLMRequest.tools); json: JSON-schema constrained text (LLMRequest.response_schema)
+STRUCTURED_OUTPUT_MODES = ("tools", "json")
+
 class BaseLLM:
     name: str
     description: Optional[str] = None
     stream_allowed: bool = True
+    # Vision support and how images are prepared for it (config keys vision / image_*)
+    vision: bool = False
+    image_options: Optional[dict] = None
+    # Preferred structured output mode (one of STRUCTURED_OUTPUT_MODES) or None for plain text;
+    # adapters set their provider default, config key structured_output overrides it
+    structured_output: Optional[str] = None
 
     def call(self, req: LLMRequest) -> LLMResponse:
         raise NotImplementedError
 
     def stream(self, req: LLMRequest) -> Generator[LLMEvent, None, None]:
         raise NotImplementedError
+
+# Leading base64 characters of the formats the image pipeline produces (plus PNG/GIF from other sources)
+_IMAGE_MIME_PREFIXES = {"/9j/": "image/jpeg", "UklGR": "image/webp", "iVBOR": "image/png", "R0lGOD": "image/gif"}
+
+def openai_content(m: Message) -> Union[str, list]:
+    """OpenAI-compatible message content: plain text, or text + image_url parts when images are attached."""
+    if not m.images:
+        return m.content
+    parts = [{"type": "text", "text": m.content}]
+    for data in m.images:
+        mime = next((t for p, t in _IMAGE_MIME_PREFIXES.items() if data.startswith(p)), "image/jpeg")
+        parts.append({"type": "image_url", "image_url": {"url": f"data:{mime};base64,{data}"}})
+    return parts
+
+def openai_tools(specs: List[ToolSpec]) -> List[dict]:
+    """ToolSpecs in the OpenAI "tools" format (also used by DashScope and OpenAI-compatible gateways)."""
+    return [{"type": "function", "function": {"name": t.name, "description": t.description, "parameters": t.parameters}}
+            for t in specs]
+
+def parse_tool_arguments(text: Union[str, dict, None]) -> dict:
+    if isinstance(text, dict):
+        return text
+    if not text:
+        return {}
+    try:
+        args = json.loads(text)
+    except json.JSONDecodeError as e:
+        print(f"[LLM] Could not parse tool call arguments ({e}): {text[:200]}")
+        return {}
+    return args if isinstance(args, dict) else {}
+
+class ToolCallBuffer:
+    """Joins streamed OpenAI-style tool call deltas: id / name once, arguments in fragments, keyed by index."""
+
+    def __init__(self):
+        self._calls: Dict[int, dict] = {}
+
+    def add(self, delta: dict):
+        call = self._calls.setdefault(delta.get("index") or 0, {"id": None, "name": "", "arguments": ""})
+        if delta.get("id"):
+            call["id"] = delta["id"]
+        function = delta.get("function") or {}
+        if function.get("name") and not call["name"]:
+            call["name"] = function["name"]
+        fragment = function.get("arguments")
+        if fragment:
+            # Some providers resend the whole argument string so far instead of the new fragment
+            if call["arguments"] and fragment.startswith(call["arguments"]):
+                call["arguments"] = fragment
+            else:
+                call["arguments"] += fragment
+
+    def calls(self) -> List[ToolCall]:
+        return [ToolCall(name=c["name"], arguments=parse_tool_arguments(c["arguments"]), id=c["id"])
+                for _, c in sorted(self._calls.items()) if c["name"]]
+
+    def events(self, source: str) -> List[LLMEvent]:
+        return [LLMEvent(type="tool", source=source, text=json.dumps(call.arguments, ensure_ascii=False),
+                         tool_call=call) for call in self.calls()]
@@ -1,13 +1,15 @@
 import dashscope
 import time
 from http import HTTPStatus
-from typing import Generator, List, Dict
+from typing import Any, Generator, List, Dict
 from core.protocol.request import LLMRequest, Message
-from core.protocol.response import LLMResponse
+from core.protocol.response import LLMResponse, ToolCall
 from core.protocol.event import LLMEvent
-from llm.base import BaseLLM
+from llm.base import BaseLLM, ToolCallBuffer, openai_tools, parse_tool_arguments
 
 class DashScopeLLM(BaseLLM):
+    structured_output = "tools"
+
     def __init__(self, api_key: str, model: str):
         dashscope.api_key = api_key
         self.model = model
@@ -15,6 +17,16 @@ class DashScopeLLM(BaseLLM):
     def _convert_messages(self, messages: List[Message]) -> List[Dict[str, str]]:
         return [{"role": m.role, "content": m.content} for m in messages]
 
+    @staticmethod
+    def _structured_options(req: LLMRequest) -> Dict[str, Any]:
+        options = {}
+        if req.tools:
+            # DashScope tool_choice only knows auto / none / a named function, not "required"
+            options["tools"] = openai_tools(req.tools)
+        if req.response_schema is not None:
+            options["response_format"] = {"type": "json_object"}
+        return options
+
     def call(self, req: LLMRequest) -> LLMResponse:
         messages = self._convert_messages(req.messages)
         
@@ -22,16 +34,22 @@ class DashScopeLLM(BaseLLM):
             model=self.model,
             messages=messages,
             temperature=req.temperature,
-            result_format='message'
+            result_format='message',
+            **self._structured_options(req)
         )
         
         if response.status_code == HTTPStatus.OK:
-            text = response.output.choices[0].message.content
+            message = response.output.choices[0].message
+            text = message.content or ""
             usage = response.usage
+            tool_calls = [ToolCall(name=tc["function"]["name"], arguments=parse_tool_arguments(tc["function"].get("arguments")),
+                                   id=tc.get("id"))
+                          for tc in message.get("tool_calls") or []]
             return LLMResponse(
                 text=text,
                 raw=response,
-                usage=usage
+                usage=usage,
+                tool_calls=tool_calls or None
             )
         else:
             raise Exception(f"DashScope Error: {response.code} - {response.message}")
@@ -45,12 +63,17 @@ class DashScopeLLM(BaseLLM):
             result_format='message',
             stream=True,
             output_in_full_message=False, # Incremental output
-            temperature=req.temperature
+            temperature=req.temperature,
+            **self._structured_options(req)
         )
         
+        calls = ToolCallBuffer()
         for response in responses:
             if response.status_code == HTTPStatus.OK:
-                delta = response.output.choices[0].message.content
+                message = response.output.choices[0].message
+                for tc in message.get("tool_calls") or []:
+                    calls.add(tc)
+                delta = message.content
                 if delta:
                     yield LLMEvent(
                         type="output",
@@ -66,4 +89,5 @@ class DashScopeLLM(BaseLLM):
                     ts=time.time()
                 )
         
+        yield from calls.events(f"llm:{self.name}")
         yield LLMEvent(type="done", source=f"llm:{self.name}", text="", ts=time.time())
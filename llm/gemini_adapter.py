@@ -1,12 +1,25 @@
 import google.generativeai as genai
+import json
 import time
-from typing import Generator, List
+from typing import Any, Generator, List, Tuple
 from core.protocol.request import LLMRequest, Message
-from core.protocol.response import LLMResponse
+from core.protocol.response import LLMResponse, ToolCall
 from core.protocol.event import LLMEvent
 from llm.base import BaseLLM
 
+def _plain(value: Any) -> Any:
+    """Function call args arrive as a protobuf Struct, where every number is a float."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
 class GeminiLLM(BaseLLM):
+    structured_output = "tools"
+
     def __init__(self, api_key: str, model: str):
         genai.configure(api_key=api_key)
         self.model_name = model
@@ -29,6 +42,36 @@ class GeminiLLM(BaseLLM):
                 
         return history, system_instruction
 
+    def _model(self, req: LLMRequest, system_instruction):
+        options = {}
+        if req.tools:
+            # Function declarations take the OpenAPI subset of JSON schema (type / description / enum / items / properties / required)
+            options["tools"] = [{"function_declarations": [
+                {"name": t.name, "description": t.description, "parameters": t.parameters} for t in req.tools
+            ]}]
+            mode = "ANY" if req.tool_choice == "required" else "AUTO"
+            options["tool_config"] = {"function_calling_config": {"mode": mode}}
+        return genai.GenerativeModel(self.model_name, system_instruction=system_instruction, **options)
+
+    @staticmethod
+    def _generation_config(req: LLMRequest):
+        options = {}
+        if req.response_schema is not None:
+            # JSON mode; the action schema is described in the prompt (Gemini's schema subset has no free-form objects)
+            options["response_mime_type"] = "application/json"
+        return genai.types.GenerationConfig(temperature=req.temperature, max_output_tokens=req.max_tokens, **options)
+
+    @staticmethod
+    def _split_parts(parts) -> Tuple[str, List[ToolCall]]:
+        text, calls = "", []
+        for part in parts:
+            if part.function_call and part.function_call.name:
+                args = type(part).to_dict(part)["function_call"].get("args") or {}
+                calls.append(ToolCall(name=part.function_call.name, arguments=_plain(args)))
+            elif part.text:
+                text += part.text
+        return text, calls
+
     def call(self, req: LLMRequest) -> LLMResponse:
         history, sys_inst = self._convert_history(req.messages)
         
@@ -43,40 +86,47 @@ class GeminiLLM(BaseLLM):
         if not history:
             return LLMResponse(text="Error: No messages provided")
 
-        # Re-instantiate with system instruction if present
-        model = genai.GenerativeModel(self.model_name, system_instruction=sys_inst)
+        # Re-instantiate with system instruction (and function declarations) if present
+        model = self._model(req, sys_inst)
         
         chat = model.start_chat(history=history[:-1])
         response = chat.send_message(history[-1]["parts"][0], 
-                                     generation_config=genai.types.GenerationConfig(
-                                         temperature=req.temperature,
-                                         max_output_tokens=req.max_tokens
-                                     ))
+                                     generation_config=self._generation_config(req))
+        # response.text raises when the reply is a function call, so read the parts
+        text, calls = self._split_parts(response.parts)
         
         return LLMResponse(
-            text=response.text,
-            raw=response.to_dict()
+            text=text,
+            raw=response.to_dict(),
+            tool_calls=calls or None
         )
 
     def stream(self, req: LLMRequest) -> Generator[LLMEvent, None, None]:
         history, sys_inst = self._convert_history(req.messages)
-        model = genai.GenerativeModel(self.model_name, system_instruction=sys_inst)
+        model = self._model(req, sys_inst)
         
         chat = model.start_chat(history=history[:-1])
         response = chat.send_message(history[-1]["parts"][0], 
                                      stream=True,
-                                     generation_config=genai.types.GenerationConfig(
-                                         temperature=req.temperature,
-                                         max_output_tokens=req.max_tokens
-                                     ))
+                                     generation_config=self._generation_config(req))
         
         for chunk in response:
-            if chunk.text:
+            text, calls = self._split_parts(chunk.parts)
+            if text:
                 yield LLMEvent(
                     type="output",
                     source=f"llm:{self.name}",
-                    text=chunk.text,
+                    text=text,
                     ts=time.time()
                 )
+            for call in calls:
+                # Gemini streams each function call whole
+                yield LLMEvent(
+                    type="tool",
+                    source=f"llm:{self.name}",
+                    text=json.dumps(call.arguments, ensure_ascii=False),
+                    ts=time.time(),
+                    tool_call=call
+                )
         
         yield LLMEvent(type="done", source=f"llm:{self.name}", text="", ts=time.time())
@@ -1,13 +1,15 @@
 import requests
 import json
 import time
-from typing import Generator, List, Dict
+from typing import Any, Generator, List, Dict
 from core.protocol.request import LLMRequest, Message
-from core.protocol.response import LLMResponse
+from core.protocol.response import LLMResponse, ToolCall
 from core.protocol.event import LLMEvent
-from llm.base import BaseLLM
+from llm.base import BaseLLM, ToolCallBuffer, openai_content, openai_tools, parse_tool_arguments
 
 class GoAPILLM(BaseLLM):
+    structured_output = "tools"
+
     def __init__(self, base_url: str, api_key: str, model: str):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
@@ -21,7 +23,17 @@ class GoAPILLM(BaseLLM):
         }
 
     def _convert_messages(self, messages: List[Message]) -> List[Dict[str, str]]:
-        return [{"role": m.role, "content": m.content} for m in messages]
+        return [{"role": m.role, "content": openai_content(m)} for m in messages]
+
+    def _add_structured_options(self, payload: Dict[str, Any], req: LLMRequest):
+        if req.tools:
+            payload["tools"] = openai_tools(req.tools)
+            if req.tool_choice:
+                payload["tool_choice"] = req.tool_choice
+        if req.response_schema is not None:
+            # OpenAI-compatible gateways widely support JSON mode but not always json_schema;
+            # the schema itself is described in the prompt
+            payload["response_format"] = {"type": "json_object"}
 
     def call(self, req: LLMRequest) -> LLMResponse:
         payload = {
@@ -32,19 +44,26 @@ class GoAPILLM(BaseLLM):
         }
         if req.max_tokens:
             payload["max_tokens"] = req.max_tokens
+        self._add_structured_options(payload, req)
 
         resp = requests.post(self.url, headers=self._get_headers(), json=payload, timeout=120)
         resp.raise_for_status()
         data = resp.json()
         
         text = ""
+        tool_calls = []
         if "choices" in data and len(data["choices"]) > 0:
-            text = data["choices"][0].get("message", {}).get("content", "")
+            message = data["choices"][0].get("message", {})
+            text = message.get("content") or ""
+            tool_calls = [ToolCall(name=tc["function"]["name"], arguments=parse_tool_arguments(tc["function"].get("arguments")),
+                                   id=tc.get("id"))
+                          for tc in message.get("tool_calls") or []]
 
         return LLMResponse(
             text=text,
             raw=data,
-            usage=data.get("usage")
+            usage=data.get("usage"),
+            tool_calls=tool_calls or None
         )
 
     def stream(self, req: LLMRequest) -> Generator[LLMEvent, None, None]:
@@ -56,10 +75,12 @@ class GoAPILLM(BaseLLM):
         }
         if req.max_tokens:
             payload["max_tokens"] = req.max_tokens
+        self._add_structured_options(payload, req)
 
         resp = requests.post(self.url, headers=self._get_headers(), json=payload, stream=True, timeout=300)
         resp.raise_for_status()
 
+        calls = ToolCallBuffer()
         for line in resp.iter_lines():
             if not line:
                 continue
@@ -69,6 +90,7 @@ class GoAPILLM(BaseLLM):
                 decoded = decoded[len("data:"):].strip()
             
             if decoded == "[DONE]":
+                yield from calls.events(f"llm:{self.name}")
                 yield LLMEvent(
                     type="done", 
                     source=f"llm:{self.name}", 
@@ -79,13 +101,16 @@ class GoAPILLM(BaseLLM):
                 
             try:
                 chunk = json.loads(decoded)
-                delta = chunk.get("choices", [{}])[0].get("delta", {}).get("content")
-                
-                if delta:
+                delta = chunk.get("choices", [{}])[0].get("delta", {})
+                for tc in delta.get("tool_calls") or []:
+                    calls.add(tc)
+                content = delta.get("content")
+
+                if content:
                     yield LLMEvent(
                         type="output",
                         source=f"llm:{self.name}",
-                        text=delta,
+                        text=content,
                         ts=time.time()
                     )
             except Exception as e:
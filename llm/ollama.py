@@ -3,11 +3,14 @@ import json
 import time
 from typing import Generator, List, Dict, Any
 from core.protocol.request import LLMRequest, Message
-from core.protocol.response import LLMResponse
+from core.protocol.response import LLMResponse, ToolCall
 from core.protocol.event import LLMEvent
-from llm.base import BaseLLM
+from llm.base import BaseLLM, openai_tools, parse_tool_arguments
 
 class OllamaLLM(BaseLLM):
+    # Ollama constrains the output to a JSON schema via "format" (grammar-based sampling)
+    structured_output = "json"
+
     def __init__(self, base_url: str, model: str):
         self.base_url = base_url.rstrip('/')
         self.model = model
@@ -22,6 +25,19 @@ class OllamaLLM(BaseLLM):
             converted.append(msg)
         return converted
 
+    @staticmethod
+    def _add_structured_options(payload: Dict[str, Any], req: LLMRequest):
+        if req.response_schema is not None:
+            payload["format"] = req.response_schema
+        if req.tools:
+            # Ollama has no tool_choice; the model may still answer in plain text
+            payload["tools"] = openai_tools(req.tools)
+
+    @staticmethod
+    def _tool_calls(message: Dict[str, Any]) -> List[ToolCall]:
+        return [ToolCall(name=tc["function"]["name"], arguments=parse_tool_arguments(tc["function"].get("arguments")))
+                for tc in message.get("tool_calls") or []]
+
     def call(self, req: LLMRequest) -> LLMResponse:
         payload = {
             "model": self.model,
@@ -34,6 +50,7 @@ class OllamaLLM(BaseLLM):
         
         if req.max_tokens:
             payload["options"]["num_predict"] = req.max_tokens
+        self._add_structured_options(payload, req)
 
         resp = requests.post(self.url, json=payload, timeout=120)
         resp.raise_for_status()
@@ -44,10 +61,12 @@ class OllamaLLM(BaseLLM):
             "eval_count": data.get("eval_count", 0)
         }
 
+        message = data.get("message", {})
         return LLMResponse(
-            text=data.get("message", {}).get("content", ""),
+            text=message.get("content", ""),
             usage=usage,
-            raw=data
+            raw=data,
+            tool_calls=self._tool_calls(message) or None
         )
 
     def stream(self, req: LLMRequest) -> Generator[LLMEvent, None, None]:
@@ -62,6 +81,7 @@ class OllamaLLM(BaseLLM):
 
         if req.max_tokens:
             payload["options"]["num_predict"] = req.max_tokens
+        self._add_structured_options(payload, req)
         
         resp = requests.post(self.url, json=payload, stream=True, timeout=300)
         resp.raise_for_status()
@@ -72,6 +92,16 @@ class OllamaLLM(BaseLLM):
             try:
                 data = json.loads(line.decode("utf-8"))
                 
+                for call in self._tool_calls(data.get("message", {})):
+                    # Ollama sends each tool call complete in one chunk
+                    yield LLMEvent(
+                        type="tool",
+                        source=f"llm:{self.name}",
+                        text=json.dumps(call.arguments, ensure_ascii=False),
+                        ts=time.time(),
+                        tool_call=call
+                    )
+
                 if "message" in data and "content" in data["message"]:
                     content = data["message"]["content"]
                     if content:
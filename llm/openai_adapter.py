@@ -1,59 +1,87 @@
 import openai
 import time
-from typing import Generator, List, Dict
+from typing import Any, Dict, Generator, List
 from core.protocol.request import LLMRequest, Message
-from core.protocol.response import LLMResponse
+from core.protocol.response import LLMResponse, ToolCall
 from core.protocol.event import LLMEvent
-from llm.base import BaseLLM
+from llm.base import BaseLLM, ToolCallBuffer, openai_content, openai_tools, parse_tool_arguments
 
 class OpenAILLM(BaseLLM):
+    structured_output = "tools"
+
     def __init__(self, api_key: str, model: str, base_url: str = None):
         self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
         self.model = model
 
     def _convert_messages(self, messages: List[Message]) -> List[Dict[str, str]]:
         # OpenAI style messages
-        return [{"role": m.role, "content": m.content} for m in messages]
+        return [{"role": m.role, "content": openai_content(m)} for m in messages]
+
+    def _structured_options(self, req: LLMRequest) -> Dict[str, Any]:
+        options = {}
+        if req.tools:
+            options["tools"] = openai_tools(req.tools)
+            options["parallel_tool_calls"] = False
+            if req.tool_choice:
+                options["tool_choice"] = req.tool_choice
+        if req.response_schema is not None:
+            options["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "response", "schema": req.response_schema}
+            }
+        return options
 
     def call(self, req: LLMRequest) -> LLMResponse:
         messages = self._convert_messages(req.messages)
-        
+
         response = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             temperature=req.temperature,
             max_tokens=req.max_tokens,
-            stream=False
+            stream=False,
+            **self._structured_options(req)
         )
-        
-        text = response.choices[0].message.content
+
+        message = response.choices[0].message
+        text = message.content or ""
         usage = response.usage.model_dump() if response.usage else None
-        
+        tool_calls = [ToolCall(name=tc.function.name, arguments=parse_tool_arguments(tc.function.arguments), id=tc.id)
+                      for tc in message.tool_calls or []]
+
         return LLMResponse(
             text=text,
             raw=response.model_dump(),
-            usage=usage
+            usage=usage,
+            tool_calls=tool_calls or None
         )
 
     def stream(self, req: LLMRequest) -> Generator[LLMEvent, None, None]:
         messages = self._convert_messages(req.messages)
-        
+
         stream = self.client.chat.completions.create(
             model=self.model,
             messages=messages,
             temperature=req.temperature,
             max_tokens=req.max_tokens,
-            stream=True
+            stream=True,
+            **self._structured_options(req)
         )
-        
+
+        calls = ToolCallBuffer()
         for chunk in stream:
-            delta = chunk.choices[0].delta.content
-            if delta:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            for tc in delta.tool_calls or []:
+                calls.add(tc.model_dump())
+            if delta.content:
                 yield LLMEvent(
                     type="output",
                     source=f"llm:{self.name}",
-                    text=delta,
+                    text=delta.content,
                     ts=time.time()
                 )
-        
+
+        yield from calls.events(f"llm:{self.name}")
         yield LLMEvent(type="done", source=f"llm:{self.name}", text="", ts=time.time())
@@ -1,9 +1,12 @@
 import os
 import json
 import re
+import threading
 from typing import Dict, Any, List
 
-from llm.base import BaseLLM
+from core.protocol.request import LLMRequest
+from core.protocol.response import LLMResponse
+from llm.base import BaseLLM, STRUCTURED_OUTPUT_MODES
 from llm.ollama import OllamaLLM
 from llm.goapi import GoAPILLM
 from llm.openai_adapter import OpenAILLM
@@ -13,10 +16,17 @@ from llm.dashscope_adapter import DashScopeLLM
 # ====== Global Singleton ======
 _router = None
 
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_IMAGE_OPTIONS = {"max_side": 1024, "quality": 85, "format": "jpeg"}
+
 class LLMRouter:
     def __init__(self, config_path: str = "config.json"):
         self.models: Dict[str, BaseLLM] = {}
+        # Per-model limit on in-flight requests made through call() (fan-out stages such as map-reduce)
+        self.limits: Dict[str, threading.BoundedSemaphore] = {}
         self.config_path = config_path
+        # Per-tool options from the "tools" section of the config (e.g. the python kernel preload list)
+        self.tool_options: Dict[str, Dict[str, Any]] = {}
         self._load_config()
 
     def _load_config(self):
@@ -40,6 +50,8 @@ class LLMRouter:
             print(f"Error parsing config: {e}")
             return
 
+        self.tool_options = config.get("tools", {})
+
         for llm_id, conf in config.get("llms", {}).items():
             provider = conf.get("provider")
             description = conf.get("description", llm_id)
@@ -80,13 +92,34 @@ class LLMRouter:
                 llm.name = llm_id
                 llm.description = description
                 llm.stream_allowed = stream_allowed
+                llm.vision = bool(conf.get("vision", False))
+                llm.image_options = {
+                    "max_side": int(conf.get("image_max_side", DEFAULT_IMAGE_OPTIONS["max_side"])),
+                    "quality": int(conf.get("image_quality", DEFAULT_IMAGE_OPTIONS["quality"])),
+                    "format": conf.get("image_format", DEFAULT_IMAGE_OPTIONS["format"])
+                }
+                if "structured_output" in conf:
+                    # "tools" | "json" | false (plain text + fenced JSON); default depends on the provider
+                    mode = conf["structured_output"]
+                    if mode and mode not in STRUCTURED_OUTPUT_MODES:
+                        print(f"[Router] Unknown structured_output '{mode}' for {llm_id}; using plain text")
+                    llm.structured_output = mode if mode in STRUCTURED_OUTPUT_MODES else None
                 self.models[llm_id] = llm
+                self.limits[llm_id] = threading.BoundedSemaphore(
+                    int(conf.get("max_concurrency", DEFAULT_MAX_CONCURRENCY)))
 
     def get_llm(self, name: str) -> BaseLLM:
         if name not in self.models:
             raise ValueError(f"Unknown LLM: {name}. Available: {list(self.models.keys())}")
         return self.models[name]
 
+    def call(self, name: str, req: LLMRequest) -> LLMResponse:
+        """Non-streaming call that waits for a free slot under the model's max_concurrency."""
+        llm = self.get_llm(name)
+        limit = self.limits.setdefault(name, threading.BoundedSemaphore(DEFAULT_MAX_CONCURRENCY))
+        with limit:
+            return llm.call(req)
+
     def list_models(self) -> List[Dict[str, str]]:
         """Return a list of available models with metadata"""
         return [
@@ -102,10 +135,19 @@ def _ensure_router():
         _router = LLMRouter(config_path)
     return _router
 
+def get_tool_options(name: str) -> Dict[str, Any]:
+    """Options for one tool from the config's "tools" section; {} when not configured."""
+    router = _ensure_router()
+    return getattr(router, "tool_options", {}).get(name) or {}
+
 def get_llm(name: str = "llama3") -> BaseLLM:
     router = _ensure_router()
     return router.get_llm(name)
 
+def call_llm(name: str, req: LLMRequest) -> LLMResponse:
+    router = _ensure_router()
+    return router.call(name, req)
+
 def list_models() -> List[Dict[str, str]]:
     router = _ensure_router()
     return router.list_models()
@@ -0,0 +1,123 @@
+import csv
+import json
+import os
+
+import pytest
+
+from tools.file import FileTool
+
+
+@pytest.fixture
+def tool(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return FileTool()
+
+
+def write_chunk(tool, path, content, final=False):
+    return tool.run("write", path, content, mode="chunk", final=final)
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_csv_chunks_reuse_the_first_header(tool):
+    assert write_chunk(tool, "out.csv", "a,b\n1,2").startswith("Staged 1 rows")
+    assert write_chunk(tool, "out.csv", "3,4\n5,6").startswith("Staged 2 rows")
+    result = write_chunk(tool, "out.csv", "", final=True)
+
+    assert result == "Committed 3 rows to out.csv"
+    assert read_csv("out.csv") == [["a", "b"], ["1", "2"], ["3", "4"], ["5", "6"]]
+    assert not os.path.exists(".out.csv.partial")
+
+
+def test_csv_chunk_may_repeat_the_header(tool):
+    write_chunk(tool, "out.csv", "a,b\n1,2")
+    write_chunk(tool, "out.csv", "a,b\n3,4", final=True)
+
+    assert read_csv("out.csv") == [["a", "b"], ["1", "2"], ["3", "4"]]
+
+
+def test_json_chunk_columns_are_reordered_to_the_header(tool):
+    write_chunk(tool, "out.csv", "a,b\n1,2")
+    write_chunk(tool, "out.csv", json.dumps([{"b": 4, "a": 3}]), final=True)
+
+    assert read_csv("out.csv") == [["a", "b"], ["1", "2"], ["3", "4"]]
+
+
+def test_chunk_with_other_columns_is_rejected(tool):
+    write_chunk(tool, "out.csv", "a,b\n1,2")
+
+    assert "do not match" in write_chunk(tool, "out.csv", json.dumps([{"c": 1}]))
+    assert "expected 2" in write_chunk(tool, "out.csv", "1,2,3")
+
+    # The rejected chunks left the staged rows untouched
+    write_chunk(tool, "out.csv", "", final=True)
+    assert read_csv("out.csv") == [["a", "b"], ["1", "2"]]
+
+
+def test_jsonl_chunks(tool):
+    write_chunk(tool, "out.jsonl", '{"a": 1, "b": "x"}\n{"a": 2, "b": "y"}')
+    write_chunk(tool, "out.jsonl", '{"a": 3, "b": "z"}', final=True)
+
+    with open("out.jsonl", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert rows == [{"a": 1, "b": "x"}, {"a": 2, "b": "y"}, {"a": 3, "b": "z"}]
+
+
+def test_text_chunks_commit_on_final(tool):
+    write_chunk(tool, "notes.md", "# Title\n")
+    assert not os.path.exists("notes.md")
+    write_chunk(tool, "notes.md", "body\n", final=True)
+
+    with open("notes.md", encoding="utf-8") as f:
+        assert f.read() == "# Title\nbody\n"
+
+
+def test_final_without_staged_chunks(tool):
+    assert write_chunk(tool, "out.csv", "", final=True) == "Error: No staged chunks for 'out.csv'."
+
+
+def test_append_csv_without_header(tool):
+    tool.run("write", "out.csv", "a,b\n1,2")
+    assert tool.run("write", "out.csv", "3,4", mode="append") == "Appended 1 rows to out.csv"
+
+    assert read_csv("out.csv") == [["a", "b"], ["1", "2"], ["3", "4"]]
+
+
+def test_json_overwrite_of_csv_writes_rows(tool):
+    assert tool.run("write", "out.csv", json.dumps([{"a": 1, "b": 2}])) == "Successfully wrote out.csv (1 rows)"
+    assert tool.run("write", "out.csv", "a,b\n3,4", mode="append") == "Appended 1 rows to out.csv"
+
+    assert read_csv("out.csv") == [["a", "b"], ["1", "2"], ["3", "4"]]
+
+
+def test_csv_text_overwrite_is_verbatim(tool):
+    tool.run("write", "out.csv", "id,code\n1,007\n")
+
+    assert read_csv("out.csv") == [["id", "code"], ["1", "007"]]
+
+
+def test_jsonl_overwrite_from_json_list(tool):
+    tool.run("write", "out.jsonl", json.dumps([{"a": 1}, {"a": 2}]))
+
+    with open("out.jsonl", encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == [{"a": 1}, {"a": 2}]
+
+
+def test_append_replaces_the_file(tool, monkeypatch):
+    # Appends land through os.replace, never by writing into the live file
+    tool.run("write", "out.csv", "a,b\n1,2\n")
+    tool.run("write", "log.txt", "one\n")
+    replaced = []
+    real_replace = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: (replaced.append(dst), real_replace(src, dst)))
+
+    tool.run("write", "out.csv", "3,4", mode="append")
+    tool.run("write", "log.txt", "two\n", mode="append")
+
+    assert replaced == ["out.csv", "log.txt"]
+    assert read_csv("out.csv") == [["a", "b"], ["1", "2"], ["3", "4"]]
+    with open("log.txt", encoding="utf-8") as f:
+        assert f.read() == "one\ntwo\n"
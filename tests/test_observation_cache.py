@@ -0,0 +1,147 @@
+import os
+
+import pytest
+
+import llm.router as router
+from core.memory.session import Session
+from core.orchestrator import create_orchestrator
+from core.protocol.response import LLMResponse
+from llm.base import BaseLLM
+from tools.file import FileTool
+from tools.shell import ShellTool
+from tools.summarize import SummarizeTool
+
+
+class ScriptedLLM(BaseLLM):
+    """Plans one tool call per run, then finishes; the writer echoes the last observation."""
+
+    def __init__(self, action: str):
+        self.name = "scripted"
+        self.description = "scripted"
+        self.stream_allowed = False
+        self.action = action
+        self.planned = False
+
+    def call(self, req):
+        prompt = req.messages[-1].content
+        if "Writer" in req.messages[0].content:
+            return LLMResponse(text=prompt)
+        if self.planned:
+            return LLMResponse(text='```json\n{"type": "final", "content": "done"}\n```')
+        self.planned = True
+        return LLMResponse(text=f"```json\n{self.action}\n```")
+
+    def stream(self, req):
+        raise NotImplementedError
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    session = Session()
+
+    def run_step(action: str):
+        llm = ScriptedLLM(action)
+        fake = router.LLMRouter.__new__(router.LLMRouter)
+        fake.models, fake.limits, fake.config_path = {"scripted": llm}, {}, None
+        monkeypatch.setattr(router, "_router", fake)
+        orchestrator = create_orchestrator("read it", model="scripted", session=session)
+        orchestrator.start()
+        return [e.data for e in orchestrator.trace.events if e.type == "TOOL_RESULT"][0]
+
+    return session, run_step
+
+
+READ = '{"type": "use_tool", "tool": "file", "args": {"operation": "read", "path": "a.txt"}}'
+
+
+def test_unchanged_file_is_served_from_cache(run):
+    session, step = run
+    with open("a.txt", "w") as f:
+        f.write("first")
+
+    assert "first" in step(READ)["result"]
+    second = step(READ)
+    assert second.get("cached") and "first" in second["result"]
+
+
+def test_changed_file_is_read_again(run):
+    session, step = run
+    with open("a.txt", "w") as f:
+        f.write("first")
+    step(READ)
+
+    with open("a.txt", "w") as f:
+        f.write("second, longer")
+    result = step(READ)
+    assert not result.get("cached")
+    assert "second, longer" in result["result"]
+
+
+def test_side_effect_clears_the_cache(run):
+    session, step = run
+    with open("a.txt", "w") as f:
+        f.write("first")
+    step(READ)
+    assert session.observations
+
+    step('{"type": "use_tool", "tool": "file", "args": {"operation": "write", "path": "b.txt", "content": "x"}}')
+    assert not session.observations
+
+
+def test_session_drops_entry_when_stamps_change(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("one")
+    session = Session()
+    session.put_observation("k", "obs", Session.file_stamps([str(path)]))
+    assert session.get_observation("k") == "obs"
+
+    path.write_text("one, two")
+    assert session.get_observation("k") is None
+    assert "k" not in session.observation_stamps
+
+
+def test_missing_file_invalidates_once_created(tmp_path):
+    path = tmp_path / "later.txt"
+    session = Session()
+    session.put_observation("k", "Error: not found", Session.file_stamps([str(path)]))
+    assert session.get_observation("k") == "Error: not found"
+
+    path.write_text("now here")
+    assert session.get_observation("k") is None
+
+
+def test_stamps_survive_a_round_trip(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("one")
+    session = Session()
+    session.put_observation("k", "obs", Session.file_stamps([str(path)]))
+
+    restored = Session.from_dict(session.to_dict())
+    path.write_text("changed")
+    assert restored.get_observation("k") is None
+
+
+def test_eviction_drops_stamps():
+    session = Session(max_observations=1)
+    session.put_observation("a", "1", [["/x", 1, 1]])
+    session.put_observation("b", "2")
+    assert list(session.observations) == ["b"]
+    assert session.observation_stamps == {}
+
+
+def test_tool_cache_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert FileTool().cache_paths(operation="read", path=" a.txt ") == ["a.txt"]
+    assert FileTool().cache_paths(operation="read_many", paths="docs/**/*.md") is None
+    assert SummarizeTool().cache_paths(path="report.docx") == ["report.docx"]
+
+    # Shell paths resolve against the agent's shell directory (the process cwd before any cd)
+    shell = ShellTool()
+    assert shell.cache_paths(command="tail -n 50 app.log")[-1] == os.path.join(str(tmp_path), "app.log")
+    assert shell.cache_paths(command="grep -n TODO notes.txt") == [os.path.join(str(tmp_path), "notes.txt")]
+    assert shell.cache_paths(command="ls") == [str(tmp_path)]
+    assert shell.cache_paths(command="whoami") == []
+    assert shell.cache_paths(command="pwd") is None
+    assert shell.cache_paths(command="find . -name '*.py'") is None
+    assert shell.cache_paths(command="grep -r TODO .") is None
@@ -0,0 +1,54 @@
+from tools.read_tracker import ReadTracker
+
+
+def full(path):
+    return lambda: "FULL:" + path.read_text()
+
+
+def test_pure_append_returns_the_tail(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("one\ntwo\n")
+    tracker = ReadTracker()
+    tracker.read_text("a", str(path), full(path))
+
+    with path.open("a") as f:
+        f.write("three\n")
+    assert tracker.read_text("a", str(path), full(path)).endswith("]\nthree\n")
+    assert tracker.read_text("a", str(path), full(path)).startswith("(no changes")
+
+
+def test_same_size_edit_is_not_reported_as_unchanged(tmp_path):
+    path = tmp_path / "state.txt"
+    path.write_text("status: pending\nline2\n")
+    tracker = ReadTracker()
+    tracker.read_text("a", str(path), full(path))
+
+    path.write_text("status: success\nline2\n")
+    result = tracker.read_text("a", str(path), full(path))
+    assert "success" in result and not result.startswith("(no changes")
+
+
+def test_edit_plus_append_is_not_reported_as_append(tmp_path):
+    path = tmp_path / "state.txt"
+    path.write_text("status: pending\n" + "x" * 200 + "\n")
+    tracker = ReadTracker()
+    tracker.read_text("a", str(path), full(path))
+
+    path.write_text("status: success\n" + "x" * 200 + "\nnew line\n")
+    result = tracker.read_text("a", str(path), full(path))
+    assert "success" in result and not result.startswith("[Appended")
+
+
+def test_large_files_are_checked_by_digest(tmp_path):
+    path = tmp_path / "big.log"
+    path.write_text("a" * 100 + "\n")
+    tracker = ReadTracker(max_snapshot_bytes=10)
+    tracker.read_text("a", str(path), full(path))
+
+    with path.open("a") as f:
+        f.write("more\n")
+    assert tracker.read_text("a", str(path), full(path)).endswith("]\nmore\n")
+
+    # Edited before the old end after an append snapshot: full read, not a tail
+    path.write_text("b" + "a" * 99 + "\nmore\nlast\n")
+    assert tracker.read_text("a", str(path), full(path)).startswith("FULL:")
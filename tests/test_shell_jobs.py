@@ -0,0 +1,93 @@
+import os
+import time
+
+import pytest
+
+from core.jobs.queue import JobStatus
+from tools.shell_jobs import JobSupervisor
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="background jobs need POSIX process groups")
+
+
+@pytest.fixture
+def supervisor():
+    supervisor = JobSupervisor(max_parallel=2, spill_output=False, memory_limit_mb=0)
+    yield supervisor
+    supervisor.close_all()
+
+
+def test_job_output_and_exit_code(supervisor, tmp_path):
+    ok = supervisor.start("a", "echo hello; echo oops >&2", str(tmp_path), timeout=10)
+    bad = supervisor.start("a", "exit 3", str(tmp_path), timeout=10)
+
+    assert supervisor.wait("a", ok.id, 10).status == JobStatus.SUCCEEDED
+    assert supervisor.wait("a", bad.id, 10).status == JobStatus.FAILED
+    assert ok.stdout.text().strip() == "hello"
+    assert ok.stderr.text().strip() == "oops"
+    assert bad.exit_code == 3
+
+
+def test_job_runs_in_cwd(supervisor, tmp_path):
+    job = supervisor.start("a", "pwd", str(tmp_path), timeout=10)
+
+    supervisor.wait("a", job.id, 10)
+    assert job.stdout.text().strip() == os.path.realpath(tmp_path)
+
+
+def test_jobs_are_per_agent(supervisor, tmp_path):
+    job = supervisor.start("a", "true", str(tmp_path), timeout=10)
+
+    assert supervisor.get("b", job.id) is None
+    assert [j.id for j in supervisor.list("a")] == [job.id]
+    assert supervisor.list("b") == []
+
+
+def test_timeout_kills_the_job(supervisor, tmp_path):
+    job = supervisor.start("a", "sleep 30", str(tmp_path), timeout=0.5)
+
+    supervisor.wait("a", job.id, 10)
+    assert job.status == JobStatus.FAILED
+    assert job.timed_out
+
+
+def test_kill(supervisor, tmp_path):
+    job = supervisor.start("a", "sleep 30", str(tmp_path), timeout=60)
+    time.sleep(0.3)
+    supervisor.kill("a", job.id)
+
+    supervisor.wait("a", job.id, 10)
+    assert job.status == JobStatus.CANCELLED
+
+
+def test_queued_beyond_max_parallel(supervisor, tmp_path):
+    jobs = [supervisor.start("a", "sleep 0.3", str(tmp_path), timeout=10) for _ in range(3)]
+    time.sleep(0.1)
+    assert sorted(j.status for j in jobs) == [JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.RUNNING]
+
+    for job in jobs:
+        supervisor.wait("a", job.id, 10)
+    assert all(j.status == JobStatus.SUCCEEDED for j in jobs)
+
+
+def test_closed_pipes_do_not_busy_wait(supervisor, tmp_path):
+    # Both pipes close at once while the process keeps running; nothing is left to select on
+    start = time.process_time()
+    job = supervisor.start("a", "exec >/dev/null 2>&1; sleep 1.5", str(tmp_path), timeout=10)
+
+    supervisor.wait("a", job.id, 10)
+    assert job.status == JobStatus.SUCCEEDED
+    assert time.process_time() - start < 0.5
+
+
+def test_finished_jobs_expire(tmp_path):
+    supervisor = JobSupervisor(spill_output=False, memory_limit_mb=0, finished_ttl=0.2)
+    try:
+        job = supervisor.start("a", "true", str(tmp_path), timeout=10)
+        supervisor.wait("a", job.id, 10)
+        deadline = time.time() + 5
+        while supervisor.list("a") and time.time() < deadline:
+            time.sleep(0.1)
+        assert supervisor.get("a", job.id) is None
+        assert "a" not in supervisor._jobs
+    finally:
+        supervisor.close_all()
@@ -1,9 +1,139 @@
-from typing import Dict, Any
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable
+
+# Leading word of an args_schema spec -> JSON schema type
+_JSON_TYPES = (("str", "string"), ("int", "integer"), ("float", "number"), ("number", "number"),
+               ("bool", "boolean"), ("dict", "object"), ("list", "array"))
+
+@dataclass
+class ToolContext:
+    """Per-call context set by the Orchestrator while a tool runs."""
+    agent_id: str
+    tool_name: str
+    # Emits a TOOL_PROGRESS trace event (streamed to clients while the tool is still running)
+    emit_progress: Callable[[Dict[str, Any]], None]
+    # Model of the current run, for tools that call an LLM themselves
+    model: str = ""
+    # Image files the tool wants the (vision) model to see on the next planning step
+    images: List[str] = field(default_factory=list)
+    # Cleared by skip_cache() when this call's result must not be reused (e.g. partial output)
+    cacheable: bool = True
+
+_tool_context: ContextVar[Optional[ToolContext]] = ContextVar("tool_context", default=None)
+
+@contextmanager
+def use_tool_context(context: ToolContext):
+    token = _tool_context.set(context)
+    try:
+        yield context
+    finally:
+        _tool_context.reset(token)
+
+def current_tool_context() -> Optional[ToolContext]:
+    return _tool_context.get()
+
+def report_progress(data: Dict[str, Any]):
+    """Report intermediate progress from inside BaseTool.run; no-op outside an Orchestrator."""
+    context = _tool_context.get()
+    if context is not None:
+        try:
+            context.emit_progress(data)
+        except Exception as e:
+            print(f"[Tool] Progress listener error: {e}")
+
+def attach_image(path: str):
+    """Attach an image file to the next planner prompt; ignored for models without vision."""
+    context = _tool_context.get()
+    if context is not None and path not in context.images:
+        context.images.append(path)
+
+def skip_cache():
+    """Keep the current call's result out of the session observation cache."""
+    context = _tool_context.get()
+    if context is not None:
+        context.cacheable = False
+
+@dataclass
+class ArgSpec:
+    """One args_schema entry, e.g. "int (optional, bytes)" -> kind="int", note="bytes", optional=True."""
+    kind: str
+    note: str
+    optional: bool
+
+    @property
+    def description(self) -> str:
+        return f"{self.kind} ({self.note})" if self.note else self.kind
+
+def parse_arg_spec(spec: str) -> ArgSpec:
+    spec = spec.strip()
+    match = re.match(r"^(.*?)\s*\((.*)\)$", spec, re.DOTALL)
+    kind, note = (match.group(1), match.group(2)) if match else (spec, "")
+    optional = re.match(r"^optional\b[,;:]?\s*", note)
+    if optional:
+        note = note[optional.end():]
+    return ArgSpec(kind, note, bool(optional))
+
+def schema_from_args(args_schema: Dict[str, str]) -> Dict[str, Any]:
+    """JSON schema (object) for an args_schema dict; used for native function calling."""
+    properties, required = {}, []
+    for name, spec in args_schema.items():
+        arg = parse_arg_spec(spec)
+        kind = arg.kind.lower()
+        json_type = next((t for prefix, t in _JSON_TYPES if kind.startswith(prefix)), "string")
+        prop: Dict[str, Any] = {"type": json_type}
+        if json_type == "array":
+            prop["items"] = {"type": "string"}
+        choices = [c.strip() for c in arg.note.split("|")]
+        if json_type == "string" and len(choices) > 1 and all(re.fullmatch(r"\w+", c) for c in choices):
+            prop["enum"] = choices
+        else:
+            # The type word itself is redundant; keep longer kinds such as "list or comma-separated string"
+            description = "; ".join(filter(None, [arg.kind if " " in arg.kind else "", arg.note]))
+            if description:
+                prop["description"] = description
+        properties[name] = prop
+        if not arg.optional:
+            required.append(name)
+    return {"type": "object", "properties": properties, "required": required}
 
 class BaseTool:
     name: str
     description: str
     args_schema: Dict[str, str]
+    # Optional example args, rendered into the planner's tool section (keep to one or two per tool)
+    examples: List[Dict[str, Any]] = []
+
+    # 输出超过阈值时是否存入 BlobStore，只在 Prompt 中保留预览 + handle
+    compact_output: bool = True
 
     def run(self, **kwargs) -> str:
         raise NotImplementedError
+
+    def is_cacheable(self, **kwargs) -> bool:
+        """
+        Whether a call with these args is read-only and its result may be reused
+        within a session. Side-effecting calls must return False.
+        """
+        return False
+
+    def cache_paths(self, **kwargs) -> Optional[List[str]]:
+        """
+        Files / directories a cacheable result was read from; the session checks their mtime and size
+        before reusing it. [] (the default) means there are no files to validate: the result is reused as-is
+        while the session keeps it. None means the result cannot be validated that way and is not cached.
+        """
+        return []
+
+    def parameters_schema(self) -> Dict[str, Any]:
+        """JSON schema of the arguments for native function calling; derived from args_schema unless overridden."""
+        return schema_from_args(self.args_schema)
+
+    def warm_up(self):
+        """Import heavy dependencies ahead of the first call (tools.registry.warm_up); default no-op."""
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        """Optional counters (e.g. cache hit rates) attached to TOOL_RESULT trace events."""
+        return None
@@ -0,0 +1,158 @@
+import os
+import re
+import stat as stat_module
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 默认跳过的目录 (体积大、对任务没有意义)
+DEFAULT_SKIP_DIRS = {".git", ".memora", "__pycache__", "node_modules", ".venv", "venv", ".mypy_cache", ".pytest_cache"}
+
+
+@dataclass
+class Entry:
+    name: str
+    is_dir: bool
+    size: int
+    mtime: float
+    is_link: bool = False
+
+    @property
+    def ext(self) -> str:
+        return "" if self.is_dir else os.path.splitext(self.name)[1].lower()
+
+
+@dataclass
+class _DirListing:
+    mtime_ns: int
+    checked_at: float
+    entries: List[Entry]
+
+
+class DirectoryIndex:
+    """
+    工作区目录索引：os.scandir 遍历，按目录缓存条目元数据 (类型、大小、mtime、扩展名)。
+    目录的 mtime 变化 (增删改名) 才重新扫描该目录；recheck_interval 内连续访问连 stat 都不做，
+    大目录树的重复列举直接从内存返回。
+    注意：原地修改文件不会改变目录 mtime，此时条目的 size/mtime 可能滞后，可用 refresh 强制刷新。
+    """
+
+    def __init__(self, recheck_interval: float = 1.0, max_walk_entries: int = 200_000):
+        self.recheck_interval = recheck_interval
+        self.max_walk_entries = max_walk_entries
+        self._dirs: Dict[str, _DirListing] = {}
+        self._lock = threading.Lock()
+
+    def listing(self, path: str, refresh: bool = False) -> List[Entry]:
+        path = os.path.abspath(path)
+        now = time.time()
+        with self._lock:
+            cached = self._dirs.get(path)
+        if cached and not refresh and now - cached.checked_at < self.recheck_interval:
+            return cached.entries
+
+        mtime_ns = os.stat(path).st_mtime_ns
+        if cached and not refresh and cached.mtime_ns == mtime_ns:
+            cached.checked_at = now
+            return cached.entries
+
+        entries = []
+        with os.scandir(path) as it:
+            for de in it:
+                try:
+                    # DirEntry caches the stat result; follow symlinks for size, not for recursion
+                    st = de.stat()
+                    is_dir = stat_module.S_ISDIR(st.st_mode)
+                    entries.append(Entry(de.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime,
+                                         de.is_symlink()))
+                except OSError:
+                    continue
+        entries.sort(key=lambda e: e.name)
+        with self._lock:
+            self._dirs[path] = _DirListing(mtime_ns, now, entries)
+        return entries
+
+    def walk(self, root: str, recursive: bool = True, hidden: bool = False,
+             refresh: bool = False) -> Iterator[Tuple[str, Entry]]:
+        """Yield (path relative to root, entry) for the cached tree under root."""
+        root = os.path.abspath(root)
+        stack = [("", root)]
+        count = 0
+        while stack:
+            rel_dir, abs_dir = stack.pop()
+            try:
+                entries = self.listing(abs_dir, refresh=refresh)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                if not hidden and entry.name.startswith("."):
+                    continue
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                yield rel, entry
+                count += 1
+                if count >= self.max_walk_entries:
+                    return
+                if recursive and entry.is_dir and not entry.is_link and entry.name not in DEFAULT_SKIP_DIRS:
+                    subdirs.append((rel, os.path.join(abs_dir, entry.name)))
+            stack.extend(reversed(subdirs))
+
+    def invalidate(self, path: str):
+        """Forget the listing that contains path (e.g. after a file was rewritten in place)."""
+        parent = os.path.dirname(os.path.abspath(path))
+        with self._lock:
+            self._dirs.pop(parent, None)
+
+    def stat(self, path: str) -> Optional[Entry]:
+        parent, name = os.path.split(os.path.abspath(path))
+        if not name:
+            return Entry(path, True, 0, os.stat(path).st_mtime)
+        try:
+            for entry in self.listing(parent):
+                if entry.name == name:
+                    return entry
+        except OSError:
+            pass
+        return None
+
+
+def glob_to_regex(pattern: str) -> re.Pattern:
+    """Glob with ** support (matches across directories), applied to '/'-separated relative paths."""
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end < 0:
+                out.append(re.escape("["))
+                i += 1
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                out.append("[^" + body[1:] + "]" if body.startswith("!") else "[" + body + "]")
+                i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+
+# ====== Global Singleton ======
+_directory_index = None
+
+def get_directory_index() -> DirectoryIndex:
+    global _directory_index
+    if _directory_index is None:
+        _directory_index = DirectoryIndex()
+    return _directory_index
@@ -0,0 +1,116 @@
+import fnmatch
+import os
+import time
+from typing import Optional
+
+from tools.base import BaseTool
+from tools.dir_index import DirectoryIndex, get_directory_index, glob_to_regex
+
+def _format_size(size: int) -> str:
+    for unit in ("B", "K", "M", "G"):
+        if size < 1024 or unit == "G":
+            return f"{size}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return str(size)
+
+
+class DirTool(BaseTool):
+    name = "dir"
+    description = "浏览工作区目录 (带缓存，比 shell ls/find 快且输出精简)。操作：list, stat, glob。"
+    args_schema = {
+        "operation": "string (list | stat | glob)",
+        "path": "string (directory for list, file for stat, base directory for glob; default '.')",
+        "pattern": "string (optional; glob such as '**/*.py' for glob, name filter such as '*.log' for list)",
+        "recursive": "bool (optional, list only, default false)",
+        "type": "string (optional: file | dir)",
+        "ext": "string (optional, e.g. '.xlsx')",
+        "min_size": "int (optional, bytes)",
+        "max_size": "int (optional, bytes)",
+        "sort": "string (optional: name | size | mtime, default name)",
+        "desc": "bool (optional)",
+        "offset": "int (optional, pagination)",
+        "limit": "int (optional, default 100, max 500)",
+        "hidden": "bool (optional, include dotfiles)",
+        "refresh": "bool (optional, force rescan)"
+    }
+
+    MAX_LIMIT = 500
+
+    def __init__(self, index: Optional[DirectoryIndex] = None):
+        self.index = index or get_directory_index()
+
+    def is_cacheable(self, **kwargs) -> bool:
+        # The index validates itself against directory mtimes; session-level reuse would skip that
+        return False
+
+    def run(self, operation: str = "list", path: str = ".", pattern: str = None, recursive=False,
+            type: str = None, ext: str = None, min_size: int = None, max_size: int = None,
+            sort: str = "name", desc=False, offset: int = 0, limit: int = 100, hidden=False,
+            refresh=False) -> str:
+        operation = (operation or "list").lower()
+        path = (path or ".").strip()
+        recursive, desc, hidden, refresh = (self._bool(v) for v in (recursive, desc, hidden, refresh))
+
+        if operation == "stat":
+            entry = self.index.stat(path) if os.path.exists(path) else None
+            if entry is None:
+                return f"Error: '{path}' not found."
+            kind = "dir" if entry.is_dir else "file"
+            return (f"{path}: {kind}, size={entry.size} ({_format_size(entry.size)}), "
+                    f"mtime={time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry.mtime))}")
+
+        if not os.path.isdir(path):
+            return f"Error: Directory '{path}' not found."
+
+        if operation == "list":
+            rows = self.index.walk(path, recursive=recursive, hidden=hidden, refresh=refresh)
+            if pattern:
+                rows = ((rel, e) for rel, e in rows if fnmatch.fnmatch(e.name, pattern))
+        elif operation == "glob":
+            if not pattern:
+                return "Error: 'pattern' is required for glob."
+            regex = glob_to_regex(pattern)
+            deep = "**" in pattern or "/" in pattern
+            rows = ((rel, e) for rel, e in self.index.walk(path, recursive=deep, hidden=hidden, refresh=refresh)
+                    if regex.match(rel))
+        else:
+            return f"Error: Unknown operation '{operation}'. Use 'list', 'stat' or 'glob'."
+
+        if type in ("file", "dir"):
+            want_dir = type == "dir"
+            rows = ((rel, e) for rel, e in rows if e.is_dir == want_dir)
+        if ext:
+            ext = ext.lower() if ext.startswith(".") else "." + ext.lower()
+            rows = ((rel, e) for rel, e in rows if e.ext == ext)
+        if min_size is not None:
+            rows = ((rel, e) for rel, e in rows if not e.is_dir and e.size >= int(min_size))
+        if max_size is not None:
+            rows = ((rel, e) for rel, e in rows if not e.is_dir and e.size <= int(max_size))
+
+        rows = list(rows)
+        if sort in ("size", "mtime"):
+            rows.sort(key=lambda r: getattr(r[1], sort), reverse=desc)
+        elif desc:
+            rows.reverse()
+
+        offset = max(int(offset or 0), 0)
+        limit = min(max(int(limit or 100), 1), self.MAX_LIMIT)
+        page = rows[offset:offset + limit]
+        total_size = sum(e.size for _, e in rows)
+
+        lines = [f"{path}: {len(rows)} entries, {_format_size(total_size)} in files"]
+        for rel, e in page:
+            if e.is_dir:
+                lines.append(f"d {'-':>7}  {rel}/")
+            else:
+                when = time.strftime("%Y-%m-%d %H:%M", time.localtime(e.mtime))
+                lines.append(f"f {_format_size(e.size):>7}  {when}  {rel}")
+        if offset + len(page) < len(rows):
+            lines.append(f"[showing {offset}-{offset + len(page) - 1}] Next: offset={offset + len(page)}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _bool(value) -> bool:
+        if isinstance(value, str):
+            return value.lower() in ("true", "1", "yes")
+        return bool(value)
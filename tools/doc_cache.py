@@ -0,0 +1,163 @@
+import hashlib
+import os
+import re
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class DocumentCache:
+    """
+    进程级的解析结果缓存：docx/pptx 提取的文本、图片信息、表格 DataFrame 等，
+    以 (绝对路径, mtime, size, kind) 为键，避免同一次运行的多个任务反复解压 OOXML。
+
+    - 内存层：按字节预算的 LRU (估算文本/DataFrame 的内存占用)
+    - 磁盘层 (可选)：只缓存提取出的文本，进程重启后依然命中
+    - 失效：文件被修改后 mtime/size 变化自然失效；FileTool 写文件时主动调用 invalidate
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = ".memora/doc_cache"):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _path_hash(path: str) -> str:
+        return hashlib.sha1(path.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: Tuple) -> str:
+        path, mtime_ns, size, kind = key
+        safe_kind = re.sub(r"[^A-Za-z0-9_-]", "_", kind)
+        return os.path.join(self.disk_dir, f"{self._path_hash(path)}.{safe_kind}.{mtime_ns}.{size}.txt")
+
+    @staticmethod
+    def _size_of(value: Any) -> int:
+        if isinstance(value, str):
+            return len(value.encode("utf-8"))
+        memory_usage = getattr(value, "memory_usage", None)
+        if callable(memory_usage):
+            try:
+                # pandas DataFrame
+                return int(memory_usage(deep=True).sum())
+            except TypeError:
+                pass
+        return sys.getsizeof(value)
+
+    def get_or_load(self, path: str, kind: str, loader: Callable[[], Any], persist: bool = True,
+                    size_of: Optional[Callable[[Any], int]] = None) -> Any:
+        """
+        Cached result of loader() for the current version of path. persist=True additionally
+        keeps str results in the disk tier.
+        """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size, kind)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        value = None
+        use_disk = persist and self.disk_dir is not None
+        if use_disk and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                    value = f.read()
+                with self._lock:
+                    self.disk_hits += 1
+            except OSError:
+                value = None
+
+        if value is None:
+            value = loader()
+            with self._lock:
+                self.misses += 1
+            if use_disk and isinstance(value, str):
+                self._write_disk(key, value)
+
+        self._put(key, value, (size_of or self._size_of)(value))
+        return value
+
+    def _put(self, key: Tuple, value: Any, size: int):
+        with self._lock:
+            # Older versions of the same document can never be hit again
+            for old in [k for k in self._entries if k[0] == key[0] and k[3] == key[3] and k != key]:
+                self._bytes -= self._entries.pop(old)[1]
+            if size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def _write_disk(self, key: Tuple, text: str):
+        target = self._disk_path(key)
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, target)
+        except OSError as e:
+            print(f"[DocumentCache] Failed to persist {key[0]}: {e}")
+            return
+        # Drop stale versions of the same path/kind
+        prefix = os.path.basename(target).rsplit(".", 3)[0] + "."
+        for name in os.listdir(self.disk_dir):
+            if name.startswith(prefix) and name != os.path.basename(target) and not name.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except OSError:
+                    pass
+
+    def invalidate(self, path: str):
+        """Forget every cached version of path (called after the file is written)."""
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self._bytes -= self._entries.pop(key)[1]
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            prefix = self._path_hash(path) + "."
+            for name in os.listdir(self.disk_dir):
+                if name.startswith(prefix):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes
+            }
+
+
+# ====== Global Singleton ======
+_document_cache = None
+
+def get_document_cache() -> DocumentCache:
+    global _document_cache
+    if _document_cache is None:
+        _document_cache = DocumentCache()
+    return _document_cache
@@ -1,129 +1,418 @@
 import os
-import pandas as pd
-from docx import Document
-from pptx import Presentation
-from PIL import Image
-from tools.base import BaseTool
+from tools.base import BaseTool, attach_image, current_tool_context
+from tools.dir_index import get_directory_index
+from tools.doc_cache import get_document_cache
+from tools.parallel_read import get_parallel_reader
+from tools.read_tracker import get_read_tracker
+from tools.stream_writer import (TABLE_WRITE_FORMATS, append_staged, atomic_append_path, atomic_path, chunk_records,
+                                 parse_records, staged_records, staging_path, write_table)
+from tools.table_query import get_table_engine
+from tools.table_reader import get_table_reader
+from tools.text_window import get_text_reader
 
 class FileTool(BaseTool):
     name = "file"
-    description = "读取或写入文件。支持格式：txt, md, json, csv, xlsx, docx, pptx, jpg, png (read-only info)。操作：read, write。"
+    description = "读取或写入文件。支持格式：txt, md, json, csv, xlsx, docx, pptx, jpg, png (read-only info)。操作：read, write, query, profile (表格文件), read_many (并行读取多个文件)。大文件分页读取；分析表格优先用 query / profile 而不是全部读出；多个文件用一次 read_many。"
     args_schema = {
-        "operation": "string (read | write)",
+        "operation": "string (read | write | query | profile | read_many)",
         "path": "string",
-        "content": "string (optional, for write)"
+        "content": "string (optional, for write)",
+        "mode": "string (optional; read: full | diff, diff returns only changes since this agent's last read; write: overwrite | append | chunk)",
+        "final": "bool (optional, write mode=chunk: the last chunk, commits the staged file)",
+        # 文本文件的窗口化读取选项 (read)
+        "offset": "int (optional, byte offset)",
+        "length": "int (optional, bytes)",
+        "start_line": "int (optional, 1-based)",
+        "end_line": "int (optional, inclusive)",
+        "head": "int (optional, first N lines)",
+        "tail": "int (optional, last N lines)",
+        "pattern": "string (optional, regex filter; returns matching lines with line numbers)",
+        "max_matches": "int (optional, with pattern: max matching lines returned, default 100)",
+        # 表格文件 (csv/xlsx) 的读取选项 (read)
+        "columns": "list or comma-separated string (optional)",
+        "nrows": "int (optional, default 50)",
+        "skiprows": "int (optional, data rows to skip)",
+        "sample": "int (optional, random sample of N rows)",
+        "sheet": "string (optional, Excel sheet name)",
+        # 表格查询 (query)：sql 或结构化参数二选一
+        "sql": "string (optional, read-only SELECT over table t)",
+        "filter": "string (optional, pandas query expression, e.g. \"amount > 100 and region == 'north'\")",
+        "group_by": "list or comma-separated string (optional)",
+        "agg": "dict column -> count|sum|mean|min|max|median|std|nunique (optional)",
+        "sort_by": "string (optional)",
+        "ascending": "bool (optional, default false)",
+        "limit": "int (optional, max rows returned, default 50)",
+        # 批量读取 (read_many)：path 或 paths 可以是 glob，例如 "docs/**/*.docx"
+        "paths": "list of paths or glob patterns (optional, for read_many)",
+        "timeout": "int (optional, per-file seconds, default 30)",
+        "max_chars": "int (optional, total output budget)"
     }
+    examples = [
+        {"operation": "query", "path": "data.xlsx", "filter": "amount > 100", "group_by": "region", "agg": {"amount": "sum"}},
+        {"operation": "read_many", "paths": "document/**/*.docx"}
+    ]
 
-    def run(self, operation: str, path: str, content: str = None) -> str:
+    TEXT_READ_OPTIONS = ("offset", "length", "start_line", "end_line", "head", "tail", "pattern", "max_matches")
+    TABLE_READ_OPTIONS = ("columns", "nrows", "skiprows", "sample", "sheet")
+    QUERY_OPTIONS = ("sql", "filter", "group_by", "agg", "columns", "sort_by", "ascending", "limit", "sheet")
+    PROFILE_OPTIONS = ("columns", "sheet")
+    READ_MANY_OPTIONS = ("paths", "timeout", "max_chars")
+    WRITE_OPTIONS = ("mode", "final")
+    WRITE_MODES = ("overwrite", "append", "chunk")
+    STRING_OPTIONS = ("pattern", "columns", "sheet", "mode")
+    TABLE_FORMATS = ('.xlsx', '.xls', '.csv')
+    DOCUMENT_FORMATS = ('.docx', '.pptx', '.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+    def run(self, operation: str, path: str = "", content: str = None, **options) -> str:
         operation = operation.lower()
         path = path.strip()
         
-        if operation == "read":
-            return self._read_file(path)
+        if operation == "read_many":
+            return self._read_many(path, options)
+        elif operation == "read":
+            mode = (options.pop("mode", None) or "full").lower()
+            unknown = [k for k in options if k not in self.TEXT_READ_OPTIONS + self.TABLE_READ_OPTIONS]
+            if unknown:
+                return f"Error: Unknown read options: {', '.join(unknown)}."
+            if mode == "diff":
+                return self._read_changes(path, options)
+            if mode != "full":
+                return f"Error: Unknown read mode '{mode}'. Use 'full' or 'diff'."
+            return self._read_file(path, **options)
+        elif operation in ("query", "profile"):
+            return self._analyze_table(operation, path, options)
         elif operation == "write":
             if content is None:
                 return "Error: 'content' is required for write operation."
-            return self._write_file(path, content)
+            unknown = [k for k in options if k not in self.WRITE_OPTIONS]
+            if unknown:
+                return f"Error: Unknown write options: {', '.join(unknown)}."
+            return self._write_file(path, content, **options)
         else:
-            return f"Error: Unknown operation '{operation}'. Use 'read' or 'write'."
+            return f"Error: Unknown operation '{operation}'. Use 'read', 'write', 'query', 'profile' or 'read_many'."
+
+    def is_cacheable(self, operation: str = "", **kwargs) -> bool:
+        if str(kwargs.get("mode") or "").lower() == "diff":
+            # The answer depends on what this agent read before, not only on the file
+            return False
+        return operation.lower() in ("read", "query", "profile", "read_many")
+
+    def cache_paths(self, operation: str = "", path: str = "", **kwargs):
+        if operation.lower() != "read_many":
+            return [path.strip()]
+        paths = kwargs.get("paths") or path
+        patterns = [p.strip() for p in paths.split(",")] if isinstance(paths, str) else list(paths)
+        if any("**" in p for p in patterns):
+            # A recursive glob can pick up new files anywhere below; directory mtimes don't show that
+            return None
+        # A plain glob's directory changes mtime when a matching file is added or removed
+        dirs = [os.path.dirname(p) or "." for p in patterns if any(c in p for c in "*?[")]
+        return get_parallel_reader().expand(patterns) + dirs
+
+    def _read_changes(self, path: str, options: dict) -> str:
+        if options:
+            return f"Error: mode='diff' reads the whole file; options {list(options)} are not supported."
+        if not os.path.exists(path):
+            return f"Error: File '{path}' not found."
+        context = current_tool_context()
+        agent_id = context.agent_id if context else "default"
+        ext = os.path.splitext(path)[1].lower()
+        tracker = get_read_tracker()
+        try:
+            if ext in self.TABLE_FORMATS or ext in self.DOCUMENT_FORMATS:
+                text = self._read_file(path)
+                if text.startswith("Error"):
+                    return text
+                return tracker.read_rendered(agent_id, path, text)
+            return tracker.read_text(agent_id, path, lambda: self._read_file(path))
+        except Exception as e:
+            return f"Error reading file '{path}': {str(e)}"
+
+    def _read_many(self, path: str, options: dict) -> str:
+        unsupported = [k for k in options if k not in self.READ_MANY_OPTIONS]
+        if unsupported:
+            return f"Error: Options {unsupported} are not supported for 'read_many'."
+        paths = options.get("paths") or path
+        if not paths:
+            return "Error: 'paths' (list or glob) is required for read_many."
+        try:
+            return get_parallel_reader().read_many(
+                paths,
+                timeout=int(options["timeout"]) if options.get("timeout") else None,
+                max_chars=int(options["max_chars"]) if options.get("max_chars") else None
+            )
+        except Exception as e:
+            return f"Error reading files: {str(e)}"
+
+    def _analyze_table(self, operation: str, path: str, options: dict) -> str:
+        if not os.path.exists(path):
+            return f"Error: File '{path}' not found."
+        if os.path.splitext(path)[1].lower() not in self.TABLE_FORMATS:
+            return f"Error: '{operation}' only supports csv/xlsx files."
+        supported = self.QUERY_OPTIONS if operation == "query" else self.PROFILE_OPTIONS
+        unsupported = [k for k in options if k not in supported]
+        if unsupported:
+            return f"Error: Options {unsupported} are not supported for '{operation}'."
 
-    def _read_file(self, path: str) -> str:
+        options = {k: v for k, v in options.items() if v is not None and v != ""}
+        if "limit" in options:
+            options["limit"] = int(options["limit"])
+        if isinstance(options.get("ascending"), str):
+            options["ascending"] = options["ascending"].lower() in ("true", "1", "yes")
+        if isinstance(options.get("agg"), str):
+            import json
+            try:
+                options["agg"] = json.loads(options["agg"])
+            except ValueError:
+                return "Error: 'agg' must be a JSON object like {\"amount\": \"sum\"}."
+
+        engine = get_table_engine()
+        try:
+            if operation == "profile":
+                return engine.profile(path, **options)
+            return engine.query(path, **options)
+        except KeyError as e:
+            return f"Error: Unknown column {e}."
+        except Exception as e:
+            return f"Error running {operation} on '{path}': {str(e)}"
+
+    def _read_file(self, path: str, **options) -> str:
         if not os.path.exists(path):
             return f"Error: File '{path}' not found."
             
         ext = os.path.splitext(path)[1].lower()
+        if ext in self.TABLE_FORMATS:
+            supported = self.TABLE_READ_OPTIONS
+        elif ext in self.DOCUMENT_FORMATS:
+            supported = ()
+        else:
+            supported = self.TEXT_READ_OPTIONS
+        unsupported = [k for k in options if k not in supported]
+        if unsupported:
+            return f"Error: Read options {unsupported} are not supported for '{ext or 'text'}' files."
+        options = self._coerce_options(options)
         
         try:
-            if ext in ['.xlsx', '.xls']:
-                # Read Excel
-                df = pd.read_excel(path)
-                return self._dataframe_to_string(df, path)
-            
-            elif ext in ['.csv']:
-                # Read CSV
-                df = pd.read_csv(path)
-                return self._dataframe_to_string(df, path)
+            if ext in self.TABLE_FORMATS:
+                # Read Excel / CSV: column and row limits are pushed down into the readers
+                return get_table_reader().read(path, **options)
                 
             elif ext in ['.docx']:
-                # Read Word
-                doc = Document(path)
-                full_text = []
-                for para in doc.paragraphs:
-                    full_text.append(para.text)
-                return '\n'.join(full_text)
+                # Read Word (extracted text is cached per file version)
+                return get_document_cache().get_or_load(path, "docx_text", lambda: self._extract_docx(path))
                 
             elif ext in ['.pptx']:
                 # Read PowerPoint
-                prs = Presentation(path)
-                text_content = []
-                for slide in prs.slides:
-                    for shape in slide.shapes:
-                        if hasattr(shape, "text"):
-                            text_content.append(shape.text)
-                return '\n'.join(text_content)
+                return get_document_cache().get_or_load(path, "pptx_text", lambda: self._extract_pptx(path))
                 
             elif ext in ['.jpg', '.jpeg', '.png', '.bmp', '.gif']:
                 # Read Image Info
-                with Image.open(path) as img:
-                    info = f"Image File: {path}\nFormat: {img.format}\nSize: {img.size}\nMode: {img.mode}"
-                    return info
+                info = get_document_cache().get_or_load(path, "image_info", lambda: self._image_info(path))
+                # Vision models also get the (downscaled) image itself on the next step
+                attach_image(path)
+                return f"Image File: {path}\n{info}"
             
             else:
-                # Default to text read
-                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                    return f.read()
+                # Default to text read: windowed, memory stays flat for multi-GB files
+                return get_text_reader().read(path, **options)
                     
         except Exception as e:
             return f"Error reading file '{path}': {str(e)}"
 
-    def _dataframe_to_string(self, df, path):
-        """Helper to format dataframe output with limits"""
-        rows, cols = df.shape
-        info = f"File: {path}\nShape: {rows} rows, {cols} columns\nColumns: {list(df.columns)}\n"
-        
-        if rows > 50:
-            info += f"\n[Warning] File is large. Showing first 50 rows only to avoid context overflow.\n"
-            return info + df.head(50).to_string()
-        else:
-            return info + df.to_string()
+    @staticmethod
+    def _extract_docx(path: str) -> str:
+        from docx import Document
+        doc = Document(path)
+        return '\n'.join(para.text for para in doc.paragraphs)
 
-    def _write_file(self, path: str, content: str) -> str:
+    @staticmethod
+    def _extract_pptx(path: str) -> str:
+        from pptx import Presentation
+        prs = Presentation(path)
+        text_content = []
+        for slide in prs.slides:
+            for shape in slide.shapes:
+                if hasattr(shape, "text"):
+                    text_content.append(shape.text)
+        return '\n'.join(text_content)
+
+    @staticmethod
+    def _image_info(path: str) -> str:
+        from PIL import Image
+        with Image.open(path) as img:
+            return f"Format: {img.format}\nSize: {img.size}\nMode: {img.mode}"
+
+    # 格式库只在需要它们的代码路径中导入；warm_up 提前导入，避免第一次读 xlsx/docx 时的停顿
+    HEAVY_MODULES = ("numpy", "pandas", "openpyxl", "docx", "pptx", "PIL.Image")
+
+    def warm_up(self):
+        for module in self.HEAVY_MODULES:
+            try:
+                __import__(module)
+            except ImportError as e:
+                print(f"[FileTool] Optional dependency '{module}' is not available: {e}")
+
+    def stats(self):
+        return {"document_cache": get_document_cache().stats()}
+
+    @classmethod
+    def _coerce_options(cls, options: dict) -> dict:
+        """LLM-produced args may arrive as strings; coerce the numeric ones."""
+        out = {}
+        for key, value in options.items():
+            if value is None or value == "":
+                continue
+            out[key] = value if key in cls.STRING_OPTIONS else int(value)
+        return out
+
+    def _write_file(self, path: str, content: str, mode: str = "overwrite", final=False) -> str:
         ext = os.path.splitext(path)[1].lower()
-        
+        mode = (mode or "overwrite").lower()
+        if mode not in self.WRITE_MODES:
+            return f"Error: Unknown write mode '{mode}'. Use {', '.join(self.WRITE_MODES)}."
+        if isinstance(final, str):
+            final = final.lower() in ("true", "1", "yes")
+
         try:
-            # Create directory if needed
-            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
-            
-            if ext in ['.xlsx', '.xls']:
-                import io
-                import json
-                
-                df = None
+            if mode == "chunk":
+                return self._write_chunk(path, ext, content, final)
+            if mode == "append":
+                return self._append_content(path, ext, content)
+            return self._write_content(path, ext, content)
+        except Exception as e:
+            return f"Error writing file '{path}': {str(e)}"
+        finally:
+            # Whatever was cached for the old contents is stale now
+            get_document_cache().invalidate(path)
+            get_directory_index().invalidate(path)
+
+    def _table_records(self, path: str, ext: str, content: str, append: bool):
+        text = content.lstrip()
+        if append and ext == ".csv" and not text.startswith(("[", "{")):
+            # Appending bare CSV lines: reuse the existing header when the chunk has none
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                existing = f.readline().rstrip("\r\n")
+            if existing and text.split("\n", 1)[0].rstrip("\r") != existing:
+                content = existing + "\n" + text
+        return parse_records(content)
+
+    def _write_content(self, path: str, ext: str, content: str) -> str:
+        # Every write goes through a temp file + os.replace so readers never see a partial file
+        # (appends copy the file first, see atomic_append_path)
+        if ext == '.xlsx':
+            try:
+                header, rows = parse_records(content)
+                count = write_table(path, header, rows)
+            except ValueError:
+                return "Error: Content for Excel must be valid JSON list-of-dicts or CSV string."
+            return f"Successfully wrote Excel file to {path} ({count} rows)"
+
+        elif ext == '.jsonl' or (ext == '.csv' and content.lstrip().startswith(("[", "{"))):
+            # JSON records become real rows, the same as append / chunk writes; CSV text is kept verbatim below
+            try:
+                header, rows = parse_records(content)
+                count = write_table(path, header, rows)
+            except ValueError as e:
+                return f"Error: Content for {ext} must be JSON records or CSV text with a header row ({e})."
+            return f"Successfully wrote {path} ({count} rows)"
+
+        elif ext == '.xls':
+            import io
+            import json
+            import pandas as pd
+
+            df = None
+            try:
+                df = pd.DataFrame(json.loads(content))
+            except ValueError:
                 try:
-                    data = json.loads(content)
-                    df = pd.DataFrame(data)
-                except:
-                    try:
-                        df = pd.read_csv(io.StringIO(content))
-                    except:
-                        pass
-                
-                if df is not None:
-                    df.to_excel(path, index=False)
-                    return f"Successfully wrote Excel file to {path}"
-                else:
-                    return "Error: Content for Excel must be valid JSON list-of-dicts or CSV string."
+                    df = pd.read_csv(io.StringIO(content))
+                except Exception:
+                    pass
+            if df is None:
+                return "Error: Content for Excel must be valid JSON list-of-dicts or CSV string."
+            with atomic_path(path) as tmp:
+                df.to_excel(tmp, index=False)
+            return f"Successfully wrote Excel file to {path}"
 
-            elif ext in ['.docx']:
-                doc = Document()
-                doc.add_paragraph(content)
-                doc.save(path)
-                return f"Successfully wrote Word file to {path}"
-                
+        elif ext == '.docx':
+            from docx import Document
+            doc = Document()
+            doc.add_paragraph(content)
+            with atomic_path(path) as tmp:
+                doc.save(tmp)
+            return f"Successfully wrote Word file to {path}"
+
+        else:
+            with atomic_path(path) as tmp:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(content)
+            return f"Successfully wrote file to {path}"
+
+    def _append_content(self, path: str, ext: str, content: str) -> str:
+        if not os.path.exists(path):
+            return self._write_content(path, ext, content)
+
+        if ext in TABLE_WRITE_FORMATS:
+            header, rows = self._table_records(path, ext, content, append=True)
+            count = write_table(path, header, rows, append=True)
+            return f"Appended {count} rows to {path}"
+
+        elif ext == '.docx':
+            from docx import Document
+            doc = Document(path)
+            doc.add_paragraph(content)
+            with atomic_path(path) as tmp:
+                doc.save(tmp)
+            return f"Appended paragraph to {path}"
+
+        elif ext in ('.xls',) + self.DOCUMENT_FORMATS:
+            return f"Error: Append is not supported for '{ext}' files."
+
+        else:
+            with atomic_append_path(path) as tmp:
+                with open(tmp, 'a', encoding='utf-8') as f:
+                    f.write(content)
+            return f"Appended {len(content)} chars to {path}"
+
+    def _write_chunk(self, path: str, ext: str, content: str, final: bool) -> str:
+        """
+        Large outputs written over several calls: chunks accumulate in a hidden staging file
+        (table rows as JSON Lines, everything else as raw text) and the chunk with final=true
+        converts/moves it onto path in one atomic step.
+        """
+        staging = staging_path(path)
+        os.makedirs(os.path.dirname(staging), exist_ok=True)
+        is_table = ext in TABLE_WRITE_FORMATS
+        if content:
+            if is_table:
+                csv_text = ext == ".csv" and not content.lstrip().startswith(("[", "{"))
+                header, rows = chunk_records(staging, content, csv_text)
+                added = f"{append_staged(staging, header, rows)} rows"
+            elif ext == '.xls' or (ext in self.DOCUMENT_FORMATS and ext != '.docx'):
+                return f"Error: Chunked writes are not supported for '{ext}' files."
             else:
-                with open(path, 'w', encoding='utf-8') as f:
+                with open(staging, 'a', encoding='utf-8') as f:
                     f.write(content)
-                return f"Successfully wrote file to {path}"
-                
-        except Exception as e:
-            return f"Error writing file '{path}': {str(e)}"
+                added = f"{len(content)} chars"
+        else:
+            added = "nothing"
+
+        if not final:
+            return f"Staged {added} for {path}. Send the last chunk with final=true to commit."
+        if not os.path.exists(staging):
+            return f"Error: No staged chunks for '{path}'."
+
+        try:
+            if is_table:
+                header, rows = staged_records(staging)
+                count = write_table(path, header, rows)
+                return f"Committed {count} rows to {path}"
+            if ext == '.docx':
+                with open(staging, 'r', encoding='utf-8') as f:
+                    return self._write_content(path, ext, f.read())
+            os.replace(staging, path)
+            return f"Committed {os.path.getsize(path)} bytes to {path}"
+        finally:
+            if os.path.exists(staging):
+                os.remove(staging)
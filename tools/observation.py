@@ -0,0 +1,33 @@
+from core.memory.blob_store import get_blob_store
+from tools.base import BaseTool
+
+class ReadObservationTool(BaseTool):
+    name = "read_observation"
+    description = "分段读取被截断的大段观察结果 (工具输出)，handle 来自观察结果末尾的提示"
+    args_schema = {
+        "handle": "string",
+        "offset": "int (optional, byte offset, default 0)",
+        "length": "int (optional, bytes, default 4000)"
+    }
+
+    MAX_LENGTH = 16000
+    # Output is already a bounded window of a stored blob
+    compact_output = False
+
+    def is_cacheable(self, **kwargs) -> bool:
+        # Blobs are content-addressed and never change
+        return True
+
+    def run(self, handle: str, offset: int = 0, length: int = 4000) -> str:
+        store = get_blob_store()
+        offset, length = int(offset), min(int(length), self.MAX_LENGTH)
+        total = store.size(handle)
+        if total < 0:
+            return f"Error: Unknown observation handle '{handle}'."
+
+        chunk = store.read(handle, offset, length)
+        end = min(offset + length, total)
+        footer = f"[bytes {offset}-{end} of {total}]"
+        if end < total:
+            footer += f" Next: offset={end}"
+        return f"{chunk}\n{footer}"
@@ -0,0 +1,107 @@
+import os
+import uuid
+from typing import Optional
+
+from core.memory.blob_store import BlobStore
+
+
+class OutputCapture:
+    """
+    有界的命令输出捕获：只在内存中保留前 head_bytes 和最后 tail_bytes 字节，中间部分只计数。
+    可选地把完整输出流式写入临时文件 (spill)，输出被截断时存入 BlobStore，
+    返回的 handle 可以用 read_observation 分段查看。
+    """
+
+    def __init__(self, head_bytes: int = 1536, tail_bytes: int = 2560, spill_store: Optional[BlobStore] = None):
+        self.head_bytes = head_bytes
+        self.tail_bytes = max(tail_bytes, 1024)  # The end-of-command sentinel must fit in the tail
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+        self.handle: Optional[str] = None
+        self._store = spill_store
+        self._spill_path: Optional[str] = None
+        self._spill = None
+        if spill_store is not None:
+            spill_dir = os.path.join(spill_store.storage_dir, "tmp")
+            os.makedirs(spill_dir, exist_ok=True)
+            self._spill_path = os.path.join(spill_dir, f"{uuid.uuid4().hex}.spill")
+            self._spill = open(self._spill_path, "wb")
+
+    @property
+    def dropped(self) -> int:
+        return self.total - len(self.head) - len(self.tail)
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        if self._spill is not None:
+            self._spill.write(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.tail_bytes:
+                del self.tail[:len(self.tail) - self.tail_bytes]
+
+    def contains(self, token: bytes) -> bool:
+        """Whether token was written last; only the tail (and head while nothing was dropped) is searched."""
+        if token in self.tail:
+            return True
+        return self.dropped == 0 and token in bytes(self.head + self.tail)
+
+    def cut(self, token: bytes) -> bytes:
+        """Remove token and everything after it from the capture; returns what followed the token."""
+        if self.dropped == 0:
+            data = bytes(self.head + self.tail)
+            index = data.rfind(token)
+            if index < 0:
+                return b""
+            rest = data[index + len(token):]
+            data = data[:index]
+            self.head, self.tail = bytearray(data[:self.head_bytes]), bytearray(data[self.head_bytes:])
+        else:
+            index = self.tail.rfind(token)
+            if index < 0:
+                return b""
+            rest = bytes(self.tail[index + len(token):])
+            del self.tail[index:]
+        removed = len(token) + len(rest)
+        self.total -= removed
+        if self._spill is not None:
+            self._spill.flush()
+            self._spill.truncate(self.total)
+        return rest
+
+    def last_line(self, limit: int = 200) -> str:
+        data = bytes(self.tail) if self.dropped else bytes(self.head + self.tail)
+        if b"\n" in data[:-1]:
+            # Prefer the last complete line over a line still being written
+            data = data[:data.rfind(b"\n")]
+        line = data[data.rfind(b"\n") + 1:]
+        return line[-limit:].decode("utf-8", errors="replace")
+
+    def finish(self) -> Optional[str]:
+        """Close the spill file; keep it in the BlobStore only if the in-memory capture was truncated."""
+        if self._spill is None:
+            return self.handle
+        self._spill.close()
+        self._spill = None
+        try:
+            if self.dropped > 0:
+                self.handle = self._store.put_file(self._spill_path)
+        finally:
+            if os.path.exists(self._spill_path):
+                os.remove(self._spill_path)
+        return self.handle
+
+    def text(self) -> str:
+        head = bytes(self.head).decode("utf-8", errors="replace")
+        if not self.dropped:
+            return bytes(self.head + self.tail).decode("utf-8", errors="replace")
+        tail = bytes(self.tail).decode("utf-8", errors="replace")
+        note = f"\n...[{self.dropped} bytes omitted of {self.total}"
+        if self.handle:
+            note += f"; full output: handle={self.handle}, use read_observation"
+        return head + note + "]...\n" + tail
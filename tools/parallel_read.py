@@ -0,0 +1,172 @@
+import glob
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Union
+
+from tools.base import report_progress
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # forkserver/spawn: forking a threaded web server process is unsafe
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def _discard_pool():
+    """Kill a pool whose workers are stuck past their timeout; the next call starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is None:
+        return
+    processes = list(getattr(pool, "_processes", {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    # ProcessPoolExecutor cannot cancel a running call; terminate the worker processes directly
+    for process in processes:
+        process.terminate()
+
+
+class _Timeout(BaseException):
+    """BaseException so the broad `except Exception` handlers inside FileTool let it through."""
+
+
+def _alarm(signum, frame):
+    raise _Timeout()
+
+
+def _read_in_worker(path: str, max_chars: int, timeout: int) -> Dict:
+    """Runs in a pool process: parse one file with FileTool, bounded by SIGALRM where available."""
+    from tools.file import FileTool
+
+    start = time.time()
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.alarm(max(int(timeout), 1))
+    try:
+        text = FileTool()._read_file(path)
+        error = text.startswith("Error")
+    except _Timeout:
+        text, error = f"Error: Timed out after {timeout}s.", True
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+    return {
+        "path": path,
+        "chars": len(text),
+        "text": text if len(text) <= max_chars else text[:max_chars] + "\n...(truncated)",
+        "error": error,
+        "seconds": round(time.time() - start, 3)
+    }
+
+
+class ParallelReader:
+    """
+    read_many：一次读取多个文件 (路径列表或 glob)。CPU 密集的解析 (xlsx/docx/pptx/pdf 文本提取)
+    在 ProcessPoolExecutor 上并行执行，绕开 GIL；每个文件完成后立即通过 report_progress
+    推送 TOOL_PROGRESS 事件，最终结果按输入顺序汇总，总字节数有上限。
+    """
+
+    def __init__(self, max_files: int = 50, max_total_chars: int = 60000, min_file_chars: int = 500,
+                 timeout: int = 30):
+        self.max_files = max_files
+        self.max_total_chars = max_total_chars
+        self.min_file_chars = min_file_chars
+        self.timeout = timeout
+
+    def expand(self, paths: Union[str, List[str]]) -> List[str]:
+        patterns = [p.strip() for p in paths.split(",")] if isinstance(paths, str) else list(paths)
+        found: List[str] = []
+        for pattern in patterns:
+            if any(c in pattern for c in "*?["):
+                found.extend(sorted(glob.glob(pattern, recursive=True)))
+            else:
+                found.append(pattern)
+        seen = set()
+        unique = [p for p in found if not (p in seen or seen.add(p))]
+        # Missing paths are kept so they are reported as errors
+        return [p for p in unique if not os.path.isdir(p)]
+
+    def read_many(self, paths: Union[str, List[str]], timeout: Optional[int] = None,
+                  max_chars: Optional[int] = None) -> str:
+        files = self.expand(paths)
+        if not files:
+            return f"Error: No files matched {paths!r}."
+        skipped = files[self.max_files:]
+        files = files[:self.max_files]
+        timeout = timeout or self.timeout
+        budget = min(max_chars or self.max_total_chars, self.max_total_chars)
+        # Every file gets an equal share of the output budget
+        per_file = max(budget // len(files), self.min_file_chars)
+
+        results: Dict[str, Dict] = {}
+        pool = _get_pool()
+        futures = {pool.submit(_read_in_worker, path, per_file, timeout): path for path in files}
+        workers = os.cpu_count() or 1
+        # Backstop for platforms without SIGALRM: every file gets its timeout, queued behind the others
+        deadline = time.time() + timeout * (-(-len(files) // workers)) + 5
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.time(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"path": path, "chars": 0, "text": f"Error: {e}", "error": True, "seconds": None}
+                results[path] = result
+                report_progress({
+                    "file": path,
+                    "done": len(results),
+                    "total": len(files),
+                    "chars": result["chars"],
+                    "error": result["error"],
+                    "seconds": result["seconds"]
+                })
+
+        if pending:
+            # Deadline passed with files still queued or stuck in a worker
+            _discard_pool()
+
+        parts = []
+        used = 0
+        for path in files:
+            result = results.get(path)
+            if result is None:
+                parts.append(f"=== {path} ===\n(not read: timed out)")
+                continue
+            text = result["text"]
+            if used + len(text) > budget:
+                text = text[:max(budget - used, 0)] + "\n...(output budget exhausted)"
+            used += len(text)
+            parts.append(f"=== {path} ({result['chars']} chars) ===\n{text}")
+        if skipped:
+            parts.append(f"[{len(skipped)} more files not read; max_files={self.max_files}]")
+
+        ok = sum(1 for r in results.values() if not r["error"])
+        header = f"Read {ok}/{len(files)} files ({len(results) - ok} errors), {used} chars returned."
+        return header + "\n\n" + "\n\n".join(parts)
+
+
+# ====== Global Singleton ======
+_reader = None
+
+def get_parallel_reader() -> ParallelReader:
+    global _reader
+    if _reader is None:
+        _reader = ParallelReader()
+    return _reader
@@ -0,0 +1,52 @@
+from tools.base import BaseTool, current_tool_context
+from tools.python_kernel import get_kernel_pool
+
+
+class PythonTool(BaseTool):
+    name = "python"
+    description = "在常驻的 Python 解释器中执行代码 (类似 notebook cell)：变量在多次调用之间保留，pandas/numpy 已预先导入，最后一个表达式的值会被返回。数据分析优先用它而不是 shell 的 python -c"
+    args_schema = {
+        "code": "string (Python source; the value of a trailing expression is shown)",
+        "timeout": "int (optional, seconds, default 30, max 300)",
+        "reset": "bool (optional, restart the interpreter and clear all variables first)"
+    }
+
+    DEFAULT_TIMEOUT = 30
+    MAX_TIMEOUT = 300
+
+    def run(self, code: str, timeout: int = DEFAULT_TIMEOUT, reset=False) -> str:
+        if isinstance(reset, str):
+            reset = reset.lower() in ("true", "1", "yes")
+        context = current_tool_context()
+        agent_id = context.agent_id if context else "default"
+        pool = get_kernel_pool()
+        if reset:
+            pool.reset(agent_id)
+        if not code.strip():
+            return "Python kernel reset." if reset else "Error: 'code' is required."
+
+        timeout = min(max(int(timeout or self.DEFAULT_TIMEOUT), 1), self.MAX_TIMEOUT)
+        try:
+            result = pool.run(agent_id, code, timeout=timeout)
+        except Exception as e:
+            return f"Error executing Python code: {str(e)}"
+
+        parts = []
+        if result.get("stdout"):
+            parts.append(result["stdout"].rstrip("\n"))
+        if result.get("stderr"):
+            parts.append(f"STDERR: {result['stderr'].rstrip()}")
+        if result.get("value") is not None:
+            parts.append(f"Out: {result['value']}")
+        if result.get("error"):
+            parts.append(f"Error: {result['error'].rstrip()}")
+        if result.get("new_kernel") and not reset:
+            parts.append("(Started a new Python kernel; variables from earlier calls are not available.)")
+        return "\n".join(parts) or "(No output)"
+
+    def warm_up(self):
+        # Start a kernel now so the first cell does not wait for the interpreter and the preload imports
+        get_kernel_pool().warm()
+
+    def stats(self):
+        return {"python_kernels": get_kernel_pool().stats()}
@@ -0,0 +1,300 @@
+import ast
+import atexit
+import io
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from llm.router import get_tool_options
+from tools.shell_session import get_shell_pool
+
+# config.json: {"tools": {"python": {"preload": [...]}}} overrides this
+DEFAULT_PRELOAD = ("numpy", "pandas")
+
+
+class _BoundedWriter(io.TextIOBase):
+    """stdout/stderr replacement inside the kernel: keeps the first max_chars, counts the rest."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts = []
+        self.size = 0
+        self.dropped = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        room = self.max_chars - self.size
+        if room > 0:
+            self.parts.append(text[:room])
+            self.size += min(len(text), room)
+        self.dropped += max(len(text) - max(room, 0), 0)
+        return len(text)
+
+    def getvalue(self) -> str:
+        text = "".join(self.parts)
+        if self.dropped:
+            text += f"\n...[{self.dropped} more chars not shown]"
+        return text
+
+
+def _execute(code: str, namespace: Dict[str, Any]) -> Optional[str]:
+    """exec the cell; like a notebook, the value of a trailing expression is returned as its repr."""
+    tree = ast.parse(code, filename="<cell>", mode="exec")
+    last = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last = ast.Expression(tree.body.pop().value)
+    exec(compile(tree, "<cell>", "exec"), namespace)
+    if last is not None:
+        value = eval(compile(last, "<cell>", "eval"), namespace)
+        if value is not None:
+            return repr(value)
+    return None
+
+
+def _format_error(e: BaseException) -> str:
+    """Traceback starting at the first frame of the cell (the kernel's own frames are noise)."""
+    tb = e.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != "<cell>":
+        tb = tb.tb_next
+    if tb is None:
+        # e.g. SyntaxError raised while parsing the cell
+        return "".join(traceback.format_exception_only(type(e), e))
+    return "".join(traceback.format_exception(type(e), e, tb))
+
+
+def _kernel_main(conn, cwd: str, preload: Tuple[str, ...], memory_limit_mb: int):
+    """Runs in the kernel process: warm up, then execute cells from conn until it closes."""
+    import sys
+
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    os.chdir(cwd)
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+
+    loaded, failed = [], []
+    for module in preload:
+        try:
+            __import__(module)
+            loaded.append(module)
+        except Exception:
+            failed.append(module)
+    conn.send({"ready": True, "preloaded": loaded, "failed": failed})
+
+    namespace: Dict[str, Any] = {"__name__": "__main__"}
+    while True:
+        try:
+            code, max_chars, cwd = conn.recv()
+        except (EOFError, OSError):
+            return
+        if cwd and cwd != os.getcwd() and os.path.isdir(cwd):
+            # Follow the agent's shell session (cd there) so both tools resolve relative paths alike
+            os.chdir(cwd)
+        out, err = _BoundedWriter(max_chars), _BoundedWriter(max_chars)
+        sys.stdout, sys.stderr = out, err
+        value, error, interrupted = None, None, False
+        start = time.time()
+        try:
+            value = _execute(code, namespace)
+        except KeyboardInterrupt:
+            interrupted = True
+            error = "KeyboardInterrupt: cell interrupted (timeout). Variables defined before the interrupt are kept."
+        except BaseException as e:
+            error = _format_error(e)
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+        if value is not None and len(value) > max_chars:
+            value = value[:max_chars] + "..."
+        try:
+            conn.send({"stdout": out.getvalue(), "stderr": err.getvalue(), "value": value, "error": error,
+                       "interrupted": interrupted, "seconds": round(time.time() - start, 3)})
+        except (EOFError, OSError):
+            return
+
+
+class PythonKernel:
+    """One long-lived interpreter process; variables persist between cells."""
+
+    def __init__(self, cwd: str, preload: Tuple[str, ...], memory_limit_mb: int):
+        # forkserver/spawn: forking a threaded web server process is unsafe
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(method)
+        self._conn, child = context.Pipe()
+        self.process = context.Process(target=_kernel_main, args=(child, cwd, tuple(preload), memory_limit_mb),
+                                       daemon=True)
+        self.process.start()
+        child.close()
+        self.started_at = time.time()
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+        self.ready: Optional[dict] = None
+        self.cells = 0
+        # True when this kernel replaces an earlier one of the same agent (its variables are gone)
+        self.replaced = False
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def wait_ready(self, timeout: float) -> bool:
+        if self.ready is None and self._conn.poll(timeout):
+            self.ready = self._conn.recv()
+        return self.ready is not None
+
+    def execute(self, code: str, timeout: float, max_chars: int, cwd: Optional[str] = None) -> Dict[str, Any]:
+        """Run one cell in cwd; call with self.lock held. On timeout the cell is interrupted, then the kernel killed."""
+        self.last_used = time.time()
+        self.cells += 1
+        self._conn.send((code, max_chars, cwd))
+        if self._conn.poll(timeout):
+            return self._conn.recv()
+        # SIGINT raises KeyboardInterrupt inside the cell and keeps the kernel state
+        os.kill(self.process.pid, signal.SIGINT)
+        if self._conn.poll(2):
+            result = self._conn.recv()
+            result["timed_out"] = True
+            return result
+        self.close()
+        return {"stdout": "", "stderr": "", "value": None, "timed_out": True, "restarted": True,
+                "error": f"Cell did not stop after {timeout}s and an interrupt; the kernel was restarted (variables lost)."}
+
+    def close(self):
+        try:
+            self._conn.close()
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+
+
+class PythonKernelPool:
+    """
+    每个 Agent 一个常驻 Python 解释器进程 (类似 Jupyter kernel)：
+      - 变量在多次调用之间保留，pandas/numpy 等重型模块在启动时预先导入 (warm-up)，之后每个 cell 只需毫秒级
+      - 每个 cell 有超时：先发送 SIGINT 中断 (保留状态)，中断无效再重启 kernel
+      - 内存上限 (RLIMIT_AS)；空闲超过 idle_timeout 或数量超过 max_kernels (LRU) 时回收
+    注意：这不是安全沙箱，kernel 拥有与 shell 中运行 python 相同的权限。
+    """
+
+    def __init__(self, max_kernels: int = 8, idle_timeout: float = 600, memory_limit_mb: int = 2048,
+                 preload: Tuple[str, ...] = DEFAULT_PRELOAD, max_output_chars: int = 20000,
+                 ready_timeout: float = 120):
+        self.max_kernels = max_kernels
+        self.idle_timeout = idle_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.preload = tuple(preload)
+        self.max_output_chars = max_output_chars
+        self.ready_timeout = ready_timeout
+        self._kernels: "OrderedDict[str, PythonKernel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._seen = set()
+        # Kernel started by warm() before any agent needed one; the next new agent adopts it
+        self._spare: Optional[PythonKernel] = None
+        self.started = 0
+        self.recycled = 0
+
+    def _evict(self):
+        now = time.time()
+        stale = [k for k, kernel in self._kernels.items()
+                 if now - kernel.last_used > self.idle_timeout and not kernel.lock.locked()]
+        while len(self._kernels) - len(stale) >= self.max_kernels:
+            victim = next((k for k, kernel in self._kernels.items()
+                           if k not in stale and not kernel.lock.locked()), None)
+            if victim is None:
+                break
+            stale.append(victim)
+        for key in stale:
+            self._kernels.pop(key).close()
+            # A later kernel for this agent starts fresh; no "variables were lost" note, and _seen stays bounded
+            self._seen.discard(key)
+            self.recycled += 1
+
+    def get(self, agent_id: str) -> PythonKernel:
+        """The agent's kernel, started (and warming up in the background) if needed."""
+        with self._lock:
+            self._evict()
+            kernel = self._kernels.get(agent_id)
+            if kernel is None or not kernel.alive:
+                kernel, self._spare = self._spare, None
+                if kernel is not None and kernel.alive:
+                    kernel.last_used = time.time()
+                else:
+                    kernel = PythonKernel(get_shell_pool().cwd(agent_id), self.preload, self.memory_limit_mb)
+                    self.started += 1
+                kernel.replaced = agent_id in self._seen
+                self._seen.add(agent_id)
+                self._kernels[agent_id] = kernel
+            self._kernels.move_to_end(agent_id)
+            return kernel
+
+    def warm(self):
+        """Start a spare kernel ahead of the first cell so the preload runs off the critical path."""
+        with self._lock:
+            if self._spare is None or not self._spare.alive:
+                # Cells are run in the agent's cwd, so the spare can start anywhere
+                self._spare = PythonKernel(os.getcwd(), self.preload, self.memory_limit_mb)
+                self.started += 1
+
+    def run(self, agent_id: str, code: str, timeout: float = 30) -> Dict[str, Any]:
+        kernel = self.get(agent_id)
+        with kernel.lock:
+            if not kernel.wait_ready(self.ready_timeout):
+                kernel.close()
+                return {"error": "Python kernel failed to start.", "stdout": "", "stderr": "", "value": None}
+            replaced = kernel.replaced and kernel.cells == 0
+            try:
+                result = kernel.execute(code, timeout, self.max_output_chars, get_shell_pool().cwd(agent_id))
+            except (EOFError, OSError, BrokenPipeError):
+                # Died mid-cell (e.g. memory limit, os._exit); the next call starts a new kernel
+                kernel.close()
+                result = {"stdout": "", "stderr": "", "value": None, "restarted": True,
+                          "error": "Python kernel exited (memory limit or exit call); variables were lost."}
+            result["new_kernel"] = replaced
+            return result
+
+    def reset(self, agent_id: str):
+        with self._lock:
+            kernel = self._kernels.pop(agent_id, None)
+            self._seen.discard(agent_id)
+        if kernel is not None:
+            kernel.close()
+
+    def close_all(self):
+        with self._lock:
+            kernels, self._kernels = list(self._kernels.values()), OrderedDict()
+            if self._spare is not None:
+                kernels.append(self._spare)
+                self._spare = None
+        for kernel in kernels:
+            kernel.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"kernels": len(self._kernels), "started": self.started, "recycled": self.recycled,
+                    "spare": self._spare is not None}
+
+
+# ====== Global Singleton ======
+_kernel_pool = None
+
+def get_kernel_pool() -> PythonKernelPool:
+    global _kernel_pool
+    if _kernel_pool is None:
+        options = get_tool_options("python")
+        _kernel_pool = PythonKernelPool(preload=tuple(options.get("preload", DEFAULT_PRELOAD)))
+        atexit.register(_kernel_pool.close_all)
+    return _kernel_pool
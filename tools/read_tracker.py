@@ -0,0 +1,186 @@
+import difflib
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+SIGNATURE_BYTES = 64
+HASH_BLOCK = 1024 * 1024
+
+
+@dataclass
+class _Snapshot:
+    digest: str               # sha256 of the first `size` bytes
+    size: int
+    signature: bytes          # last bytes before `size`, a cheap first check for pure appends
+    content: Optional[str]    # None when the file was too large to keep
+    mtime_ns: Optional[int] = None
+
+
+class ReadTracker:
+    """
+    记录每个 Agent 上一次读取某个文件时的内容摘要和快照，重复读取 (mode="diff") 时只返回变化：
+      - 文件只是被追加 (日志，原有部分的 sha256 不变)：返回新增的尾部
+      - 内容有修改：返回 unified diff (diff 比全文还长时返回全文)
+      - 没有变化：返回一行提示
+    快照按字节预算做 LRU；超过 max_snapshot_bytes 的文件只保存摘要和尾部签名 (仍可识别追加)。
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_snapshot_bytes: int = 1024 * 1024,
+                 max_output_chars: int = 20000):
+        self.max_bytes = max_bytes
+        self.max_snapshot_bytes = max_snapshot_bytes
+        self.max_output_chars = max_output_chars
+        self._snapshots: "OrderedDict[Tuple[str, str], _Snapshot]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cost(snapshot: _Snapshot) -> int:
+        return len(snapshot.content.encode("utf-8")) if snapshot.content is not None else 0
+
+    def _get(self, key) -> Optional[_Snapshot]:
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+            return snapshot
+
+    def _put(self, key, snapshot: _Snapshot):
+        with self._lock:
+            old = self._snapshots.pop(key, None)
+            if old is not None:
+                self._bytes -= self._cost(old)
+            self._snapshots[key] = snapshot
+            self._bytes += self._cost(snapshot)
+            while self._bytes > self.max_bytes and len(self._snapshots) > 1:
+                _, evicted = self._snapshots.popitem(last=False)
+                self._bytes -= self._cost(evicted)
+
+    def forget(self, agent_id: str):
+        with self._lock:
+            for key in [k for k in self._snapshots if k[0] == agent_id]:
+                self._bytes -= self._cost(self._snapshots.pop(key))
+
+    # ---------- Plain text files ----------
+    def read_text(self, agent_id: str, path: str, full_read: Callable[[], str]) -> str:
+        """Diff read of a plain text file; full_read() renders the (windowed) full read."""
+        key = (agent_id, os.path.abspath(path))
+        st = os.stat(path)
+        size = st.st_size
+        previous = self._get(key)
+
+        if previous is not None and size >= previous.size and self._is_append(path, previous):
+            if size == previous.size and st.st_mtime_ns == previous.mtime_ns:
+                return f"(no changes since last read: {path}, {size} bytes)"
+            # The tail signature matches; make sure nothing before it was edited in place
+            prefix, digest = self._digests(path, previous.size, size)
+            if prefix == previous.digest:
+                if size == previous.size:
+                    self._put(key, _Snapshot(digest, size, previous.signature, previous.content, st.st_mtime_ns))
+                    return f"(no changes since last read: {path}, {size} bytes)"
+                tail, snapshot = self._read_appended(path, previous, size)
+                snapshot.digest, snapshot.mtime_ns = digest, st.st_mtime_ns
+                self._put(key, snapshot)
+                return f"[Appended since last read: bytes {previous.size}-{size}]\n{tail}"
+
+        if size <= self.max_snapshot_bytes:
+            with open(path, "rb") as f:
+                data = f.read()
+            text = data.decode("utf-8", errors="ignore")
+            snapshot = _Snapshot(hashlib.sha256(data).hexdigest(), len(data), data[-SIGNATURE_BYTES:], text,
+                                 st.st_mtime_ns)
+            self._put(key, snapshot)
+            if previous is not None and previous.content is not None:
+                return self._diff(path, previous.content, text, full_read)
+            return full_read()
+
+        # Too large to snapshot: remember digest + signature so a later append is still recognised
+        _, digest = self._digests(path, 0, size)
+        with open(path, "rb") as f:
+            f.seek(max(size - SIGNATURE_BYTES, 0))
+            signature = f.read()
+        self._put(key, _Snapshot(digest, size, signature, None, st.st_mtime_ns))
+        return full_read()
+
+    @staticmethod
+    def _digests(path: str, prefix_size: int, size: int) -> Tuple[str, str]:
+        """sha256 of the first prefix_size bytes and of the first size bytes, in one pass."""
+        hasher = hashlib.sha256()
+        prefix = None
+        done = 0
+        with open(path, "rb") as f:
+            for end in (prefix_size, size):
+                while done < end:
+                    block = f.read(min(HASH_BLOCK, end - done))
+                    if not block:
+                        break
+                    hasher.update(block)
+                    done += len(block)
+                if prefix is None:
+                    prefix = hasher.hexdigest()
+        return prefix, hasher.hexdigest()
+
+    @staticmethod
+    def _is_append(path: str, previous: _Snapshot) -> bool:
+        with open(path, "rb") as f:
+            f.seek(max(previous.size - len(previous.signature), 0))
+            return f.read(len(previous.signature)) == previous.signature
+
+    def _read_appended(self, path: str, previous: _Snapshot, size: int) -> Tuple[str, _Snapshot]:
+        with open(path, "rb") as f:
+            start = previous.size
+            # Only the newest max_output_chars bytes are returned for a very large append
+            skip = max(size - start - self.max_output_chars, 0)
+            f.seek(start + skip)
+            appended = f.read(size - start - skip)
+        tail = appended.decode("utf-8", errors="ignore")
+        if skip:
+            tail = f"...({skip} earlier appended bytes omitted; use offset={start} to page)\n" + tail
+
+        content = None
+        if previous.content is not None and size <= self.max_snapshot_bytes and not skip:
+            content = previous.content + tail
+        signature = (previous.signature + appended)[-SIGNATURE_BYTES:]
+        # digest / mtime_ns are filled in by the caller
+        return tail, _Snapshot("", size, signature, content)
+
+    # ---------- Rendered reads (docx / pptx / tables) ----------
+    def read_rendered(self, agent_id: str, path: str, text: str) -> str:
+        """Diff read for formats whose read output is rendered text rather than raw bytes."""
+        key = (agent_id, os.path.abspath(path))
+        previous = self._get(key)
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        keep = text if len(data) <= self.max_snapshot_bytes else None
+        self._put(key, _Snapshot(digest, len(data), b"", keep))
+
+        if previous is None:
+            return text
+        if previous.digest == digest:
+            return f"(no changes since last read: {path})"
+        if previous.content is None:
+            return text
+        return self._diff(path, previous.content, text, lambda: text)
+
+    def _diff(self, path: str, old: str, new: str, full_read: Callable[[], str]) -> str:
+        if old == new:
+            return f"(no changes since last read: {path})"
+        diff = "".join(difflib.unified_diff(old.splitlines(keepends=True), new.splitlines(keepends=True),
+                                            fromfile=f"{path} (last read)", tofile=path, n=2))
+        if len(diff) >= len(new) or len(diff) > self.max_output_chars:
+            # Diff would not save anything; fall back to a normal read
+            return full_read()
+        return f"[Changes since last read]\n{diff}"
+
+
+# ====== Global Singleton ======
+_read_tracker = None
+
+def get_read_tracker() -> ReadTracker:
+    global _read_tracker
+    if _read_tracker is None:
+        _read_tracker = ReadTracker()
+    return _read_tracker
@@ -0,0 +1,30 @@
+from core.memory.lexical import get_lexical_index
+from tools.base import BaseTool
+
+class RecallTool(BaseTool):
+    name = "recall"
+    description = "在历史执行记录 (任务步骤、工具观察结果) 中按关键词精确检索，例如文件路径、命令名、错误信息"
+    args_schema = {
+        "query": "string",
+        "k": "int (optional, default 5)",
+        "source": "string (optional, e.g. task_history)"
+    }
+
+    def run(self, query: str, k: int = 5, source: str = None) -> str:
+        if not query or not query.strip():
+            return "Error: query is required."
+        try:
+            hits = get_lexical_index().search(query, k=int(k), source=source or None)
+        except Exception as e:
+            return f"Error searching history: {str(e)}"
+
+        if not hits:
+            return "No matching records."
+        lines = []
+        for score, record in hits:
+            meta = record.get("metadata") or {}
+            label = record.get("source") or "record"
+            if meta.get("goal"):
+                label += f" | task: {meta['goal']}"
+            lines.append(f"[{label}] (bm25={score:.1f})\n{record['text']}")
+        return "\n\n".join(lines)
@@ -1,13 +1,126 @@
-from typing import List, Optional
+import importlib
+import threading
+import time
+from importlib import metadata
+from typing import Dict, Iterable, List, Optional
+
 from tools.base import BaseTool
 
-_registry = {}
+# 内置工具清单：name -> "module:Class"。
+# 只记录导入路径，工具模块 (以及 pandas / docx / pptx 等重型依赖) 在第一次 get_tool 时才导入
+BUILTIN_TOOLS: Dict[str, str] = {
+    "shell": "tools.shell:ShellTool",
+    "file": "tools.file:FileTool",
+    "dir": "tools.directory:DirTool",
+    "python": "tools.python_exec:PythonTool",
+    "summarize": "tools.summarize:SummarizeTool",
+    "recall": "tools.recall:RecallTool",
+    "read_observation": "tools.observation:ReadObservationTool",
+}
+
+# 外部插件通过 entry point 提供工具，例如在插件的 pyproject.toml 中：
+#   [project.entry-points."memora.tools"]
+#   weather = "memora_weather.tool:WeatherTool"
+# 发现阶段只读取安装包的元数据，不导入插件模块
+ENTRY_POINT_GROUP = "memora.tools"
+
+_registry: Dict[str, BaseTool] = {}
+_manifest: Optional[Dict[str, str]] = None
+_failed: Dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def _discover_entry_points() -> Dict[str, str]:
+    try:
+        eps = metadata.entry_points()
+        group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, "select") else eps.get(ENTRY_POINT_GROUP, [])
+        return {ep.name: ep.value for ep in group}
+    except Exception as e:
+        print(f"[Registry] Failed to read tool entry points: {e}")
+        return {}
+
+
+def manifest() -> Dict[str, str]:
+    """All known tools (name -> "module:Class"); nothing is imported."""
+    global _manifest
+    if _manifest is None:
+        found = _discover_entry_points()
+        for name in found.keys() & BUILTIN_TOOLS.keys():
+            print(f"[Registry] Plugin tool '{name}' ({found[name]}) shadows a built-in tool; keeping the built-in")
+        found.update(BUILTIN_TOOLS)
+        _manifest = found
+    return _manifest
+
+
+def _load(name: str, target: str) -> Optional[BaseTool]:
+    module_name, _, attr = target.partition(":")
+    try:
+        tool = getattr(importlib.import_module(module_name), attr)()
+    except Exception as e:
+        # Usually a missing optional dependency; remember it instead of re-importing every step
+        _failed[name] = str(e)
+        print(f"[Registry] Failed to load tool '{name}' from {target}: {e}")
+        return None
+    tool.name = getattr(tool, "name", None) or name
+    return tool
+
 
 def register(tool: BaseTool):
-    _registry[tool.name] = tool
+    """Register a tool instance directly; takes precedence over the manifest."""
+    with _lock:
+        _registry[tool.name] = tool
+        _failed.pop(tool.name, None)
+
 
 def get_tool(name: str) -> Optional[BaseTool]:
-    return _registry.get(name)
+    tool = _registry.get(name)
+    if tool is not None:
+        return tool
+    target = manifest().get(name)
+    if target is None or name in _failed:
+        return None
+    # Import outside the lock: a slow import must not block lookups of tools that are already loaded
+    tool = _load(name, target)
+    if tool is None:
+        return None
+    with _lock:
+        return _registry.setdefault(name, tool)
+
+
+def tool_names() -> List[str]:
+    """Names of all registered and discoverable tools, without importing any of them."""
+    return sorted(set(manifest()) | set(_registry))
+
 
 def list_tools() -> List[BaseTool]:
-    return list(_registry.values())
+    """All tools, loading each one that is not loaded yet."""
+    return [tool for tool in (get_tool(name) for name in tool_names()) if tool is not None]
+
+
+def warm_up(names: Optional[Iterable[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+    """
+    预先加载工具及其重型依赖 (BaseTool.warm_up)，让第一次工具调用不用承担导入耗时。
+    background=True 时在守护线程中执行并立即返回该线程。
+    """
+    names = list(names) if names is not None else tool_names()
+
+    def run():
+        start = time.time()
+        loaded = 0
+        for name in names:
+            tool = get_tool(name)
+            if tool is None:
+                continue
+            try:
+                tool.warm_up()
+                loaded += 1
+            except Exception as e:
+                print(f"[Registry] Warm-up of tool '{name}' failed: {e}")
+        print(f"[Registry] Warmed up {loaded} tools in {time.time() - start:.2f}s")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="tool-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -1,18 +1,36 @@
+import os
+import shlex
 import subprocess
-from tools.base import BaseTool
+from tools.base import BaseTool, current_tool_context
+from core.memory.blob_store import get_blob_store
+from tools.output_capture import OutputCapture
+from tools.shell_jobs import get_job_supervisor
+from tools.shell_session import get_shell_pool
 
 class ShellTool(BaseTool):
     name = "shell"
-    description = "在本地执行安全的命令行操作，例如查看目录、系统信息、打印文本等"
+    description = "在本地执行安全的命令行操作，例如查看目录、系统信息、打印文本等。每个 Agent 有常驻的 shell 会话，cd / export 在命令之间保留"
     args_schema = {
-        "command": "string"
+        "command": "string",
+        "action": "string (optional: run (default) | start (background job, returns job_id) | poll | wait | kill | jobs)",
+        "job_id": "string (optional, for poll / wait / kill)",
+        "timeout": "int (optional, seconds; run: default 10, max 120; start: default 600, max 3600; wait: max seconds to wait)"
     }
+    examples = [{"command": "python -m pytest", "action": "start", "timeout": 900}]
 
     # 安全白名单
     ALLOWED_COMMANDS = [
         "ls", "pwd", "whoami", "uname", "python", "cat", "echo", "date",
-        "mkdir", "touch", "cp", "mv", "grep", "find", "head", "tail", "wc"
+        "mkdir", "touch", "cp", "mv", "grep", "find", "head", "tail", "wc", "cd", "export"
     ]
+
+    TIMEOUT = 10
+    MAX_TIMEOUT = 120
+    JOB_TIMEOUT = 600
+    MAX_JOB_TIMEOUT = 3600
+    MAX_WAIT = 120
+    # Session output is already bounded to a head + tail, with the full text behind a handle
+    compact_output = False
     
     # 危险黑名单 (前缀匹配)
     FORBIDDEN_PREFIXES = [
@@ -20,9 +38,86 @@ class ShellTool(BaseTool):
         ":(){ :|:& };:" # Fork bomb
     ]
 
-    def run(self, command: str) -> str:
+    # 只读命令：结果可在会话内缓存复用
+    READ_ONLY_COMMANDS = [
+        "ls", "pwd", "whoami", "uname", "cat", "grep", "find", "head", "tail", "wc"
+    ]
+
+    def is_cacheable(self, command: str = "", action: str = "run", **kwargs) -> bool:
+        if (action or "run").lower() != "run":
+            # Job state changes between calls
+            return False
         command = command.strip()
-        
+        # Redirections / command chaining may write or run something else
+        if not command or any(c in command for c in (">", ";", "&", "|", "`", "$(")):
+            return False
+        if "-exec" in command or "-delete" in command:
+            return False
+        return command.split()[0] in self.READ_ONLY_COMMANDS
+
+    def cache_paths(self, command: str = "", **kwargs):
+        try:
+            tokens = shlex.split(command)
+        except ValueError:
+            return None
+        if not tokens:
+            return None
+        head, rest = tokens[0], tokens[1:]
+        if head in ("whoami", "uname"):
+            return []
+        flags = "".join(t for t in rest if t.startswith("-") and not t.startswith("--"))
+        if head in ("pwd", "find") or (head == "grep" and ("r" in flags or "R" in flags)) or (head == "ls" and "R" in flags):
+            # Depends on the cwd only, or walks a tree whose changes don't show in the top directory's mtime
+            return None
+        operands = [t for t in rest if not t.startswith("-")]
+        if head == "grep" and operands and not any(t in ("-e", "-f") or t.startswith(("--regexp", "--file")) for t in rest):
+            operands = operands[1:]  # the pattern
+        if head == "ls" and not operands:
+            operands = ["."]
+        # Relative to the agent's shell session, which cd moves; absolute paths also keep cache keys apart
+        cwd = get_shell_pool().cwd(self._agent_id()) if os.name == "posix" else os.getcwd()
+        return [os.path.normpath(os.path.join(cwd, os.path.expanduser(p))) for p in operands]
+
+    def run(self, command: str = "", action: str = "run", job_id: str = "", timeout: int = None) -> str:
+        action = (action or "run").lower()
+        command = command.strip()
+        if action in ("poll", "wait", "kill", "jobs"):
+            return self._manage_job(action, job_id.strip(), timeout)
+        if action not in ("run", "start"):
+            return f"Error: Unknown action '{action}'. Use run, start, poll, wait, kill or jobs."
+
+        error = self._check(command)
+        if error:
+            return error
+        if action == "start":
+            return self._start_job(command, timeout)
+        timeout = min(max(int(timeout or self.TIMEOUT), 1), self.MAX_TIMEOUT)
+
+        if os.name != "posix":
+            return self._run_once(command, timeout)
+
+        agent_id = self._agent_id()
+        try:
+            # Persistent per-agent session: no fork/exec of a new shell, cwd/env survive between calls
+            result = get_shell_pool().run(agent_id, command, timeout=timeout)
+        except Exception as e:
+            return f"Error executing command: {str(e)}"
+
+        output = result.stdout
+        if result.stderr:
+            output += f"\nSTDERR: {result.stderr}"
+        if result.timed_out:
+            message = f"Error: Command timed out after {timeout}s. (The shell session was restarted in the same directory.)"
+            hint = " Use action=\"start\" to run long commands in the background."
+            return f"{message}{hint}\nPartial output:\n{output.strip()}" if output.strip() else message + hint
+        if result.session_restarted:
+            output += "\n(The command ended the shell session; a new one will be started.)"
+        elif result.exit_code:
+            output += f"\n(exit code {result.exit_code})"
+        return output.strip() or "(No output)"
+
+    def _check(self, command: str):
+        """Allow/deny checks applied to every command, foreground or background."""
         # 简单安全检查
         cmd_head = command.split()[0] if command else ""
         
@@ -36,7 +131,50 @@ class ShellTool(BaseTool):
         # 2. 检查白名单 (Explicit Allow)
         if not any(command.startswith(allowed) for allowed in self.ALLOWED_COMMANDS):
              return f"Error: Command '{cmd_head}' is not in the allowed whitelist. Allowed: {', '.join(self.ALLOWED_COMMANDS)}"
+        return None
+
+    def _agent_id(self) -> str:
+        context = current_tool_context()
+        return context.agent_id if context else "default"
 
+    def _start_job(self, command: str, timeout) -> str:
+        if os.name != "posix":
+            return "Error: Background jobs are only supported on POSIX systems."
+        timeout = min(max(int(timeout or self.JOB_TIMEOUT), 1), self.MAX_JOB_TIMEOUT)
+        agent_id = self._agent_id()
+        try:
+            job = get_job_supervisor().start(agent_id, command, get_shell_pool().cwd(agent_id), timeout)
+        except Exception as e:
+            return f"Error starting job: {str(e)}"
+        return (f"Started job {job.id}: {command!r} (timeout {timeout}s). "
+                f"Use action=\"poll\" or \"wait\" with job_id=\"{job.id}\" to get its output.")
+
+    def _manage_job(self, action: str, job_id: str, timeout) -> str:
+        supervisor = get_job_supervisor()
+        agent_id = self._agent_id()
+        if action == "jobs":
+            jobs = supervisor.list(agent_id)
+            if not jobs:
+                return "No background jobs."
+            return "\n".join(supervisor.format_output(job, with_output=False) for job in jobs)
+        if not job_id:
+            return f"Error: 'job_id' is required for action '{action}'."
+        if action == "wait":
+            wait = min(max(int(timeout or self.MAX_WAIT), 0), self.MAX_WAIT)
+            job = supervisor.wait(agent_id, job_id, wait)
+        elif action == "kill":
+            job = supervisor.kill(agent_id, job_id)
+        else:
+            job = supervisor.get(agent_id, job_id)
+        if job is None:
+            return f"Error: Unknown job '{job_id}'."
+        output = supervisor.format_output(job)
+        if action == "wait" and not job.finished:
+            output += f"\n(still running after waiting {wait}s)"
+        return output
+
+    def _run_once(self, command: str, timeout: int) -> str:
+        """One-off subprocess per command (platforms without the session pool)."""
         try:
             # 执行命令
             result = subprocess.run(
@@ -44,12 +182,12 @@ class ShellTool(BaseTool):
                 shell=True, 
                 capture_output=True, 
                 text=True, 
-                timeout=10
+                timeout=timeout
             )
             
-            output = result.stdout
+            output = self._bounded(result.stdout)
             if result.stderr:
-                output += f"\nSTDERR: {result.stderr}"
+                output += f"\nSTDERR: {self._bounded(result.stderr)}"
                 
             return output.strip() or "(No output)"
             
@@ -57,3 +195,13 @@ class ShellTool(BaseTool):
             return "Error: Command timed out."
         except Exception as e:
             return f"Error executing command: {str(e)}"
+
+    @staticmethod
+    def _bounded(text: str) -> str:
+        capture = OutputCapture(spill_store=get_blob_store())
+        capture.write(text.encode("utf-8"))
+        capture.finish()
+        return capture.text()
+
+    def stats(self):
+        return {"shell_sessions": get_shell_pool().stats()} if os.name == "posix" else None
@@ -0,0 +1,281 @@
+import atexit
+import os
+import selectors
+import shlex
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from core.jobs.queue import JobStatus
+from core.memory.blob_store import get_blob_store
+from tools.output_capture import OutputCapture
+
+
+@dataclass
+class ShellJob:
+    id: str
+    agent_id: str
+    command: str
+    cwd: str
+    timeout: float
+    status: str = JobStatus.QUEUED
+    exit_code: Optional[int] = None
+    timed_out: bool = False
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stdout: Optional[OutputCapture] = None
+    stderr: Optional[OutputCapture] = None
+    proc: Optional[subprocess.Popen] = None
+    cancelled: bool = False
+    # SIGTERM was sent; escalate to SIGKILL after this time
+    kill_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in JobStatus.FINISHED
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def describe(self, with_output: bool = True) -> str:
+        line = f"Job {self.id} [{self.status}] {self.command!r}"
+        if self.started_at is not None:
+            line += f" ({self.elapsed():.1f}s)"
+        if self.exit_code is not None:
+            line += f" exit code {self.exit_code}"
+        if self.timed_out:
+            line += f" timed out after {self.timeout:g}s"
+        if not with_output or self.stdout is None:
+            return line
+        parts = [line]
+        out, err = self.stdout.text().strip(), self.stderr.text().strip()
+        if out:
+            parts.append(out)
+        if err:
+            parts.append(f"STDERR: {err}")
+        return "\n".join(parts)
+
+
+class JobSupervisor:
+    """
+    后台 shell 任务：start 立即返回 job id，poll / wait / kill 按 Agent 的任务表管理。
+    一个守护线程负责全部任务：启动排队的任务 (最多 max_parallel 个同时运行)，
+    用 selector 把各任务的 stdout/stderr 读入有界的 OutputCapture，检查每个任务自己的 deadline
+    并终止超时任务的整个进程组。任务在 Agent shell 会话的当前目录中运行。
+    """
+
+    def __init__(self, max_parallel: int = 4, max_jobs_per_agent: int = 32, memory_limit_mb: int = 1024,
+                 spill_output: bool = True, finished_ttl: float = 3600):
+        self.max_parallel = max_parallel
+        self.max_jobs_per_agent = max_jobs_per_agent
+        # Finished jobs are forgotten this long after they end; empty agent tables are dropped
+        self.finished_ttl = finished_ttl
+        self.memory_limit_mb = memory_limit_mb
+        self.spill_output = spill_output
+        self._jobs: Dict[str, "OrderedDict[str, ShellJob]"] = {}
+        self._queue: List[ShellJob] = []
+        self._running: Dict[str, ShellJob] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._selector = selectors.DefaultSelector()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    # ---------- Public API ----------
+    def start(self, agent_id: str, command: str, cwd: str, timeout: float) -> ShellJob:
+        job = ShellJob(uuid.uuid4().hex[:8], agent_id, command, cwd, timeout)
+        with self._lock:
+            table = self._jobs.setdefault(agent_id, OrderedDict())
+            active = sum(1 for j in table.values() if not j.finished)
+            if active >= self.max_jobs_per_agent:
+                raise RuntimeError(f"Too many unfinished jobs ({active}); wait for or kill some first.")
+            table[job.id] = job
+            self._prune(table)
+            self._queue.append(job)
+            self._ensure_thread()
+            self._changed.notify_all()
+        return job
+
+    def get(self, agent_id: str, job_id: str) -> Optional[ShellJob]:
+        with self._lock:
+            return self._jobs.get(agent_id, {}).get(job_id)
+
+    def list(self, agent_id: str) -> List[ShellJob]:
+        with self._lock:
+            return list(self._jobs.get(agent_id, {}).values())
+
+    def wait(self, agent_id: str, job_id: str, timeout: float) -> Optional[ShellJob]:
+        deadline = time.time() + timeout
+        with self._changed:
+            job = self._jobs.get(agent_id, {}).get(job_id)
+            while job is not None and not job.finished:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return job
+
+    def kill(self, agent_id: str, job_id: str) -> Optional[ShellJob]:
+        with self._lock:
+            job = self._jobs.get(agent_id, {}).get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancelled = True
+            if job.status == JobStatus.QUEUED:
+                self._queue.remove(job)
+                self._finish(job, JobStatus.CANCELLED)
+            else:
+                job.kill_at = time.time() + 2
+                self._signal(job, signal.SIGTERM)
+        return job
+
+    def format_output(self, job: ShellJob, with_output: bool = True) -> str:
+        with self._lock:
+            return job.describe(with_output)
+
+    # ---------- Supervisor thread ----------
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="shell-jobs", daemon=True)
+            self._thread.start()
+
+    def _prune(self, table: "OrderedDict[str, ShellJob]"):
+        """Drop the oldest finished jobs once the agent's table is full."""
+        for job_id in [k for k, j in table.items() if j.finished][:max(len(table) - self.max_jobs_per_agent, 0)]:
+            del table[job_id]
+
+    def _expire(self, now: float):
+        """Forget jobs that finished more than finished_ttl ago, and agent tables left empty."""
+        for agent_id, table in list(self._jobs.items()):
+            for job_id in [k for k, j in table.items() if j.finished and now - j.finished_at > self.finished_ttl]:
+                del table[job_id]
+            if not table:
+                del self._jobs[agent_id]
+
+    def _launch(self, job: ShellJob):
+        shell = shutil.which("bash") or "/bin/sh"
+        prefix = f"ulimit -v {self.memory_limit_mb * 1024} 2>/dev/null; " if self.memory_limit_mb else ""
+        store = get_blob_store() if self.spill_output else None
+        job.stdout, job.stderr = OutputCapture(spill_store=store), OutputCapture(spill_store=store)
+        try:
+            job.proc = subprocess.Popen(
+                [shell, "-c", prefix + f"eval {shlex.quote(job.command)}"],
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                cwd=job.cwd if os.path.isdir(job.cwd) else None, start_new_session=True
+            )
+        except OSError as e:
+            job.stderr.write(str(e).encode("utf-8"))
+            self._finish(job, JobStatus.FAILED)
+            return
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        self._running[job.id] = job
+        self._selector.register(job.proc.stdout, selectors.EVENT_READ, (job, "stdout"))
+        self._selector.register(job.proc.stderr, selectors.EVENT_READ, (job, "stderr"))
+
+    def _signal(self, job: ShellJob, sig: int):
+        try:
+            os.killpg(job.proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _finish(self, job: ShellJob, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        for capture in (job.stdout, job.stderr):
+            if capture is not None:
+                capture.finish()
+        self._changed.notify_all()
+
+    def _close_pipes(self, job: ShellJob):
+        for pipe in (job.proc.stdout, job.proc.stderr):
+            if not pipe.closed:
+                self._selector.unregister(pipe)
+                pipe.close()
+
+    def _reap(self, job: ShellJob) -> bool:
+        """Finish a job whose process exited and whose pipes are drained; True when it was reaped."""
+        if job.proc.poll() is None:
+            return False
+        if not (job.proc.stdout.closed and job.proc.stderr.closed):
+            if not (job.timed_out or job.cancelled):
+                return False
+            # A killed job's pipes may be held open by a process that escaped its group
+            self._close_pipes(job)
+        del self._running[job.id]
+        job.exit_code = job.proc.returncode
+        if job.cancelled:
+            status = JobStatus.CANCELLED
+        elif job.exit_code == 0 and not job.timed_out:
+            status = JobStatus.SUCCEEDED
+        else:
+            status = JobStatus.FAILED
+        self._finish(job, status)
+        return True
+
+    def _loop(self):
+        while not self._closed:
+            with self._lock:
+                while self._queue and len(self._running) < self.max_parallel:
+                    self._launch(self._queue.pop(0))
+                now = time.time()
+                self._expire(now)
+                for job in self._running.values():
+                    if not job.timed_out and now - job.started_at > job.timeout:
+                        job.timed_out = True
+                        self._signal(job, signal.SIGKILL)
+                    elif job.kill_at is not None and now > job.kill_at:
+                        job.kill_at = None
+                        self._signal(job, signal.SIGKILL)
+                idle = not self._running and not self._queue
+                if idle:
+                    # Nothing to supervise; sleep until start() queues work
+                    self._changed.wait(1)
+                    continue
+
+            if self._selector.get_map():
+                events = self._selector.select(timeout=0.2)
+            else:
+                # Running jobs that closed both pipes but haven't exited: poll them without spinning
+                events = []
+                with self._changed:
+                    self._changed.wait(0.2)
+            with self._lock:
+                for key, _ in events:
+                    job, name = key.data
+                    if key.fileobj.closed:
+                        continue
+                    chunk = os.read(key.fileobj.fileno(), 65536)
+                    if chunk:
+                        getattr(job, name).write(chunk)
+                    else:
+                        self._selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                for job in list(self._running.values()):
+                    self._reap(job)
+
+    def close_all(self):
+        self._closed = True
+        with self._lock:
+            for job in self._running.values():
+                self._signal(job, signal.SIGKILL)
+
+
+# ====== Global Singleton ======
+_supervisor = None
+
+def get_job_supervisor() -> JobSupervisor:
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = JobSupervisor()
+        atexit.register(_supervisor.close_all)
+    return _supervisor
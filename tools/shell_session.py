@@ -0,0 +1,295 @@
+import atexit
+import os
+import selectors
+import shlex
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from core.memory.blob_store import BlobStore, get_blob_store
+from tools.base import report_progress
+from tools.output_capture import OutputCapture
+
+
+@dataclass
+class CommandResult:
+    stdout: str
+    stderr: str
+    exit_code: Optional[int]
+    timed_out: bool = False
+    session_restarted: bool = False
+    # BlobStore handles of the complete output when it did not fit in the head/tail capture
+    stdout_handle: Optional[str] = None
+    stderr_handle: Optional[str] = None
+
+
+class SessionDied(Exception):
+    """The shell was gone before the command could be sent (safe to retry on a new session)."""
+    pass
+
+
+class ShellSession:
+    """
+    一个常驻的 bash 进程 (独立进程组)。命令通过 stdin 写入，前后用随机 sentinel 分帧，
+    从 stdout/stderr 中切出本条命令的输出、退出码和执行后的 cwd；cd / export 在命令之间保留。
+    内存 (ulimit -v) 和 CPU 时间 (ulimit -t) 上限在启动时设置为硬限制，命令无法再调高；
+    CPU 限制按进程计算，对每条命令启动的子进程分别生效。
+    """
+
+    def __init__(self, cwd: Optional[str] = None, memory_limit_mb: int = 1024, cpu_limit_s: int = 60):
+        self.cwd = cwd or os.getcwd()
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit_s = cpu_limit_s
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+        self.commands = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._start()
+
+    def _start(self):
+        shell = shutil.which("bash") or "/bin/sh"
+        cwd = self.cwd if os.path.isdir(self.cwd) else os.getcwd()
+        self._proc = subprocess.Popen(
+            [shell, "--noprofile", "--norc"] if shell.endswith("bash") else [shell],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            cwd=cwd, start_new_session=True
+        )
+        limits = []
+        if self.memory_limit_mb:
+            limits.append(f"ulimit -v {int(self.memory_limit_mb) * 1024}")
+        if self.cpu_limit_s:
+            limits.append(f"ulimit -t {int(self.cpu_limit_s)}")
+        if limits:
+            self._write("\n".join(limits) + " 2>/dev/null\n")
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _write(self, text: str):
+        try:
+            self._proc.stdin.write(text.encode("utf-8"))
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise SessionDied(str(e))
+
+    def run(self, command: str, timeout: float = 10, head_bytes: int = 1536, tail_bytes: int = 2560,
+            spill_store: Optional[BlobStore] = None, progress_interval: float = 1.0) -> CommandResult:
+        """Run one command inside the session; call with self.lock held."""
+        self.last_used = time.time()
+        self.commands += 1
+        marker = f"__MEMORA_END_{uuid.uuid4().hex}"
+        # eval keeps a syntax error in `command` from breaking the framing;
+        # stdin is /dev/null so the command cannot swallow the rest of our script
+        script = (
+            f"eval {shlex.quote(command)} < /dev/null\n"
+            f"__memora_rc=$?\n"
+            f"printf '\\n{marker} %d %s\\n' \"$__memora_rc\" \"$PWD\"\n"
+            f"printf '\\n{marker}\\n' >&2\n"
+        )
+        captures = {
+            "stdout": OutputCapture(head_bytes, tail_bytes, spill_store),
+            "stderr": OutputCapture(head_bytes, tail_bytes, spill_store)
+        }
+        try:
+            self._write(script)
+            return self._collect(marker, timeout, captures, progress_interval)
+        finally:
+            for capture in captures.values():
+                capture.finish()
+
+    def _collect(self, marker: str, timeout: float, captures, progress_interval: float) -> CommandResult:
+        """
+        Stream both pipes into bounded captures until each shows the sentinel. Memory per command
+        stays at head_bytes + tail_bytes per stream; TOOL_PROGRESS events report growth meanwhile.
+        """
+        end = b"\n" + marker.encode()
+        done = {"stdout": False, "stderr": False}
+        selector = selectors.DefaultSelector()
+        selector.register(self._proc.stdout, selectors.EVENT_READ, "stdout")
+        selector.register(self._proc.stderr, selectors.EVENT_READ, "stderr")
+        start = time.time()
+        deadline = start + timeout
+        next_progress = start + progress_interval
+        reported = 0
+
+        def result(exit_code, **flags) -> CommandResult:
+            for capture in captures.values():
+                capture.finish()
+            return CommandResult(captures["stdout"].text(), captures["stderr"].text(), exit_code,
+                                 stdout_handle=captures["stdout"].handle,
+                                 stderr_handle=captures["stderr"].handle, **flags)
+
+        try:
+            while not all(done.values()):
+                now = time.time()
+                if now >= deadline:
+                    self.close()
+                    return result(None, timed_out=True)
+                if now >= next_progress:
+                    next_progress = now + progress_interval
+                    total = captures["stdout"].total + captures["stderr"].total
+                    if total != reported:
+                        reported = total
+                        report_progress({
+                            "elapsed": round(now - start, 1),
+                            "stdout_bytes": captures["stdout"].total,
+                            "stderr_bytes": captures["stderr"].total,
+                            "last_line": captures["stdout"].last_line()
+                        })
+                wait = min(deadline, next_progress) - now
+                for key, _ in selector.select(timeout=max(wait, 0.01)):
+                    name = key.data
+                    chunk = os.read(key.fileobj.fileno(), 65536)
+                    if not chunk:
+                        # The command ended the shell itself (exit, exec, killed by a limit)
+                        self.close()
+                        return result(self._proc.returncode, session_restarted=True)
+                    captures[name].write(chunk)
+                    if captures[name].contains(end):
+                        done[name] = True
+                        selector.unregister(key.fileobj)
+        finally:
+            selector.close()
+
+        trailer = captures["stdout"].cut(end)
+        captures["stderr"].cut(end)
+        fields = trailer.decode("utf-8", errors="replace").strip().split(" ", 1)
+        exit_code = int(fields[0]) if fields and fields[0].lstrip("-").isdigit() else None
+        if len(fields) > 1 and fields[1]:
+            self.cwd = fields[1]
+        self.last_used = time.time()
+        return result(exit_code)
+
+    def close(self):
+        if self._proc is None:
+            return
+        if self._proc.poll() is None:
+            try:
+                # Kill the whole process group: the shell and anything it started
+                os.killpg(self._proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        for stream in (self._proc.stdin, self._proc.stdout, self._proc.stderr):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        try:
+            self._proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+class ShellSessionPool:
+    """
+    每个 Agent 一个常驻 shell 会话：省去每条命令 fork/exec /bin/sh 的开销，cwd 和环境变量在命令之间保留。
+    会话空闲超过 idle_timeout 或数量超过 max_sessions (LRU) 时被关闭；
+    命令超时或退出 shell 时会话被重建，并回到上次记录的 cwd。
+    输出只保留前 head_bytes / 后 tail_bytes 字节；spill_output=True 时被截断的完整输出存入 BlobStore。
+    """
+
+    def __init__(self, max_sessions: int = 16, idle_timeout: float = 300, memory_limit_mb: int = 1024,
+                 cpu_limit_s: int = 60, head_bytes: int = 1536, tail_bytes: int = 2560,
+                 spill_output: bool = True):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit_s = cpu_limit_s
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.spill_output = spill_output
+        self._sessions: "OrderedDict[str, ShellSession]" = OrderedDict()
+        # cwd of evicted/dead sessions, restored when the agent runs its next command
+        self._last_cwd: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+
+    def _evict_idle(self):
+        now = time.time()
+        stale = [k for k, s in self._sessions.items()
+                 if now - s.last_used > self.idle_timeout and not s.lock.locked()]
+        while len(self._sessions) - len(stale) >= self.max_sessions:
+            victim = next((k for k, s in self._sessions.items() if k not in stale and not s.lock.locked()), None)
+            if victim is None:
+                break
+            stale.append(victim)
+        for key in stale:
+            session = self._sessions.pop(key)
+            self._last_cwd[key] = session.cwd
+            session.close()
+            self.evicted += 1
+
+    def _acquire(self, agent_id: str) -> ShellSession:
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(agent_id)
+            if session is None or not session.alive:
+                cwd = session.cwd if session is not None else self._last_cwd.pop(agent_id, None)
+                session = ShellSession(cwd, self.memory_limit_mb, self.cpu_limit_s)
+                self._sessions[agent_id] = session
+                self.created += 1
+            while len(self._last_cwd) > 1000:
+                self._last_cwd.popitem(last=False)
+            self._sessions.move_to_end(agent_id)
+            return session
+
+    def run(self, agent_id: str, command: str, timeout: float = 10) -> CommandResult:
+        for _ in range(2):
+            session = self._acquire(agent_id)
+            with session.lock:
+                if not session.alive:
+                    continue
+                try:
+                    result = session.run(command, timeout, self.head_bytes, self.tail_bytes,
+                                         get_blob_store() if self.spill_output else None)
+                except SessionDied:
+                    # Killed externally before the command was sent; retry once on a fresh session
+                    session.close()
+                    continue
+                if result.timed_out:
+                    result.session_restarted = True
+                return result
+        raise RuntimeError("Could not start a shell session.")
+
+    def cwd(self, agent_id: str) -> str:
+        """Current directory of the agent's session (without starting one)."""
+        with self._lock:
+            session = self._sessions.get(agent_id)
+            if session is not None:
+                return session.cwd
+            return self._last_cwd.get(agent_id) or os.getcwd()
+
+    def close(self, agent_id: str):
+        with self._lock:
+            session = self._sessions.pop(agent_id, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), OrderedDict()
+        for session in sessions:
+            session.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._sessions), "created": self.created, "evicted": self.evicted}
+
+
+# ====== Global Singleton ======
+_shell_pool = None
+
+def get_shell_pool() -> ShellSessionPool:
+    global _shell_pool
+    if _shell_pool is None:
+        _shell_pool = ShellSessionPool()
+        atexit.register(_shell_pool.close_all)
+    return _shell_pool
@@ -0,0 +1,309 @@
+import csv
+import io
+import json
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+TABLE_WRITE_FORMATS = ('.xlsx', '.csv', '.jsonl')
+
+
+@contextmanager
+def atomic_path(path: str):
+    """
+    Yield a temp path next to `path`; it replaces `path` via os.replace only if the block succeeds,
+    so concurrent readers see either the old or the new file, never a half-written one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+_append_locks: "dict[str, threading.Lock]" = {}
+_append_locks_guard = threading.Lock()
+
+
+@contextmanager
+def atomic_append_path(path: str):
+    """
+    atomic_path whose temp file starts as a copy of `path`: appends go to the copy and land in one
+    os.replace, so readers never see a half-written row. Appends to the same path within this process
+    are serialised; a concurrent writer in another process can still win the rename.
+    """
+    key = os.path.abspath(path)
+    with _append_locks_guard:
+        lock = _append_locks.setdefault(key, threading.Lock())
+    with lock:
+        with atomic_path(path) as tmp:
+            shutil.copy2(path, tmp)
+            yield tmp
+
+
+def staging_path(path: str) -> str:
+    """Where chunked writes accumulate until the final chunk commits them."""
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f".{name}.partial")
+
+
+# ---------- Record parsing ----------
+def _json_values(text: str, start: int) -> Iterator:
+    """Decode the elements of a JSON array starting at text[start] == '[' one at a time."""
+    decoder = json.JSONDecoder()
+    i = start + 1
+    n = len(text)
+    while True:
+        while i < n and text[i] in " \t\r\n,":
+            i += 1
+        if i >= n:
+            raise ValueError("Unterminated JSON array.")
+        if text[i] == "]":
+            return
+        value, i = decoder.raw_decode(text, i)
+        yield value
+
+
+def _jsonl_values(lines) -> Iterator:
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _scalar(value: str):
+    """CSV cells arrive as strings; keep numbers numeric in Excel like pd.read_csv did."""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _records_from_values(values_factory) -> Tuple[List[str], Iterator[list]]:
+    """Two passes over the decoded values: first the column union, then the rows."""
+    header: List[str] = []
+    seen = set()
+    positional = 0
+    for value in values_factory():
+        if isinstance(value, dict):
+            for key in value:
+                if key not in seen:
+                    seen.add(key)
+                    header.append(key)
+        elif isinstance(value, list):
+            positional = max(positional, len(value))
+        else:
+            raise ValueError("Records must be JSON objects or arrays.")
+    if positional and not header:
+        header = [str(i) for i in range(positional)]
+
+    def rows():
+        for value in values_factory():
+            if isinstance(value, dict):
+                yield [value.get(key) for key in header]
+            else:
+                yield list(value) + [None] * (len(header) - len(value))
+    return header, rows()
+
+
+def parse_records(content: str) -> Tuple[List[str], Iterator[list]]:
+    """
+    Tabular content for a table write: a JSON list of objects/arrays, a JSON object of columns,
+    JSON Lines, or CSV text with a header row. Rows are produced lazily; no DataFrame is built.
+    """
+    text = content.strip()
+    if text.startswith("["):
+        start = content.index("[")
+        return _records_from_values(lambda: _json_values(content, start))
+    if text.startswith("{"):
+        decoder = json.JSONDecoder()
+        first, end = decoder.raw_decode(text)
+        if not text[end:].strip():
+            if first and all(isinstance(v, list) for v in first.values()):
+                # Column-oriented object: {"a": [1, 2], "b": [3, 4]}
+                header = list(first)
+                return header, (list(row) for row in zip(*first.values()))
+            return _records_from_values(lambda: iter([first]))
+        return _records_from_values(lambda: _jsonl_values(io.StringIO(content)))
+    reader = csv.reader(io.StringIO(content))
+    header = next(reader, None)
+    if not header:
+        raise ValueError("Empty table content.")
+    return header, ([_scalar(cell) for cell in row] for row in reader if row)
+
+
+def staged_records(staging: str) -> Tuple[List[str], Iterator[list]]:
+    """Records accumulated by chunked writes (stored as JSON Lines), re-read from disk."""
+    def values():
+        with open(staging, "r", encoding="utf-8") as f:
+            yield from _jsonl_values(f)
+    return _records_from_values(values)
+
+
+def staged_header(staging: str) -> Optional[List[str]]:
+    """Columns of the first staged chunk (its rows are stored with every column), or None before any."""
+    if not os.path.exists(staging):
+        return None
+    with open(staging, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                return list(json.loads(line))
+    return None
+
+
+def chunk_records(staging: str, content: str, csv_text: bool) -> Tuple[List[str], List[list]]:
+    """
+    Rows of one chunk for a chunked table write, lined up with the columns of the first chunk.
+    Later CSV chunks may leave out the header row; a chunk whose columns differ is rejected.
+    """
+    header = staged_header(staging)
+    if header is not None and csv_text:
+        first = next(csv.reader(io.StringIO(content.lstrip())), None)
+        if first != header:
+            buf = io.StringIO()
+            csv.writer(buf).writerow(header)
+            content = buf.getvalue() + content.lstrip()
+    chunk_header, rows = parse_records(content)
+    chunk_header = [str(h) for h in chunk_header]
+    rows = list(rows)
+    for i, row in enumerate(rows, 1):
+        if len(row) != len(chunk_header):
+            raise ValueError(f"Row {i} of the chunk has {len(row)} values, expected {len(chunk_header)} ({chunk_header}).")
+    if header is None:
+        return chunk_header, rows
+    if sorted(chunk_header) != sorted(header):
+        raise ValueError(f"Chunk columns {chunk_header} do not match the staged columns {header}.")
+    order = [chunk_header.index(h) for h in header]
+    return header, [[row[i] for i in order] for row in rows]
+
+
+# ---------- Streaming writers ----------
+def _existing_csv_header(path: str) -> Optional[List[str]]:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return next(csv.reader(f), None)
+
+
+def write_table(path: str, header: List[str], rows: Iterator[list], append: bool = False) -> int:
+    """Stream rows into path (.xlsx / .csv / .jsonl); returns the number of rows written."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return _write_csv(path, header, rows, append)
+    if ext == ".jsonl":
+        return _write_jsonl(path, header, rows, append)
+    if ext == ".xlsx":
+        return _write_xlsx(path, header, rows, append)
+    raise ValueError(f"Streaming table writes support {', '.join(TABLE_WRITE_FORMATS)}, not '{ext}'.")
+
+
+def _missing_final_newline(path: str) -> bool:
+    """True when a non-empty file doesn't end in a newline (e.g. written verbatim by a text overwrite)."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if not f.tell():
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def _write_csv(path: str, header: List[str], rows: Iterator[list], append: bool) -> int:
+    count = 0
+    existing = _existing_csv_header(path) if append else None
+    if existing is not None:
+        if existing != [str(h) for h in header]:
+            raise ValueError(f"Columns {header} do not match the existing header {existing}.")
+        with atomic_append_path(path) as tmp:
+            missing_newline = _missing_final_newline(tmp)
+            with open(tmp, "a", encoding="utf-8", newline="") as f:
+                if missing_newline:
+                    f.write("\r\n")
+                writer = csv.writer(f)
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+        return count
+    with atomic_path(path) as tmp:
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+    return count
+
+
+def _write_jsonl(path: str, header: List[str], rows: Iterator[list], append: bool) -> int:
+    count = 0
+
+    def dump(f):
+        nonlocal count
+        for row in rows:
+            f.write(json.dumps(dict(zip(header, row)), ensure_ascii=False, default=str) + "\n")
+            count += 1
+
+    if append and os.path.exists(path):
+        with atomic_append_path(path) as tmp:
+            missing_newline = _missing_final_newline(tmp)
+            with open(tmp, "a", encoding="utf-8") as f:
+                if missing_newline:
+                    f.write("\n")
+                dump(f)
+        return count
+    with atomic_path(path) as tmp:
+        with open(tmp, "w", encoding="utf-8") as f:
+            dump(f)
+    return count
+
+
+def _write_xlsx(path: str, header: List[str], rows: Iterator[list], append: bool) -> int:
+    from openpyxl import Workbook, load_workbook
+
+    count = 0
+    with atomic_path(path) as tmp:
+        # write_only workbooks flush rows to disk as they are appended
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        if append and os.path.exists(path):
+            # openpyxl cannot append in place: stream the old rows across, then the new ones
+            src = load_workbook(path, read_only=True)
+            try:
+                old_rows = src.worksheets[0].iter_rows(values_only=True)
+                old_header = next(old_rows, None)
+                if old_header is not None and [str(h) for h in old_header if h is not None] != [str(h) for h in header]:
+                    raise ValueError(f"Columns {header} do not match the existing header {list(old_header)}.")
+                ws.title = src.worksheets[0].title
+                ws.append(list(old_header or header))
+                for row in old_rows:
+                    ws.append(list(row))
+            finally:
+                src.close()
+        else:
+            ws.title = "Sheet1"
+            ws.append(header)
+        for row in rows:
+            ws.append(row)
+            count += 1
+        wb.save(tmp)
+    return count
+
+
+def append_staged(staging: str, header: List[str], rows: Iterator[list]) -> int:
+    """Append parsed rows of one chunk to the staging file as JSON Lines."""
+    count = 0
+    with open(staging, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(dict(zip(header, row)), ensure_ascii=False, default=str) + "\n")
+            count += 1
+    return count
@@ -0,0 +1,140 @@
+import os
+from typing import List
+
+from core.summarizer import MapReduceSummarizer, pack, split_text
+from tools.base import BaseTool, current_tool_context, report_progress, skip_cache
+
+DEFAULT_MODEL = "llama3"
+TABLE_BLOCK_ROWS = 200
+
+
+def chunk_docx(path: str, chunk_chars: int) -> List[str]:
+    """Paragraph-level units; a heading starts a new chunk so sections stay together."""
+    from docx import Document
+
+    doc = Document(path)
+    sections: List[List[str]] = [[]]
+    for para in doc.paragraphs:
+        text = para.text.strip()
+        if not text:
+            continue
+        style = (para.style.name if para.style is not None else "") or ""
+        if style.startswith("Heading") and sections[-1]:
+            sections.append([])
+        sections[-1].append(text)
+    chunks: List[str] = []
+    for section in sections:
+        if section:
+            chunks.extend(pack(section, chunk_chars, sep="\n"))
+    return chunks
+
+
+def chunk_pptx(path: str, chunk_chars: int) -> List[str]:
+    """One unit per slide, packed so consecutive slides share a chunk."""
+    from pptx import Presentation
+
+    prs = Presentation(path)
+    slides = []
+    for number, slide in enumerate(prs.slides, start=1):
+        texts = [shape.text.strip() for shape in slide.shapes if hasattr(shape, "text") and shape.text.strip()]
+        if texts:
+            slides.append(f"[Slide {number}]\n" + "\n".join(texts))
+    units = []
+    for slide in slides:
+        units.extend(split_text(slide, chunk_chars) if len(slide) > chunk_chars else [slide])
+    return pack(units, chunk_chars)
+
+
+def chunk_table(path: str, chunk_chars: int, block_rows: int = TABLE_BLOCK_ROWS) -> List[str]:
+    """Row blocks rendered as CSV with the header repeated, streamed so the file is never fully loaded."""
+    import pandas as pd
+
+    if path.lower().endswith(".csv"):
+        frames = pd.read_csv(path, chunksize=block_rows)
+    else:
+        frames = _xlsx_blocks(path, block_rows)
+    chunks = []
+    for df in frames:
+        first = int(df.index[0]) if len(df) else 0
+        text = f"[Rows {first}-{first + len(df) - 1}]\n" + df.to_csv(index=False)
+        chunks.extend(split_text(text, chunk_chars) if len(text) > chunk_chars else [text])
+    return chunks
+
+
+def _xlsx_blocks(path: str, block_rows: int):
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+        block, start = [], 0
+        for row in rows:
+            block.append(list(row)[:len(columns)])
+            if len(block) >= block_rows:
+                yield pd.DataFrame(block, columns=columns, index=range(start, start + len(block)))
+                start += len(block)
+                block = []
+        if block:
+            yield pd.DataFrame(block, columns=columns, index=range(start, start + len(block)))
+    finally:
+        wb.close()
+
+
+def chunk_file(path: str, chunk_chars: int) -> List[str]:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".docx":
+        return chunk_docx(path, chunk_chars)
+    if ext == ".pptx":
+        return chunk_pptx(path, chunk_chars)
+    if ext in (".csv", ".xlsx"):
+        return chunk_table(path, chunk_chars)
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return split_text(f.read(), chunk_chars)
+
+
+class SummarizeTool(BaseTool):
+    name = "summarize"
+    description = "对超出上下文窗口的大文件做 map-reduce 摘要 (docx 按段落/章节、pptx 按幻灯片、表格按行块切分)"
+    args_schema = {
+        "path": "string",
+        "focus": "string (optional, what the summary should concentrate on)",
+        "chunk_chars": "int (optional, default 6000)"
+    }
+
+    def is_cacheable(self, **kwargs) -> bool:
+        return True
+
+    def cache_paths(self, path: str = "", **kwargs):
+        return [path.strip()]
+
+    def run(self, path: str, focus: str = "", chunk_chars: int = 6000) -> str:
+        path = path.strip()
+        if not os.path.exists(path):
+            return f"Error: File '{path}' not found."
+        chunk_chars = max(int(chunk_chars), 1000)
+        try:
+            chunks = chunk_file(path, chunk_chars)
+        except Exception as e:
+            return f"Error reading file '{path}': {str(e)}"
+        if not chunks:
+            return f"File '{path}' has no text content."
+
+        context = current_tool_context()
+        model = context.model if context and context.model else DEFAULT_MODEL
+        summarizer = MapReduceSummarizer(model, chunk_chars=chunk_chars, on_progress=report_progress)
+        instruction = f"概括主要内容，重点关注：{focus}" if focus else "概括主要内容"
+        try:
+            summary = summarizer.summarize_chunks(chunks, instruction)
+        except Exception as e:
+            return f"Error summarizing '{path}': {str(e)}"
+        if summarizer.failed:
+            # Raw excerpts stood in for the failed chunks; worth retrying rather than reusing
+            skip_cache()
+            return (f"Summary of {path} ({len(chunks)} chunks; {summarizer.failed} summary calls failed, "
+                    f"raw excerpts were used in their place):\n{summary}")
+        return f"Summary of {path} ({len(chunks)} chunks):\n{summary}"
@@ -0,0 +1,236 @@
+import hashlib
+import importlib.util
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+
+from tools.doc_cache import DocumentCache, get_document_cache
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas / pyarrow are imported on first query, not when the tool is loaded.
+# pyarrow enables Feather snapshots and the pyarrow CSV engine; find_spec does not import it
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+AGG_FUNCS = ("count", "sum", "mean", "min", "max", "median", "std", "nunique", "first", "last")
+
+
+class TableQueryEngine:
+    """
+    在进程内对表格文件做查询与画像，只把很小的结果返回给模型。
+
+    - 解析后的 DataFrame 保存为列式快照 (有 pyarrow 时为 Feather，否则为 pickle)，
+      以 (路径, mtime, size, sheet) 为键；重复查询不再重新解析 Excel。
+      内存中的 DataFrame 由 DocumentCache 统一按字节预算管理
+    - query：结构化参数 (filter / group_by / agg / sort_by / limit) 走 pandas 向量化计算；
+      sql 参数则把表加载到内存 SQLite (表名 t) 后执行只读 SELECT
+    - profile：逐列统计 (类型、空值、去重数、数值分布、高频值)
+    """
+
+    def __init__(self, snapshot_dir: str = ".memora/table_snapshots", max_result_rows: int = 50,
+                 cache: Optional[DocumentCache] = None):
+        self.snapshot_dir = snapshot_dir
+        self.max_result_rows = max_result_rows
+        # Parsed frames share the process-wide byte-budget LRU with other parsed documents
+        self.cache = cache or get_document_cache()
+
+    # ---------- Loading / snapshots ----------
+    @staticmethod
+    def _key(path: str, sheet: Optional[str]) -> Tuple:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        return path, st.st_mtime_ns, st.st_size, sheet or ""
+
+    def _snapshot_path(self, key: Tuple) -> str:
+        path, mtime_ns, size, sheet = key
+        name = hashlib.sha1(f"{path}\0{sheet}".encode("utf-8")).hexdigest()
+        ext = "feather" if _HAS_PYARROW else "pkl"
+        return os.path.join(self.snapshot_dir, f"{name}.{mtime_ns}.{size}.{ext}")
+
+    def _entry(self, path: str, sheet: Optional[str]) -> Dict[str, Any]:
+        def load() -> Dict[str, Any]:
+            key = self._key(path, sheet)
+            df = self._load_snapshot(key)
+            if df is None:
+                df = self._parse(path, sheet)
+                self._save_snapshot(key, df)
+            return {"df": df, "conn": None, "lock": threading.Lock()}
+
+        return self.cache.get_or_load(path, f"frame:{sheet or ''}", load, persist=False,
+                                      size_of=lambda entry: DocumentCache._size_of(entry["df"]))
+
+    def frame(self, path: str, sheet: Optional[str] = None) -> "pd.DataFrame":
+        return self._entry(path, sheet)["df"]
+
+    @staticmethod
+    def _parse(path: str, sheet: Optional[str]) -> "pd.DataFrame":
+        import pandas as pd
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".csv":
+            return pd.read_csv(path, engine="pyarrow" if _HAS_PYARROW else "c")
+        return pd.read_excel(path, sheet_name=sheet or 0)
+
+    def _load_snapshot(self, key: Tuple) -> Optional["pd.DataFrame"]:
+        import pandas as pd
+        snapshot = self._snapshot_path(key)
+        if not os.path.exists(snapshot):
+            return None
+        try:
+            return pd.read_feather(snapshot) if _HAS_PYARROW else pd.read_pickle(snapshot)
+        except Exception as e:
+            print(f"[TableQuery] Ignoring unreadable snapshot {snapshot}: {e}")
+            return None
+
+    def _save_snapshot(self, key: Tuple, df: "pd.DataFrame"):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        snapshot = self._snapshot_path(key)
+        prefix = os.path.basename(snapshot).split(".", 1)[0] + "."
+        tmp = f"{snapshot}.{uuid.uuid4().hex}.tmp"
+        try:
+            if _HAS_PYARROW:
+                # Feather needs string column names and a default index
+                df.rename(columns=str).reset_index(drop=True).to_feather(tmp)
+            else:
+                df.to_pickle(tmp)
+            os.replace(tmp, snapshot)
+        except Exception as e:
+            print(f"[TableQuery] Failed to write snapshot: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        # Older snapshots of the same file are dead weight once the file has changed
+        for name in os.listdir(self.snapshot_dir):
+            other = os.path.join(self.snapshot_dir, name)
+            if other != snapshot and name.startswith(prefix) and not name.endswith(".tmp"):
+                try:
+                    os.remove(other)
+                except OSError:
+                    pass
+
+    # ---------- Query ----------
+    def query(self, path: str, sql: Optional[str] = None, filter: Optional[str] = None,
+              group_by: Optional[Union[str, List[str]]] = None, agg: Optional[Dict[str, Any]] = None,
+              columns: Optional[Union[str, List[str]]] = None, sort_by: Optional[str] = None,
+              ascending: bool = False, limit: Optional[int] = None, sheet: Optional[str] = None) -> str:
+        import pandas as pd
+        limit = min(limit or self.max_result_rows, self.max_result_rows)
+        entry = self._entry(path, sheet)
+        if sql:
+            return self._query_sql(entry, sql, limit)
+
+        df = entry["df"]
+        if filter:
+            df = df.query(filter, engine="python" if "str." in filter else None)
+
+        group_by = self._as_list(group_by)
+        if group_by:
+            if not agg:
+                result = df.groupby(group_by, dropna=False).size().rename("count").reset_index()
+            else:
+                bad = {c: f for c, f in agg.items() if f not in AGG_FUNCS}
+                if bad:
+                    return f"Error: Unsupported aggregations {bad}. Use one of {list(AGG_FUNCS)}."
+                result = df.groupby(group_by, dropna=False).agg(agg).reset_index()
+        elif agg:
+            result = df.agg(agg)
+            result = result.to_frame("value") if isinstance(result, pd.Series) else result
+        else:
+            result = df
+
+        cols = self._as_list(columns)
+        if cols:
+            result = result[cols]
+        if sort_by:
+            # nlargest/nsmallest is a partial sort; much cheaper than sorting the whole frame for top-k
+            if pd.api.types.is_numeric_dtype(result[sort_by]):
+                result = result.nsmallest(limit, sort_by) if ascending else result.nlargest(limit, sort_by)
+            else:
+                result = result.sort_values(sort_by, ascending=ascending)
+        return self._format_result(result, limit, matched=len(df) if filter else None)
+
+    def _query_sql(self, entry: Dict[str, Any], sql: str, limit: int) -> str:
+        import pandas as pd
+        if not re.match(r"^\s*(select|with)\b", sql, re.IGNORECASE):
+            return "Error: Only SELECT queries are allowed (table name: t)."
+        with entry["lock"]:
+            if entry["conn"] is None:
+                conn = sqlite3.connect(":memory:", check_same_thread=False)
+                entry["df"].to_sql("t", conn, index=False)
+                # Read-only sandbox: no ATTACH (which could create files) and no writes
+                conn.set_authorizer(self._sql_authorizer)
+                entry["conn"] = conn
+            try:
+                cursor = entry["conn"].execute(sql)
+                names = [d[0] for d in cursor.description or []]
+                rows = cursor.fetchmany(limit + 1)
+            except sqlite3.Error as e:
+                return f"Error: SQL failed: {e}"
+        result = pd.DataFrame(rows, columns=names)
+        return self._format_result(result, limit)
+
+    @staticmethod
+    def _sql_authorizer(action, arg1, arg2, db_name, trigger):
+        allowed = (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION)
+        return sqlite3.SQLITE_OK if action in allowed else sqlite3.SQLITE_DENY
+
+    # ---------- Profile ----------
+    def profile(self, path: str, columns: Optional[Union[str, List[str]]] = None,
+                sheet: Optional[str] = None, top_values: int = 3) -> str:
+        import pandas as pd
+        df = self.frame(path, sheet)
+        cols = self._as_list(columns) or list(df.columns)
+        lines = [f"File: {path}", f"Shape: {len(df)} rows, {len(df.columns)} columns", ""]
+        for col in cols:
+            s = df[col]
+            nulls = int(s.isna().sum())
+            line = f"- {col} ({s.dtype}): non-null={len(s) - nulls}, null={nulls}, unique={s.nunique(dropna=True)}"
+            if pd.api.types.is_bool_dtype(s):
+                line += f", true={int(s.sum())}"
+            elif pd.api.types.is_numeric_dtype(s) and len(s) - nulls > 0:
+                q = s.quantile([0.25, 0.5, 0.75]).to_numpy()
+                line += (f", min={s.min():.6g}, p25={q[0]:.6g}, median={q[1]:.6g}, p75={q[2]:.6g}, "
+                         f"max={s.max():.6g}, mean={s.mean():.6g}, std={s.std():.6g}")
+            elif pd.api.types.is_datetime64_any_dtype(s) and len(s) - nulls > 0:
+                line += f", min={s.min()}, max={s.max()}"
+            else:
+                top = s.value_counts(dropna=True).head(top_values)
+                if len(top):
+                    line += ", top=" + ", ".join(f"{str(v)[:40]!r}×{c}" for v, c in top.items())
+            lines.append(line)
+        return "\n".join(lines)
+
+    # ---------- Helpers ----------
+    @staticmethod
+    def _as_list(value) -> Optional[List[str]]:
+        if not value:
+            return None
+        if isinstance(value, str):
+            return [v.strip() for v in value.split(",") if v.strip()]
+        return list(value)
+
+    @staticmethod
+    def _format_result(result: "pd.DataFrame", limit: int, matched: Optional[int] = None) -> str:
+        import pandas as pd
+        if len(result) <= limit:
+            header = f"Result: {len(result)} rows"
+        else:
+            header = f"Result: more than {limit} rows (showing first {limit}; narrow the query or aggregate)"
+        if matched is not None:
+            header += f" ({matched} rows matched the filter)"
+        with pd.option_context("display.max_columns", 50, "display.width", 200):
+            body = result.head(limit).to_string(index=False) if len(result) else "(empty)"
+        return f"{header}\n{body}"
+
+
+# ====== Global Singleton ======
+_engine = None
+
+def get_table_engine() -> TableQueryEngine:
+    global _engine
+    if _engine is None:
+        _engine = TableQueryEngine()
+    return _engine
@@ -0,0 +1,232 @@
+import importlib.util
+import os
+from typing import TYPE_CHECKING, List, Optional, Union
+
+from tools.text_window import get_text_reader
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# numpy / pandas / pyarrow (可选依赖) 在第一次读取表格时才导入
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+CSV_CHUNK_ROWS = 100_000
+
+
+class TableReader:
+    """
+    表格文件 (csv / xlsx) 的按需读取：列裁剪 (columns)、行窗口 (skiprows + nrows)、随机抽样 (sample)
+    都下推到读取器中，读取耗时和内存只与展示的行数有关，而不是文件大小。
+
+    - CSV：pandas C 解析器的 usecols/nrows；抽样时分块迭代 (有 pyarrow 时用其流式 CSV 读取器)
+    - XLSX：openpyxl read_only 流式模式，行数和列数来自 sheet 的 dimension，不需要解析整张表
+    - 行数：CSV 使用 TextWindowReader 缓存的行数 (按行计数，字段内含换行时为近似值)
+    """
+
+    def __init__(self, default_rows: int = 50, max_rows: int = 500, seed: int = 0):
+        self.default_rows = default_rows
+        self.max_rows = max_rows
+        self.seed = seed
+
+    def read(self, path: str, columns: Optional[Union[str, List[str]]] = None, nrows: Optional[int] = None,
+             skiprows: int = 0, sample: Optional[int] = None, sheet: Optional[str] = None) -> str:
+        columns = self._parse_columns(columns)
+        nrows = min(nrows or self.default_rows, self.max_rows)
+        skiprows = max(skiprows or 0, 0)
+        if sample:
+            sample = min(sample, self.max_rows)
+
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".csv":
+            return self._read_csv(path, columns, nrows, skiprows, sample)
+        if ext == ".xlsx":
+            return self._read_xlsx(path, columns, nrows, skiprows, sample, sheet)
+        return self._read_excel_legacy(path, columns, nrows, skiprows, sample, sheet)
+
+    @staticmethod
+    def _parse_columns(columns) -> Optional[List[str]]:
+        if not columns:
+            return None
+        if isinstance(columns, str):
+            columns = [c.strip() for c in columns.split(",")]
+        return [str(c) for c in columns if str(c)]
+
+    @staticmethod
+    def _check_columns(columns: Optional[List[str]], available: List[str]) -> Optional[str]:
+        if not columns:
+            return None
+        missing = [c for c in columns if c not in available]
+        if missing:
+            return f"Error: Unknown columns {missing}. Available: {available}"
+        return None
+
+    # ---------- CSV ----------
+    def _read_csv(self, path: str, columns, nrows: int, skiprows: int, sample: Optional[int]) -> str:
+        import pandas as pd
+
+        header = list(pd.read_csv(path, nrows=0).columns)
+        error = self._check_columns(columns, [str(c) for c in header])
+        if error:
+            return error
+        lines = get_text_reader().stats(path).line_count
+        total_rows = max(lines - 1, 0)
+
+        if sample:
+            df, total_rows = self._sample_csv(path, columns, sample)
+            window = f"Random sample of {len(df)} rows"
+        else:
+            # skiprows keeps the header line (line 0) and skips the first N data rows
+            df = pd.read_csv(path, usecols=columns, nrows=nrows,
+                             skiprows=range(1, skiprows + 1) if skiprows else None)
+            df.index = range(skiprows, skiprows + len(df))
+            window = self._window_text(skiprows, len(df), total_rows)
+
+        if columns:
+            df = df[columns]
+        return self._format(path, df, total_rows, len(header), header, window, approx_rows=not sample)
+
+    def _sample_csv(self, path: str, columns, k: int):
+        """Uniform sample without loading the file: keep the k rows with the smallest random keys per chunk."""
+        import numpy as np
+        import pandas as pd
+
+        rng = np.random.default_rng(self.seed)
+        kept = None
+        seen = 0
+        for chunk in self._iter_csv_chunks(path, columns):
+            chunk.index = range(seen, seen + len(chunk))
+            seen += len(chunk)
+            chunk = chunk.assign(_sample_key=rng.random(len(chunk)))
+            kept = chunk if kept is None else pd.concat([kept, chunk])
+            kept = kept.nsmallest(k, "_sample_key")
+        if kept is None:
+            return pd.DataFrame(columns=columns or []), 0
+        return kept.drop(columns="_sample_key").sort_index(), seen
+
+    def _iter_csv_chunks(self, path: str, columns):
+        if _HAS_PYARROW:
+            import pyarrow.csv as pa_csv
+
+            convert = pa_csv.ConvertOptions(include_columns=columns) if columns else None
+            reader = pa_csv.open_csv(path, convert_options=convert)
+            for batch in reader:
+                yield batch.to_pandas()
+        else:
+            import pandas as pd
+
+            yield from pd.read_csv(path, usecols=columns, chunksize=CSV_CHUNK_ROWS)
+
+    # ---------- Excel ----------
+    def _read_xlsx(self, path: str, columns, nrows: int, skiprows: int, sample: Optional[int],
+                   sheet: Optional[str]) -> str:
+        import pandas as pd
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            if sheet and sheet not in wb.sheetnames:
+                return f"Error: Sheet '{sheet}' not found. Available: {wb.sheetnames}"
+            ws = wb[sheet] if sheet else wb.worksheets[0]
+
+            rows = ws.iter_rows(values_only=True)
+            header_row = next(rows, None)
+            if header_row is None:
+                return f"File: {path}\nShape: 0 rows, 0 columns"
+            header = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header_row)]
+            error = self._check_columns(columns, header)
+            if error:
+                return error
+            picks = [header.index(c) for c in columns] if columns else list(range(len(header)))
+            names = [header[i] for i in picks]
+
+            # max_row comes from the sheet's <dimension> tag; None when the writer omitted it
+            total_rows = ws.max_row - 1 if ws.max_row else None
+            if sample:
+                data, index, total_rows = self._sample_rows(rows, picks, sample)
+                window = f"Random sample of {len(data)} rows"
+            else:
+                data, index = [], []
+                for i, row in enumerate(rows):
+                    if i < skiprows:
+                        continue
+                    if len(data) >= nrows:
+                        break
+                    data.append([row[j] if j < len(row) else None for j in picks])
+                    index.append(i)
+                window = self._window_text(skiprows, len(data), total_rows)
+        finally:
+            wb.close()
+
+        df = pd.DataFrame(data, columns=names, index=index)
+        prefix = f"Sheet: {ws.title}\n"
+        return prefix + self._format(path, df, total_rows, len(header), header, window)
+
+    def _sample_rows(self, rows, picks: List[int], k: int):
+        """Reservoir sampling over a row iterator; memory is O(k)."""
+        import numpy as np
+
+        rng = np.random.default_rng(self.seed)
+        reservoir, index = [], []
+        seen = 0
+        for i, row in enumerate(rows):
+            values = [row[j] if j < len(row) else None for j in picks]
+            if len(reservoir) < k:
+                reservoir.append(values)
+                index.append(i)
+            else:
+                slot = rng.integers(0, i + 1)
+                if slot < k:
+                    reservoir[slot] = values
+                    index[slot] = i
+            seen += 1
+        order = np.argsort(index)
+        return [reservoir[o] for o in order], [index[o] for o in order], seen
+
+    def _read_excel_legacy(self, path: str, columns, nrows: int, skiprows: int, sample: Optional[int],
+                           sheet: Optional[str]) -> str:
+        # .xls has no streaming reader; still push column and row limits into pandas
+        import pandas as pd
+
+        if sample:
+            df = pd.read_excel(path, sheet_name=sheet or 0, usecols=columns)
+            total_rows = len(df)
+            df = df.sample(n=min(sample, len(df)), random_state=self.seed).sort_index()
+            window = f"Random sample of {len(df)} rows"
+        else:
+            df = pd.read_excel(path, sheet_name=sheet or 0, usecols=columns, nrows=nrows,
+                               skiprows=range(1, skiprows + 1) if skiprows else None)
+            df.index = range(skiprows, skiprows + len(df))
+            total_rows = None
+            window = self._window_text(skiprows, len(df), None)
+        return self._format(path, df, total_rows, len(df.columns), list(df.columns), window)
+
+    # ---------- Formatting ----------
+    @staticmethod
+    def _window_text(skiprows: int, shown: int, total_rows: Optional[int]) -> str:
+        text = f"Showing rows {skiprows}-{skiprows + shown - 1}" if shown else f"No rows at offset {skiprows}"
+        if total_rows is None or skiprows + shown < total_rows:
+            text += f". Next: skiprows={skiprows + shown}"
+        return text
+
+    @staticmethod
+    def _format(path: str, df: "pd.DataFrame", total_rows: Optional[int], n_cols: int, header: List,
+                window: str, approx_rows: bool = False) -> str:
+        if total_rows is None:
+            rows_text = "unknown"
+        else:
+            rows_text = f"~{total_rows}" if approx_rows else str(total_rows)
+        info = f"File: {path}\nShape: {rows_text} rows, {n_cols} columns\nColumns: {list(header)}\n"
+        if len(df.columns) != n_cols:
+            info += f"Selected columns: {list(df.columns)}\n"
+        info += f"{window}\n\n"
+        return info + df.to_string()
+
+
+# ====== Global Singleton ======
+_table_reader = None
+
+def get_table_reader() -> TableReader:
+    global _table_reader
+    if _table_reader is None:
+        _table_reader = TableReader()
+    return _table_reader
@@ -0,0 +1,258 @@
+import mmap
+import os
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+CHUNK_SIZE = 1 << 20      # 分块扫描大小，内存占用与文件大小无关
+LINE_INDEX_STEP = 1024    # 每隔多少行记录一次行首偏移 (稀疏行索引)
+SIGNATURE_BYTES = 64      # 用于判断文件是否只是被追加 (日志场景)
+
+
+@dataclass
+class FileStats:
+    size: int
+    mtime_ns: int
+    newlines: int
+    ends_with_newline: bool
+    # line_offsets[i] = byte offset where line i * LINE_INDEX_STEP + 1 starts
+    line_offsets: List[int] = field(default_factory=lambda: [0])
+    signature: bytes = b""
+
+    @property
+    def line_count(self) -> int:
+        if self.size == 0:
+            return 0
+        return self.newlines + (0 if self.ends_with_newline else 1)
+
+
+class TextWindowReader:
+    """
+    大文本文件的窗口化读取：按字节区间、行区间、head/tail 或正则过滤读取，
+    全部基于 mmap / 分块读取，内存占用不随文件大小增长。
+
+    文件大小、行数和稀疏行索引按 (path, mtime, size) 缓存；文件只是被追加时 (日志)，
+    只扫描新增部分。
+    """
+
+    def __init__(self, max_chars: int = 20000, max_line_chars: int = 2000):
+        self.max_chars = max_chars
+        self.max_line_chars = max_line_chars
+        self._stats: Dict[str, FileStats] = {}
+        self._lock = threading.Lock()
+
+    # ---------- Stats / line index ----------
+    def stats(self, path: str) -> FileStats:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            cached = self._stats.get(path)
+        if cached and cached.size == st.st_size and cached.mtime_ns == st.st_mtime_ns:
+            return cached
+
+        with open(path, "rb") as f:
+            if cached and st.st_size > cached.size and self._is_append(f, cached):
+                stats = FileStats(st.st_size, st.st_mtime_ns, cached.newlines, cached.ends_with_newline,
+                                  list(cached.line_offsets))
+                self._scan(f, cached.size, stats)
+            else:
+                stats = FileStats(st.st_size, st.st_mtime_ns, 0, False)
+                self._scan(f, 0, stats)
+            f.seek(max(stats.size - SIGNATURE_BYTES, 0))
+            stats.signature = f.read(SIGNATURE_BYTES)
+
+        with self._lock:
+            self._stats[path] = stats
+        return stats
+
+    @staticmethod
+    def _is_append(f, cached: FileStats) -> bool:
+        f.seek(max(cached.size - SIGNATURE_BYTES, 0))
+        return f.read(len(cached.signature)) == cached.signature
+
+    @staticmethod
+    def _scan(f, start: int, stats: FileStats):
+        import numpy as np
+
+        f.seek(start)
+        pos = start
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            nl = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+            if len(nl):
+                counts = stats.newlines + np.arange(1, len(nl) + 1)
+                # The line after newline #n starts a new index block when n % STEP == 0
+                marks = nl[counts % LINE_INDEX_STEP == 0]
+                stats.line_offsets.extend(int(pos + m + 1) for m in marks)
+                stats.newlines += len(nl)
+            stats.ends_with_newline = chunk[-1:] == b"\n"
+            pos += len(chunk)
+
+    def _seek_line(self, f, stats: FileStats, line: int):
+        """Position f at the start of 1-based line using the sparse index."""
+        block = min((line - 1) // LINE_INDEX_STEP, len(stats.line_offsets) - 1)
+        f.seek(stats.line_offsets[block])
+        for _ in range(line - 1 - block * LINE_INDEX_STEP):
+            if not self._skip_line(f):
+                break
+
+    @staticmethod
+    def _skip_line(f) -> bool:
+        while True:
+            part = f.readline(CHUNK_SIZE)
+            if not part:
+                return False
+            if part.endswith(b"\n"):
+                return True
+
+    def _read_line(self, f) -> Optional[str]:
+        """Next line, truncated to max_line_chars; the rest of a very long line is skipped."""
+        raw = f.readline(self.max_line_chars * 4)
+        if not raw:
+            return None
+        truncated = not raw.endswith(b"\n") and self._skip_line(f)
+        text = raw.decode("utf-8", errors="ignore").rstrip("\r\n")
+        if truncated or len(text) > self.max_line_chars:
+            text = text[:self.max_line_chars] + " ...(line truncated)"
+        return text
+
+    # ---------- Reads ----------
+    def read(self, path: str, offset: Optional[int] = None, length: Optional[int] = None,
+             start_line: Optional[int] = None, end_line: Optional[int] = None,
+             head: Optional[int] = None, tail: Optional[int] = None,
+             pattern: Optional[str] = None, max_matches: int = 100) -> str:
+        stats = self.stats(path)
+        header = f"File: {path}\nSize: {stats.size} bytes, {stats.line_count} lines\n"
+
+        if pattern:
+            return header + self._grep(path, stats, pattern, start_line or 1, end_line, max_matches)
+        if offset is not None or length is not None:
+            return header + self._read_bytes(path, stats, offset or 0, length)
+        if tail:
+            return header + self._tail(path, stats, tail)
+        if head:
+            start_line, end_line = 1, head
+        if start_line or end_line:
+            return header + self._read_lines(path, stats, start_line or 1, end_line)
+
+        if stats.size <= self.max_chars:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                return f.read()
+        # Too large to return whole: first window plus paging hints
+        return header + self._read_lines(path, stats, 1, None)
+
+    def _read_bytes(self, path: str, stats: FileStats, offset: int, length: Optional[int]) -> str:
+        offset = min(max(offset, 0), stats.size)
+        length = self.max_chars if length is None else min(max(length, 0), self.max_chars)
+        end = min(offset + length, stats.size)
+        if end <= offset:
+            return f"[bytes {offset}-{offset}] (empty)"
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = mm[offset:end].decode("utf-8", errors="ignore")
+        footer = f"\n[bytes {offset}-{end} of {stats.size}]"
+        if end < stats.size:
+            footer += f" Next: offset={end}"
+        return text + footer
+
+    def _read_lines(self, path: str, stats: FileStats, start: int, end: Optional[int]) -> str:
+        start = max(start, 1)
+        end = stats.line_count if end is None else min(end, stats.line_count)
+        if start > end:
+            return f"[lines {start}-{end}] (no lines in range, file has {stats.line_count} lines)"
+
+        lines, total, line_no = [], 0, start
+        with open(path, "rb") as f:
+            self._seek_line(f, stats, start)
+            while line_no <= end:
+                text = self._read_line(f)
+                if text is None:
+                    break
+                if lines and total + len(text) > self.max_chars:
+                    break
+                lines.append(text)
+                total += len(text) + 1
+                line_no += 1
+
+        last = start + len(lines) - 1
+        footer = f"\n[lines {start}-{last} of {stats.line_count}]"
+        if last < stats.line_count:
+            footer += f" Next: start_line={last + 1}"
+        return "\n".join(lines) + footer
+
+    def _tail(self, path: str, stats: FileStats, n: int) -> str:
+        if stats.size == 0:
+            return "(empty file)"
+        n = min(n, stats.line_count)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Walk backwards from the end over n line breaks; only the tail pages are touched
+            pos = stats.size - 1 if stats.ends_with_newline else stats.size
+            for _ in range(n):
+                found = mm.rfind(b"\n", 0, pos)
+                if found < 0:
+                    pos = -1
+                    break
+                pos = found
+            start_offset = pos + 1
+        first_line = stats.line_count - n + 1
+        # Keep only the newest lines that fit the output budget
+        lines, total = deque(), 0
+        with open(path, "rb") as f:
+            f.seek(start_offset)
+            while True:
+                text = self._read_line(f)
+                if text is None:
+                    break
+                lines.append(text)
+                total += len(text) + 1
+                while len(lines) > 1 and total > self.max_chars:
+                    total -= len(lines.popleft()) + 1
+                    first_line += 1
+        return "\n".join(lines) + f"\n[lines {first_line}-{stats.line_count} of {stats.line_count}]"
+
+    def _grep(self, path: str, stats: FileStats, pattern: str, start: int, end: Optional[int],
+              max_matches: int) -> str:
+        try:
+            regex = re.compile(pattern)
+        except re.error as e:
+            return f"Error: Invalid regex '{pattern}': {e}"
+
+        end = stats.line_count if end is None else min(end, stats.line_count)
+        matches: List[Tuple[int, str]] = []
+        total = 0
+        line_no = max(start, 1)
+        truncated = False
+        with open(path, "rb") as f:
+            self._seek_line(f, stats, line_no)
+            while line_no <= end:
+                text = self._read_line(f)
+                if text is None:
+                    break
+                if regex.search(text):
+                    if len(matches) >= max_matches or total + len(text) > self.max_chars:
+                        truncated = True
+                        break
+                    matches.append((line_no, text))
+                    total += len(text) + 10
+                line_no += 1
+
+        body = "\n".join(f"{n}: {t}" for n, t in matches) or "(no matches)"
+        footer = f"\n[{len(matches)} matches for /{pattern}/"
+        if truncated:
+            footer += f", stopped at line {line_no}. Next: start_line={line_no}]"
+        else:
+            footer += f" in lines {max(start, 1)}-{end}]"
+        return body + footer
+
+
+# ====== Global Singleton ======
+_reader = None
+
+def get_text_reader() -> TextWindowReader:
+    global _reader
+    if _reader is None:
+        _reader = TextWindowReader()
+    return _reader
@@ -1,7 +1,7 @@
-import json
+import asyncio
 import logging
 from typing import List, Optional
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, HTTPException, WebSocket
 from fastapi.responses import StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
@@ -9,7 +9,13 @@ from pydantic import BaseModel
 
 from llm.router import list_models, get_llm
 from core.protocol.request import LLMRequest, Message
-from core.orchestrator import orchestrate
+from core.orchestrator import create_orchestrator
+from core.jobs.queue import JobQueue, JobStatus
+from core.memory.session_store import SessionStore
+from tools.registry import warm_up as warm_up_tools
+from web.sse import sse_frame
+from web.stream import stream_orchestrator
+from web.ws import AgentSocket
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -29,6 +35,11 @@ app.add_middleware(
 # Serve static files (HTML, CSS, JS)
 app.mount("/static", StaticFiles(directory="web/static"), name="static")
 
+@app.on_event("startup")
+async def on_startup():
+    # 工具模块按需加载；服务启动后在后台预热，不阻塞启动，也不让第一个请求承担导入耗时
+    warm_up_tools(background=True)
+
 @app.get("/")
 async def read_root():
     return FileResponse("web/static/index.html")
@@ -47,55 +58,101 @@ class ChatRequest(BaseModel):
     messages: List[dict] # [{"role": "user", "content": "..."}]
     temperature: float = 0.7
     stream: bool = True
+    # 多轮会话：带上 session_id 后，messages 只需包含最新一条消息
+    session_id: Optional[str] = None
+    # 可选：只向 Planner 展示这些工具 (工具名列表)
+    tools: Optional[List[str]] = None
+    # 可选：带上之前返回的 agent_id，从 checkpoint 继续被中断 (如客户端断开) 的运行
+    agent_id: Optional[str] = None
+
+# Server-side multi-turn sessions
+session_store = SessionStore()
 
 @app.post("/api/chat")
-async def chat_endpoint(req: ChatRequest):
+async def chat_endpoint(req: ChatRequest, request: Request):
     logger.info(f"Chat request for model: {req.model}")
-    
-    # 目前我们只是简单的调用 orchestrate，它不是 stream 的。
-    # 为了支持 Web 的流式效果，我们暂时只能让 orchestrate 返回完整结果，然后伪装成 stream 推送。
-    # 或者，我们需要重构 orchestrator 使其支持 yield。
-    # 鉴于任务要求 "Planner -> Tool -> Orchestrator -> Writer 闭环"，且 "不引入复杂模块"，
-    # 我们先实现非流式的 Orchestrator 调用，然后前端一次性展示结果。
-    
-    # 注意：Orchestrator 内部目前是 print 过程，web 端看不到过程。
-    # 这是一个妥协。真正的 Agent Stream 需要更复杂的 Event Bus。
-    
+
     try:
-        # 获取用户最新的输入
+        # 获取用户最新的输入；之前的轮次由服务端 Session 保存
         user_input = req.messages[-1]["content"] if req.messages else ""
-        
-        # 调用 Orchestrator
-        # 注意：这里我们简化了，没有传历史 Context 给 Orchestrator，
-        # 因为 Orchestrator 内部维护了自己的 Context (ReAct Loop)。
-        # 如果需要多轮对话，需要把 history 传进去。
-        
-        # 但 Orchestrator 目前设计是单次任务闭环 (Loop 5 次)。
-        
-        final_answer = orchestrate(user_input, model=req.model)
-        
-        # 伪装成流式响应，为了兼容前端代码
+        session = session_store.get_or_create(req.session_id)
+
+        # Orchestrator 在线程池中运行，不阻塞事件循环；
+        # Trace 事件、Planner/Writer 的 token 通过有界队列实时推送为 SSE。
+        orchestrator = create_orchestrator(user_input, model=req.model, agent_id=req.agent_id,
+                                           session=session, tools=req.tools)
+
+        if not req.stream:
+            loop = asyncio.get_running_loop()
+            final_answer = await loop.run_in_executor(None, orchestrator.start)
+            session_store.save(session)
+            return {"text": final_answer, "agent_id": orchestrator.agent_id, "session_id": session.session_id}
+
+        async def event_stream():
+            yield sse_frame({"type": "session", "session_id": session.session_id, "agent_id": orchestrator.agent_id})
+            async for chunk in stream_orchestrator(orchestrator, request):
+                yield chunk
+            session_store.save(session)
+
         return StreamingResponse(
-            fake_stream_generator(final_answer),
-            media_type="text/event-stream"
+            event_stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
         )
 
     except Exception as e:
         logger.error(f"Orchestrator error: {e}")
         return {"error": str(e)}
 
-def fake_stream_generator(text):
-    """Yields the full text as a single chunk (or split it)"""
-    import time
-    # Simulate thinking time
-    yield f"data: {json.dumps({'type': 'thinking', 'text': 'Orchestrating tools...'})}\n\n"
-    
-    # Output result
-    data = {
-        "type": "output",
-        "text": text,
-        "source": "orchestrator",
-        "ts": time.time()
-    }
-    yield f"data: {json.dumps(data)}\n\n"
-    yield f"data: {json.dumps({'type': 'done'})}\n\n"
+@app.websocket("/ws/agent")
+async def agent_socket(ws: WebSocket):
+    """Long-lived bidirectional agent session: events out, cancel/pause/guidance/resume in."""
+    await AgentSocket(ws, session_store).serve()
+
+# ====== Job Queue (executed by worker.py processes) ======
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
+
+class JobRequest(BaseModel):
+    model: str
+    input: str
+    agent_id: Optional[str] = None
+
+def _get_job_or_404(job_id: str):
+    job = get_job_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+# The job handlers are plain def: sqlite calls (busy timeout under BEGIN IMMEDIATE) run in
+# FastAPI's threadpool instead of stalling the event loop and every SSE / WebSocket stream
+@app.post("/api/jobs")
+def submit_job(req: JobRequest):
+    job = get_job_queue().submit(req.input, model=req.model, agent_id=req.agent_id)
+    return {"job_id": job.id, "agent_id": job.agent_id, "status": job.status}
+
+@app.get("/api/jobs/{job_id}")
+def job_status(job_id: str):
+    job = _get_job_or_404(job_id)
+    data = job.to_dict()
+    # Keep status polling cheap; the result has its own endpoint
+    data.pop("result", None)
+    return data
+
+@app.get("/api/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = _get_job_or_404(job_id)
+    if job.status not in JobStatus.FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}")
+    return {"job_id": job.id, "status": job.status, "result": job.result, "error": job.error}
+
+@app.post("/api/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    _get_job_or_404(job_id)
+    job = get_job_queue().cancel(job_id)
+    return {"job_id": job.id, "status": job.status, "cancel_requested": job.cancel_requested}
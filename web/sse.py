@@ -0,0 +1,92 @@
+import json
+import time
+from typing import Callable, List, Optional, Union
+
+
+def sse_frame(data: dict) -> str:
+    return f"data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class SSECoalescer:
+    """
+    SSE 帧合并器：
+    - 连续的同类型、同来源的 token 增量 (output / thinking) 合并为一个事件，只做一次 json.dumps
+    - 一个时间窗口 (window) 内的所有事件合并为一次写入 (frame)
+    - 累积字节数超过 max_bytes 时立即 flush，保证单帧和待发送缓冲都有上界
+    - done / error 立即 flush
+    """
+
+    TOKEN_TYPES = ("output", "thinking")
+    FLUSH_TYPES = ("done", "error")
+
+    def __init__(self, window: float = 0.03, max_bytes: int = 16 * 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.max_bytes = max_bytes
+        self.clock = clock
+
+        # Pending items: pre-encoded frames (str) or open token buffers (dict)
+        self._pending: List[Union[str, dict]] = []
+        self._pending_bytes = 0
+        self._first_ts: Optional[float] = None
+
+        # Stats
+        self.frames = 0
+        self.events = 0
+        self.bytes_sent = 0
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def add(self, event: dict) -> Optional[str]:
+        """Buffer an event. Returns a chunk to write if a flush was triggered."""
+        self.events += 1
+        if not self._pending:
+            self._first_ts = self.clock()
+
+        etype = event.get("type")
+        if etype in self.TOKEN_TYPES:
+            text = event.get("text", "")
+            last = self._pending[-1] if self._pending else None
+            if isinstance(last, dict) and last["type"] == etype and last.get("source") == event.get("source"):
+                last["parts"].append(text)
+                last["ts"] = event.get("ts", last.get("ts"))
+            else:
+                buf = {k: v for k, v in event.items() if k != "text"}
+                buf["parts"] = [text]
+                self._pending.append(buf)
+            self._pending_bytes += len(text)
+        else:
+            frame = sse_frame(event)
+            self._pending.append(frame)
+            self._pending_bytes += len(frame)
+
+        if etype in self.FLUSH_TYPES or self._pending_bytes >= self.max_bytes:
+            return self.flush()
+        return None
+
+    def time_to_flush(self) -> Optional[float]:
+        """Seconds until the pending window expires (<= 0 means due), None if empty."""
+        if not self._pending:
+            return None
+        return self._first_ts + self.window - self.clock()
+
+    def flush(self) -> str:
+        chunks = []
+        for item in self._pending:
+            if isinstance(item, str):
+                chunks.append(item)
+            else:
+                data = {k: v for k, v in item.items() if k != "parts"}
+                data["text"] = "".join(item["parts"])
+                chunks.append(sse_frame(data))
+        chunk = "".join(chunks)
+
+        self._pending = []
+        self._pending_bytes = 0
+        self._first_ts = None
+        if chunk:
+            self.frames += 1
+            self.bytes_sent += len(chunk)
+        return chunk
@@ -0,0 +1,159 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import AsyncGenerator, Optional
+
+from fastapi import Request
+
+from core.orchestrator import Orchestrator
+from core.protocol.event import LLMEvent
+from core.state import AgentState
+from core.trace.event import TraceEvent
+from web.sse import SSECoalescer
+
+# Sentinel pushed by the worker thread when orchestrator.start() returns
+RUN_FINISHED = "__run_finished__"
+
+
+class EventBridge:
+    """
+    把 Orchestrator 工作线程中的事件桥接到事件循环上的有界 asyncio.Queue。
+    队列满时生产者线程阻塞 (backpressure)，close() 之后所有 put 直接丢弃。
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 256):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._closed = threading.Event()
+
+    def put(self, item: dict):
+        """Called from the orchestrator thread."""
+        if self._closed.is_set():
+            return
+        fut = asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop)
+        while True:
+            try:
+                fut.result(timeout=0.5)
+                return
+            except concurrent.futures.TimeoutError:
+                # Consumer is slow; keep waiting unless the stream was closed
+                if self._closed.is_set():
+                    fut.cancel()
+                    return
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+    def close(self):
+        self._closed.set()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+
+def attach_bridge(orchestrator: Orchestrator, bridge: EventBridge):
+    """Forward trace events and planner/writer tokens of an orchestrator into the bridge."""
+
+    def on_trace(event: TraceEvent):
+        bridge.put({"type": "trace", "event": event.to_dict()})
+
+    def on_llm(stage: str, event: LLMEvent):
+        if event.type == "output":
+            # Planner tokens are reasoning, writer tokens are the answer
+            bridge.put({
+                "type": "thinking" if stage == "planner" else "output",
+                "text": event.text,
+                "source": event.source,
+                "ts": event.ts
+            })
+        elif event.type == "error":
+            bridge.put({"type": "error", "text": event.text, "source": event.source, "ts": event.ts})
+
+    orchestrator.trace.add_listener(on_trace)
+    orchestrator.add_llm_listener(on_llm)
+
+
+def start_run(orchestrator: Orchestrator, bridge: EventBridge) -> asyncio.Future:
+    """
+    Run orchestrator.start() in the default executor. A RUN_FINISHED item carrying
+    the result is pushed into the bridge when it returns.
+    """
+    def run():
+        result = None
+        try:
+            result = orchestrator.start()
+        except Exception as e:
+            result = f"System Error: {e}"
+        finally:
+            bridge.put({"type": RUN_FINISHED, "result": result})
+
+    return bridge.loop.run_in_executor(None, run)
+
+
+async def stream_orchestrator(orchestrator: Orchestrator, request: Optional[Request] = None,
+                              poll_interval: float = 1.0, window: float = 0.03,
+                              max_frame_bytes: int = 16 * 1024,
+                              queue_size: int = 256) -> AsyncGenerator[str, None]:
+    """
+    Run orchestrator.start() in a worker thread and yield coalesced SSE chunks as events arrive.
+
+    Memory is bounded end to end: the bridge queue holds at most queue_size events and the
+    coalescer at most max_frame_bytes. A slow client stops this generator from being
+    advanced, the queue fills, and the orchestrator thread blocks until it catches up.
+    If the client disconnects the run is cancelled (checkpoint is kept for resume).
+    """
+    loop = asyncio.get_running_loop()
+    bridge = EventBridge(loop, maxsize=queue_size)
+    attach_bridge(orchestrator, bridge)
+    coalescer = SSECoalescer(window=window, max_bytes=max_frame_bytes)
+
+    start_run(orchestrator, bridge)
+    finished = False
+    output_sent = False
+    last_disconnect_check = time.monotonic()
+
+    try:
+        while True:
+            timeout = poll_interval
+            due = coalescer.time_to_flush()
+            if due is not None:
+                timeout = max(0.0, min(timeout, due))
+
+            try:
+                item = await asyncio.wait_for(bridge.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                due = coalescer.time_to_flush()
+                if due is not None and due <= 0:
+                    yield coalescer.flush()
+                if request is not None and time.monotonic() - last_disconnect_check >= poll_interval:
+                    last_disconnect_check = time.monotonic()
+                    if await request.is_disconnected():
+                        break
+                continue
+
+            if item["type"] == RUN_FINISHED:
+                finished = True
+                result = item.get("result") or ""
+                tail = ""
+                if orchestrator.state == AgentState.ERROR:
+                    tail += coalescer.add({"type": "error", "text": result, "ts": time.time()}) or ""
+                elif not output_sent:
+                    # No streamed writer output (e.g. cancelled or non-writer path)
+                    tail += coalescer.add({"type": "output", "text": result, "source": "orchestrator", "ts": time.time()}) or ""
+                tail += coalescer.add({"type": "done", "agent_id": orchestrator.agent_id}) or ""
+                yield tail
+                break
+
+            if item["type"] == "output":
+                output_sent = True
+            chunk = coalescer.add(item)
+            if chunk:
+                yield chunk
+    finally:
+        if not finished:
+            orchestrator.cancel()
+        # The worker thread notices the cancel flag and exits on its own;
+        # closing the bridge unblocks it if it is waiting on a full queue.
+        bridge.close()
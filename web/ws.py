@@ -0,0 +1,191 @@
+"""
+WebSocket 双向 Agent 会话协议 (一条长连接上可以顺序执行多次运行)：
+
+客户端 -> 服务端
+  {"type": "start", "input": "...", "model": "...", "agent_id"?: "...", "session_id"?: "...", "tools"?: [...]}
+  {"type": "resume", "agent_id": "...", "model": "...", "session_id"?: "..."}
+                                                          从 checkpoint 继续 (断线重连)；默认沿用 checkpoint 记录的会话
+  {"type": "cancel"}                                      取消当前运行 (保留 checkpoint)
+  {"type": "pause"} / {"type": "continue"}                暂停 / 继续
+  {"type": "guidance", "text": "..."}                     注入引导，下一次规划时生效
+
+服务端 -> 客户端
+  与 SSE 相同的事件: trace / thinking / output / error / done
+  {"type": "started" | "resumed", "agent_id": ..., ...}
+  {"type": "ack", "for": "<control type>", ...}
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from core.memory.session_store import SessionStore
+from core.memory.store import FileMemoryStore
+from core.orchestrator import Orchestrator, create_orchestrator
+from core.state import AgentState
+from web.stream import EventBridge, RUN_FINISHED, attach_bridge, start_run
+
+TOKEN_TYPES = ("output", "thinking")
+
+
+class AgentSocket:
+    def __init__(self, ws: WebSocket, session_store: Optional[SessionStore] = None):
+        self.ws = ws
+        self.session_store = session_store
+        self.orchestrator: Optional[Orchestrator] = None
+        self.bridge: Optional[EventBridge] = None
+        self.pump_task: Optional[asyncio.Task] = None
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, data: dict):
+        async with self._send_lock:
+            await self.ws.send_text(json.dumps(data, ensure_ascii=False, default=str))
+
+    @property
+    def running(self) -> bool:
+        return self.pump_task is not None and not self.pump_task.done()
+
+    async def serve(self):
+        await self.ws.accept()
+        try:
+            while True:
+                text = await self.ws.receive_text()
+                try:
+                    msg = json.loads(text)
+                except ValueError:
+                    await self.send({"type": "error", "text": "Invalid JSON message."})
+                    continue
+                if not isinstance(msg, dict):
+                    await self.send({"type": "error", "text": "Messages must be JSON objects."})
+                    continue
+                # A bad frame gets an error reply; the connection and its run stay up
+                try:
+                    await self.handle(msg)
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    print(f"[WebSocket] Error handling '{msg.get('type')}': {e}")
+                    await self.send({"type": "error", "text": f"Error handling '{msg.get('type')}': {e}"})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            # Connection gone: stop wasting tokens, the checkpoint stays for a resume
+            if self.orchestrator and self.running:
+                self.orchestrator.cancel()
+            if self.bridge:
+                self.bridge.close()
+            if self.pump_task:
+                self.pump_task.cancel()
+
+    async def handle(self, msg: dict):
+        mtype = msg.get("type")
+
+        if mtype in ("start", "resume"):
+            if self.running:
+                await self.send({"type": "error", "text": "A run is already in progress on this connection."})
+                return
+            orchestrator = self._create(msg) if mtype == "start" else self._resume(msg)
+            if orchestrator is None:
+                await self.send({"type": "error", "text": f"No checkpoint found for agent {msg.get('agent_id')}."})
+                return
+            await self._launch(orchestrator, mtype)
+            return
+
+        if not self.running:
+            await self.send({"type": "error", "text": f"No active run for '{mtype}'."})
+            return
+
+        if mtype == "cancel":
+            self.orchestrator.cancel()
+        elif mtype == "pause":
+            self.orchestrator.pause()
+        elif mtype == "continue":
+            self.orchestrator.resume()
+        elif mtype == "guidance":
+            text = (msg.get("text") or "").strip()
+            if not text:
+                await self.send({"type": "error", "text": "Empty guidance."})
+                return
+            self.orchestrator.inject_guidance(text)
+        else:
+            await self.send({"type": "error", "text": f"Unknown message type: {mtype}"})
+            return
+        await self.send({"type": "ack", "for": mtype, "agent_id": self.orchestrator.agent_id})
+
+    def _create(self, msg: dict) -> Orchestrator:
+        session = None
+        if self.session_store is not None:
+            session = self.session_store.get_or_create(msg.get("session_id"))
+        return create_orchestrator(msg.get("input", ""), model=msg.get("model", "llama3"),
+                                   agent_id=msg.get("agent_id"), session=session, tools=msg.get("tools"))
+
+    def _resume(self, msg: dict) -> Optional[Orchestrator]:
+        agent_id = msg.get("agent_id")
+        checkpoint = FileMemoryStore().load_latest_checkpoint(agent_id) if agent_id else None
+        if checkpoint is None:
+            return None
+        session = None
+        if self.session_store is not None:
+            # Rejoin the conversation the run belonged to so the finished turn is recorded there
+            session = self.session_store.get_or_create(msg.get("session_id") or checkpoint.session_id)
+        return Orchestrator.from_checkpoint(checkpoint, model=msg.get("model", "llama3"), session=session)
+
+    async def _launch(self, orchestrator: Orchestrator, mode: str):
+        self.orchestrator = orchestrator
+        self.bridge = EventBridge(asyncio.get_running_loop())
+        attach_bridge(orchestrator, self.bridge)
+
+        info = {"type": "started" if mode == "start" else "resumed", "agent_id": orchestrator.agent_id}
+        if orchestrator.session:
+            info["session_id"] = orchestrator.session.session_id
+        if mode == "resume":
+            # Send a compact snapshot instead of replaying the whole run
+            info.update({
+                "state": orchestrator.state.value,
+                "current_task_index": orchestrator.current_task_index,
+                "tasks": [{"id": t.id, "goal": t.goal, "status": t.status} for t in orchestrator.tasks],
+                "events_so_far": len(orchestrator.trace.events)
+            })
+        await self.send(info)
+
+        start_run(orchestrator, self.bridge)
+        self.pump_task = asyncio.create_task(self._pump(orchestrator, self.bridge))
+
+    async def _pump(self, orchestrator: Orchestrator, bridge: EventBridge):
+        output_sent = False
+        while True:
+            item = await bridge.get()
+            # Merge token deltas that are already queued into one message
+            while item["type"] in TOKEN_TYPES and not bridge.queue.empty():
+                nxt = bridge.queue.get_nowait()
+                if nxt["type"] == item["type"] and nxt.get("source") == item.get("source"):
+                    item = dict(item, text=item["text"] + nxt["text"], ts=nxt.get("ts"))
+                    continue
+                if item["type"] == "output":
+                    output_sent = True
+                await self.send(item)
+                item = nxt
+
+            if item["type"] == RUN_FINISHED:
+                result = item.get("result") or ""
+                if orchestrator.state == AgentState.ERROR:
+                    await self.send({"type": "error", "text": result, "ts": time.time()})
+                elif not output_sent:
+                    await self.send({"type": "output", "text": result, "source": "orchestrator", "ts": time.time()})
+                if orchestrator.session and self.session_store is not None:
+                    self.session_store.save(orchestrator.session)
+                await self.send({
+                    "type": "done",
+                    "agent_id": orchestrator.agent_id,
+                    "state": orchestrator.state.value,
+                    "cancelled": orchestrator.cancelled
+                })
+                bridge.close()
+                return
+
+            if item["type"] == "output":
+                output_sent = True
+            await self.send(item)
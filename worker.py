@@ -0,0 +1,118 @@
+"""
+Agent Worker 入口：启动 N 个进程，从 JobQueue 认领任务并执行 orchestrate。
+
+    python worker.py --workers 4 --db .memora/jobs.db
+
+每个 Worker 进程独立持有 GIL，因此 pandas 等 CPU 密集的工具解析不会拖慢 Web 层。
+多个主机指向同一个数据库文件 (以及同一个 checkpoint 目录) 即可分摊负载。
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from core.jobs.queue import JobQueue, Job
+from core.orchestrator import create_orchestrator
+from core.state import AgentState
+from tools.registry import warm_up as warm_up_tools
+
+
+def _run_job(queue: JobQueue, job: Job, worker_id: str, lease_seconds: float):
+    print(f"[Worker {worker_id}] Running job {job.id} (agent {job.agent_id}, attempt {job.attempts})")
+    orchestrator = create_orchestrator(job.input, model=job.model, agent_id=job.agent_id)
+
+    # Heartbeat: renew the lease; stop the run if it was lost or cancel was requested
+    stop_heartbeat = threading.Event()
+
+    def heartbeat():
+        while not stop_heartbeat.wait(lease_seconds / 3):
+            if not queue.renew(job.id, worker_id, lease_seconds):
+                print(f"[Worker {worker_id}] Lease lost or cancel requested for job {job.id}")
+                orchestrator.cancel()
+                return
+
+    hb = threading.Thread(target=heartbeat, daemon=True)
+    hb.start()
+    try:
+        result = orchestrator.start()
+    except Exception as e:
+        stop_heartbeat.set()
+        queue.fail(job.id, worker_id, f"System Error: {e}")
+        return
+    finally:
+        stop_heartbeat.set()
+        hb.join()
+
+    if orchestrator.state == AgentState.DONE:
+        queue.complete(job.id, worker_id, result)
+    elif orchestrator.cancelled:
+        current = queue.get(job.id)
+        if current and current.cancel_requested:
+            queue.mark_cancelled(job.id, worker_id)
+        # Otherwise the lease moved to another worker, which resumes from the checkpoint
+    else:
+        queue.fail(job.id, worker_id, result)
+
+
+def worker_loop(db_path: str, lease_seconds: float, poll_interval: float, index: int):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    queue = JobQueue(db_path)
+    stopping = threading.Event()
+
+    def handle_signal(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    print(f"[Worker {worker_id}] Started")
+    # Tools load lazily; import them (and pandas etc.) while waiting for the first job
+    warm_up_tools(background=True)
+    while not stopping.is_set():
+        try:
+            job = queue.claim(worker_id, lease_seconds)
+        except Exception as e:
+            print(f"[Worker {worker_id}] Claim failed: {e}")
+            job = None
+
+        if job is None:
+            stopping.wait(poll_interval)
+            continue
+
+        _run_job(queue, job, worker_id, lease_seconds)
+    print(f"[Worker {worker_id}] Stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memora agent worker pool")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--db", default=".memora/jobs.db")
+    parser.add_argument("--lease", type=float, default=60.0, help="lease duration in seconds")
+    parser.add_argument("--poll", type=float, default=1.0, help="idle poll interval in seconds")
+    args = parser.parse_args()
+
+    # Create the schema once before the workers race for it
+    JobQueue(args.db)
+
+    processes = []
+    for i in range(args.workers):
+        p = multiprocessing.Process(target=worker_loop, args=(args.db, args.lease, args.poll, i))
+        p.start()
+        processes.append(p)
+
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping workers...")
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.join()
+
+
+if __name__ == "__main__":
+    main()